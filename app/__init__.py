@@ -1,6 +1,22 @@
 # Módulo principal do app
-from .main import main, LimpezaDavidApp
-from .utils import get_logger, format_size, COLORS
+# Os nomes são carregados sob demanda: importar 'app' (ex: pelo app.api ou
+# por uma execução via cron) não carrega o tkinter da interface gráfica.
 
 __all__ = ['main', 'LimpezaDavidApp', 'get_logger', 'format_size', 'COLORS']
 __version__ = '1.0.0'
+
+_LAZY = {
+    'main': 'app.main',
+    'LimpezaDavidApp': 'app.main',
+    'get_logger': 'app.utils',
+    'format_size': 'app.utils',
+    'COLORS': 'app.utils',
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(module), name)
@@ -8,23 +8,31 @@ Descrição: API Flask que expõe endpoints para scan, limpeza e atualização.
 
 import os
 import sys
-import platform
+import math
 import subprocess
 import threading
+import time
+import uuid
 from pathlib import Path
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 
-# Adiciona o diretório pai ao path para imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from app.utils import format_size, get_logger
-
-# Importa o cleaner apropriado baseado no SO
-if platform.system() == 'Windows':
-    from app.cleaner.windows import WindowsCleaner as SystemCleaner
-else:
-    from app.cleaner.linux import LinuxCleaner as SystemCleaner
+from app.policy import FreeSpacePolicy
+from app.estimator import estimate_categories
+from app.events import EventBus, format_sse
+from app.logbuffer import LogRingBuffer
+from app.scan_index import ScanIndex, InvalidCursorError
+from app.jobs import (
+    JobManager, JobConflictError, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED, JOB_KINDS, JOB_STATES
+)
+from app import metrics, tracing
+from app.profiling import summarize, DEFAULT_TOP
+from app.static_assets import precompress_assets, send_asset
+from app.server import (
+    serve, RequestSlots, long_request_limit, DEFAULT_THREADS, DEFAULT_BACKLOG, DEFAULT_KEEPALIVE
+)
+from app.cleaner import get_system_cleaner
 
 
 # Configuração - Caminho absoluto para o diretório dist do frontend
@@ -34,146 +42,526 @@ FRONTEND_DIST = BASE_DIR / 'frontend' / 'dist'
 app = Flask(__name__, static_folder=str(FRONTEND_DIST), static_url_path='')
 CORS(app)
 
-# Inicializa o cleaner
-cleaner = SystemCleaner()
+# Roda análises e limpezas sob o cProfile quando o pedido não diz nada
+# (ligado por run_web.py --profile)
+app.config['PROFILE_JOBS'] = False
+
+# Grava a linha do tempo (Chrome trace) das tarefas por padrão
+# (ligado por run_web.py --trace)
+app.config['TRACE_JOBS'] = False
+
+# Cleaner do sistema, criado no primeiro uso (ver get_cleaner)
+_cleaner = None
+_cleaner_lock = threading.Lock()
 logger = get_logger("API")
 
-# Estado global da aplicação
-app_state = {
-    'is_scanning': False,
-    'is_cleaning': False,
-    'is_updating': False,
-    'scan_results': {},
-    'progress': 0,
-    'status': 'idle',
-    'current_task': '',
-    'logs': []
+# Protege os índices de análise (o estado das operações fica no JobManager
+# e a versão do estado é a do barramento de eventos, events.version)
+state_lock = threading.Lock()
+
+# Log de operações com números de sequência (/api/logs?after=<seq>)
+logs = LogRingBuffer(capacity=1000)
+
+# Status legado exposto em /api/state, por (tipo, terminou?)
+LEGACY_STATUS = {
+    ('scan', False): 'scanning',
+    ('scan', True): 'scan_complete',
+    ('clean', False): 'cleaning',
+    ('clean', True): 'clean_complete',
+    ('update', False): 'updating',
+    ('update', True): 'idle',
 }
 
+# Campos de tarefa que só geram evento de progresso
+PROGRESS_FIELDS = {'progress', 'current_task'}
+
+# Barramento para o stream /api/events
+events = EventBus()
+SSE_HEARTBEAT_INTERVAL = 15
+
+# Long-poll em /api/state: espera máxima e prefixo do ETag (muda a cada
+# inicialização para que versões de outro processo nunca coincidam)
+STATE_MAX_WAIT = 30
+STATE_ETAG_PREFIX = uuid.uuid4().hex[:8]
+
+# Vagas para streams SSE e long-polls (ajustadas às threads em run_api);
+# sem vaga a resposta é 503 e o painel volta ao polling simples
+long_requests = RequestSlots(long_request_limit(DEFAULT_THREADS))
+LONG_REQUEST_RETRY_AFTER = 5
+
+
+def _public_state():
+    """
+    Retorna os campos públicos do estado, derivados das tarefas.
+    
+    Progresso, status e tarefa atual vêm da tarefa ativa mais recente ou,
+    sem tarefas ativas, da última concluída.
+    """
+    all_jobs = jobs.list()
+    active = [job for job in all_jobs if job.is_active]
+    
+    state = {
+        'is_scanning': any(job.kind == 'scan' for job in active),
+        'is_cleaning': any(job.kind == 'clean' for job in active),
+        'is_updating': any(job.kind == 'update' for job in active),
+        'progress': 0,
+        'status': 'idle',
+        'current_task': '',
+        'job_id': None,
+    }
+    
+    current = active[-1] if active else (all_jobs[-1] if all_jobs else None)
+    if current is not None:
+        snapshot = jobs.snapshot(current)
+        state['progress'] = snapshot['progress']
+        state['current_task'] = snapshot['current_task']
+        state['job_id'] = snapshot['id']
+        if snapshot['status'] == JOB_FAILED:
+            state['status'] = 'error'
+        elif snapshot['status'] == JOB_CANCELLED:
+            state['status'] = 'cancelled'
+        else:
+            state['status'] = LEGACY_STATUS[(current.kind, not current.is_active)]
+    
+    return state
+
+
+def _on_job_change(job, fields):
+    """Publica as alterações das tarefas no barramento de eventos."""
+    if fields <= PROGRESS_FIELDS:
+        snapshot = jobs.snapshot(job)
+        events.publish('progress', {
+            'progress': snapshot['progress'],
+            'current_task': snapshot['current_task'],
+            'job_id': job.id
+        })
+    else:
+        state = _public_state()
+        state['job'] = jobs.snapshot(job)
+        events.publish('state', state)
+
+
+jobs = JobManager(on_change=_on_job_change)
+
+# Índices de arquivos por análise (job_id -> ScanIndex)
+scan_indexes = {}
+MAX_SCAN_INDEXES = 5
+FILES_PAGE_LIMIT = 1000
+
+# Estimativas rápidas de tamanho (/api/categories?estimate=1)
+ESTIMATE_TTL = 60
+KNOWN_SIZE_MAX_AGE = 300
+estimate_cache = {'at': 0.0, 'data': None}
+estimate_lock = threading.Lock()
+
+
+def clear_log_entries():
+    """Esvazia o log e notifica os clientes."""
+    logs.clear()
+    events.publish('logs_cleared', {'last_seq': logs.last_seq})
+
 
 def add_log(message, level='info'):
     """Adiciona uma mensagem ao log."""
-    app_state['logs'].append({
-        'message': message,
-        'level': level
-    })
-    # Mantém apenas os últimos 100 logs
-    if len(app_state['logs']) > 100:
-        app_state['logs'] = app_state['logs'][-100:]
+    entry = logs.append(message, level)
+    events.publish('log', entry)
+
+
+def _recent_logs(count=20):
+    """Cópia das últimas entradas do log."""
+    return logs.tail(count)
+
+
+def get_cleaner():
+    """Cleaner do sistema operacional, criado no primeiro uso."""
+    global _cleaner
+    if _cleaner is None:
+        with _cleaner_lock:
+            if _cleaner is None:
+                _cleaner = get_system_cleaner()()
+    return _cleaner
+
+
+def _multiuser():
+    """Módulo da análise multiusuário (None fora do Linux)."""
+    if sys.platform == 'win32':
+        return None
+    from app.cleaner import multiuser
+    return multiuser
+
+
+def _multi_user_available():
+    """Indica se a análise de todos os usuários pode rodar (Linux, como root)."""
+    multiuser = _multiuser()
+    return multiuser is not None and multiuser.is_root()
 
 
 @app.route('/')
 def index():
     """Serve o frontend React."""
-    return send_from_directory(app.static_folder, 'index.html')
+    # index.html não tem hash no nome: o navegador revalida pelo ETag
+    return send_asset(FRONTEND_DIST, 'index.html', request, immutable=False)
 
 
 @app.route('/assets/<path:filename>')
 def serve_frontend_assets(filename):
     """Serve arquivos de assets do frontend (JS, CSS)."""
-    return send_from_directory(str(FRONTEND_DIST / 'assets'), filename)
+    return send_asset(FRONTEND_DIST / 'assets', filename, request)
 
 
 @app.route('/api/system-info')
 def get_system_info():
     """Retorna informações do sistema."""
+    import platform
+    
     return jsonify({
         'system': platform.system(),
         'release': platform.release(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'multi_user': _multi_user_available()
     })
 
 
 @app.route('/api/categories')
 def get_categories():
-    """Retorna as categorias de limpeza disponíveis."""
-    categories = cleaner.get_categories()
+    """
+    Retorna as categorias de limpeza disponíveis.
+    
+    Com ?estimate=1 cada categoria ganha 'estimate' com o tamanho estimado
+    e o intervalo de confiança (bytes, low, high, exact).
+    """
+    categories = get_cleaner().get_categories()
+    if request.args.get('estimate') in ('1', 'true'):
+        estimates = _category_estimates(refresh=request.args.get('refresh') in ('1', 'true'))
+        for cat_id, info in categories.items():
+            info['estimate'] = estimates.get(cat_id)
     return jsonify(categories)
 
 
+def _known_sizes():
+    """Tamanhos exatos da análise concluída mais recente, se ainda for recente."""
+    job, results = _scan_results()
+    if job is None or time.time() - (job.finished_at or 0) > KNOWN_SIZE_MAX_AGE:
+        return {}
+    return {cat_id: data['size'] for cat_id, data in results.items()}
+
+
+def _category_estimates(refresh=False):
+    """Estimativas por categoria, em cache por ESTIMATE_TTL segundos."""
+    with estimate_lock:
+        now = time.time()
+        if refresh or estimate_cache['data'] is None or now - estimate_cache['at'] > ESTIMATE_TTL:
+            roots = get_cleaner().get_category_roots()
+            known = _known_sizes()
+            # Categorias já medidas pela análise não precisam de amostragem
+            estimates = estimate_categories(roots, [c for c in roots if c not in known])
+            for cat_id, size in known.items():
+                estimates[cat_id] = {'bytes': size, 'low': size, 'high': size,
+                                     'exact': True, 'probes': 0}
+            for estimate in estimates.values():
+                estimate['formatted'] = format_size(estimate['bytes'])
+            estimate_cache.update(at=now, data=estimates)
+        return estimate_cache['data']
+
+
+def _state_etag(version):
+    """ETag da versão do estado."""
+    return f"{STATE_ETAG_PREFIX}-{version}"
+
+
 @app.route('/api/state')
 def get_state():
-    """Retorna o estado atual da aplicação."""
-    return jsonify({
-        'is_scanning': app_state['is_scanning'],
-        'is_cleaning': app_state['is_cleaning'],
-        'is_updating': app_state['is_updating'],
-        'progress': app_state['progress'],
-        'status': app_state['status'],
-        'current_task': app_state['current_task'],
-        'logs': app_state['logs'][-20:]  # Últimos 20 logs
-    })
+    """
+    Retorna o estado atual da aplicação.
+    
+    Suporta GET condicional: a resposta traz um ETag da versão do estado e
+    If-None-Match com a versão atual retorna 304 sem corpo. Com ?wait=<s>
+    a requisição aguarda (long-poll) até a versão mudar ou o tempo acabar.
+    """
+    version = events.version
+    raw_wait = request.args.get('wait')
+    wait = 0.0
+    if raw_wait is not None:
+        try:
+            wait = float(raw_wait)
+        except ValueError:
+            wait = math.nan
+        # nan/inf nunca expiram em Condition.wait_for
+        if not math.isfinite(wait):
+            return jsonify({'error': f'wait inválido: {raw_wait!r}'}), 400
+        wait = min(max(wait, 0.0), STATE_MAX_WAIT)
+    
+    if wait and request.if_none_match.contains(_state_etag(version)):
+        if not long_requests.acquire():
+            return _busy_response()
+        try:
+            version = events.wait_for_change(version, wait)
+        finally:
+            long_requests.release()
+    
+    state = _public_state()
+    state['logs'] = _recent_logs()  # Últimos 20 logs
+    state['last_log_seq'] = logs.last_seq
+    state['version'] = version
+    
+    response = jsonify(state)
+    response.set_etag(_state_etag(version))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@app.route('/api/events')
+def stream_events():
+    """
+    Stream Server-Sent Events com estado, progresso e novas linhas de log.
+    
+    O primeiro evento é um snapshot completo ('state' com os últimos logs).
+    Depois são enviados apenas os eventos 'state', 'progress', 'log' e
+    'logs_cleared', com heartbeat periódico. Se o cliente não acompanhar,
+    recebe 'resync' seguido de um novo snapshot. /api/state continua
+    disponível como alternativa por polling (e é o que o painel usa se
+    as vagas de requisições longas estiverem esgotadas: 503).
+    """
+    if not long_requests.acquire():
+        return _busy_response()
+    subscription = events.subscribe()
+    
+    def snapshot():
+        state = _public_state()
+        state['logs'] = _recent_logs()
+        return format_sse('state', state)
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            yield snapshot()
+            while True:
+                item = subscription.get(timeout=SSE_HEARTBEAT_INTERVAL)
+                if item is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                
+                event_id, event, data = item
+                yield format_sse(event, data, event_id)
+                if event == 'resync':
+                    yield snapshot()
+        finally:
+            events.unsubscribe(subscription)
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+    # Libera a vaga ao fechar a resposta, mesmo que o gerador nunca rode
+    response.call_on_close(long_requests.release)
+    return response
+
+
+def _busy_response():
+    """503 para uma requisição longa sem vaga (ver app.server.RequestSlots)."""
+    response = jsonify({'error': 'Muitas conexões de acompanhamento abertas; tente novamente'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(LONG_REQUEST_RETRY_AFTER)
+    return response
+
+
+def _conflict_response(error):
+    """Resposta padrão para operação conflitante."""
+    return jsonify({'error': f'Operação já em andamento: {error}'}), 400
+
+
+def _scan_job(job_id=None):
+    """
+    Retorna a tarefa de análise pedida ou a última concluída.
+    
+    Args:
+        job_id: ID da análise; se omitido usa a mais recente concluída
+    """
+    if job_id:
+        job = jobs.get(job_id)
+        if job and job.kind == 'scan' and job.status == JOB_COMPLETED:
+            return job
+        return None
+    
+    for job in reversed(jobs.list(kind='scan')):
+        if job.status == JOB_COMPLETED:
+            return job
+    return None
+
+
+def _scan_results(job_id=None):
+    """Resultados ({categoria: {'files', 'size', 'name'}}) de uma análise."""
+    job = _scan_job(job_id)
+    if job is None or not job.result:
+        return None, {}
+    return job, job.result
+
+
+def _summarize_scan(results):
+    """Resumo (contagens e tamanhos) dos resultados de uma análise."""
+    total_files = sum(len(r['files']) for r in results.values())
+    total_size = sum(r['size'] for r in results.values())
+    
+    summary = {
+        'results': {
+            cat_id: {
+                'name': data['name'],
+                'file_count': len(data['files']),
+                'size': data['size'],
+                'size_formatted': format_size(data['size']),
+                'user': data.get('user')
+            }
+            for cat_id, data in results.items()
+        },
+        'total_files': total_files,
+        'total_size': total_size,
+        'total_size_formatted': format_size(total_size)
+    }
+    
+    # Totais por usuário nas análises multiusuário
+    users = {}
+    for data in results.values():
+        if data.get('user'):
+            user = users.setdefault(data['user'], {'file_count': 0, 'size': 0})
+            user['file_count'] += len(data['files'])
+            user['size'] += data['size']
+    if users:
+        for user in users.values():
+            user['size_formatted'] = format_size(user['size'])
+        summary['users'] = users
+    return summary
 
 
 @app.route('/api/scan', methods=['POST'])
 def start_scan():
-    """Inicia a análise do sistema."""
-    if app_state['is_scanning'] or app_state['is_cleaning']:
-        return jsonify({'error': 'Operação já em andamento'}), 400
+    """
+    Inicia a análise do sistema.
     
-    data = request.get_json()
+    Com 'all_users': true (Linux, como root) as categorias pessoais são
+    analisadas para cada usuário local, com chaves 'categoria@usuário'.
+    """
+    data = request.get_json() or {}
     categories = data.get('categories', [])
+    all_users = bool(data.get('all_users'))
     
     if not categories:
         return jsonify({'error': 'Selecione pelo menos uma categoria'}), 400
+    if all_users and not _multi_user_available():
+        return jsonify({'error': 'A análise de todos os usuários requer root no Linux'}), 403
+    
+    params = _job_params(data, all_users=all_users)
     
-    # Inicia scan em thread separada
-    thread = threading.Thread(target=scan_thread, args=(categories,))
-    thread.daemon = True
-    thread.start()
+    # Verificação e registro são atômicos no JobManager
+    try:
+        job = jobs.submit('scan', lambda job: scan_thread(job, categories, all_users),
+                          categories, params)
+    except JobConflictError as e:
+        return _conflict_response(e)
     
-    return jsonify({'message': 'Análise iniciada'})
+    return jsonify({'message': 'Análise iniciada', 'job_id': job.id})
 
 
-def scan_thread(categories):
-    """Thread de análise."""
+def scan_thread(job, categories, all_users=False):
+    """
+    Thread de análise.
+    
+    Args:
+        job: Tarefa de análise
+        categories: Categorias pedidas
+        all_users: Analisa as categorias pessoais de todos os usuários locais
+    
+    Returns:
+        Resultados por categoria ({categoria: {'files', 'size', 'name',
+        'sizes'}}, com 'sizes' = {caminho: bytes} medidos na análise e
+        reaproveitados pela limpeza); no modo multiusuário as categorias
+        pessoais viram 'categoria@usuário' com 'user', 'uid' e 'home'
+    """
+    results = {}
+    sizes = {}
+    cancel_token = job.cancel_token
+    user_categories = []
+    if all_users:
+        multiuser = _multiuser()
+        user_categories = [c for c in categories if c in multiuser.USER_CATEGORIES]
+        categories = [c for c in categories if c not in multiuser.USER_CATEGORIES]
+    
     try:
-        app_state['is_scanning'] = True
-        app_state['status'] = 'scanning'
-        app_state['progress'] = 0
-        app_state['scan_results'] = {}
-        app_state['logs'] = []
+        # Só limpa o log se esta for a única operação em andamento
+        if len(jobs.list(active=True)) == 1:
+            clear_log_entries()
         
         add_log('🔍 Iniciando análise do sistema...', 'header')
         
         total_size = 0
         total_files = 0
-        all_categories = cleaner.get_categories()
+        all_categories = get_cleaner().get_categories()
         
-        for i, cat_id in enumerate(categories):
-            progress = ((i + 1) / len(categories)) * 100
-            app_state['progress'] = progress
-            
-            cat_info = all_categories.get(cat_id, {})
-            cat_name = cat_info.get('name', cat_id)
-            
-            app_state['current_task'] = f"Analisando: {cat_name}"
-            add_log(f'📂 Analisando: {cat_name}...', 'info')
-            
-            # Escaneia a categoria
-            files, size = cleaner.scan_category(cat_id)
+        names = {cat_id: all_categories.get(cat_id, {}).get('name', cat_id) for cat_id in categories}
+        if categories:
+            add_log(f'📂 Analisando: {", ".join(names.values())}...', 'info')
+        
+        def on_progress(done, total, root):
+            # Chamado antes de cada raiz: mostra a que está sendo percorrida
+            task = f"Analisando: {root}" if root else 'Finalizando análise...'
+            jobs.update(job, progress=(done / total) * 100, current_task=task)
+        
+        def on_results(partial):
+            # Publica os resultados parciais para leitura via /api/jobs/<id>
+            jobs.update(job, result={
+                cat_id: {'files': files, 'size': size, 'name': names[cat_id]}
+                for cat_id, (files, size) in partial.items()
+            })
+        
+        # Uma única varredura para todas as categorias (raízes compartilhadas
+        # são percorridas uma vez)
+        scanned = get_cleaner().scan_categories(
+            categories, cancel_token, on_progress, on_results, sizes
+        ) if categories else {}
+        
+        for cat_id in categories:
+            if cat_id not in scanned:
+                continue
+            files, size = scanned[cat_id]
             
-            app_state['scan_results'][cat_id] = {
+            results[cat_id] = {
                 'files': files,
                 'size': size,
-                'name': cat_name
+                'name': names[cat_id],
+                'sizes': {path: sizes[path] for path in files}
             }
             
             total_size += size
             total_files += len(files)
             
-            add_log(f'  └─ {len(files)} arquivos ({format_size(size)})', 'success')
+            add_log(f'  └─ {names[cat_id]}: {len(files)} arquivos ({format_size(size)})', 'success')
+        # Publica uma cópia para leitura parcial via /api/jobs/<id>
+        jobs.update(job, result=dict(results))
+        
+        if user_categories and not cancel_token.cancelled:
+            files, size = _scan_all_users(job, user_categories, results, all_categories, sizes)
+            total_files += files
+            total_size += size
         
         add_log('', 'info')
         add_log('═' * 40, 'header')
+        if cancel_token.cancelled:
+            add_log('⏹️ ANÁLISE CANCELADA (resultados parciais)', 'warning')
         add_log(f'📊 RESUMO DA ANÁLISE:', 'header')
         add_log(f'   Total de arquivos: {total_files}', 'success')
         add_log(f'   Espaço a liberar: {format_size(total_size)}', 'success')
         add_log('═' * 40, 'header')
         
-        app_state['status'] = 'scan_complete'
-        app_state['current_task'] = ''
-        app_state['progress'] = 100
+        _store_index(job, results)
+        
+        if cancel_token.cancelled:
+            jobs.update(job, current_task='')
+            return results
+        
+        jobs.update(job, current_task='', progress=100)
         
         if total_files > 0:
             add_log('', 'info')
@@ -185,90 +573,261 @@ def scan_thread(categories):
     except Exception as e:
         add_log(f'❌ Erro durante análise: {str(e)}', 'error')
         logger.error(f"Erro na análise: {e}")
-        app_state['status'] = 'error'
-    finally:
-        app_state['is_scanning'] = False
+        raise
+    
+    return results
+
+
+def _scan_all_users(job, categories, results, all_categories, sizes):
+    """
+    Analisa as categorias pessoais de cada usuário local em paralelo.
+    
+    Preenche 'results' com as chaves 'categoria@usuário'.
+    
+    Returns:
+        Tupla com (arquivos, tamanho) somados de todos os usuários
+    """
+    multiuser = _multiuser()
+    scanner = multiuser.MultiUserScanner()
+    users = {user.name: user for user in scanner.users}
+    add_log(f'👥 Analisando {len(users)} usuários...', 'info')
+    jobs.update(job, current_task=f"Analisando {len(users)} usuários")
+    
+    done = []
+    
+    def on_user_done(name, user_results):
+        files = sum(len(f) for f, _ in user_results.values())
+        size = sum(s for _, s in user_results.values())
+        done.append(name)
+        jobs.update(job, current_task=f"Usuários analisados: {len(done)}/{len(users)}")
+        add_log(f'  └─ {name}: {files} arquivos ({format_size(size)})', 'success')
+    
+    per_user = scanner.scan(categories, job.cancel_token, on_user_done, sizes)
+    
+    total_files = 0
+    total_size = 0
+    for name, user_results in per_user.items():
+        user = users[name]
+        for cat_id, (files, size) in user_results.items():
+            cat_name = all_categories.get(cat_id, {}).get('name', cat_id)
+            results[multiuser.user_key(cat_id, name)] = {
+                'files': files,
+                'size': size,
+                'name': f"{cat_name} ({name})",
+                'sizes': {path: sizes[path] for path in files},
+                'user': name,
+                'uid': user.uid,
+                'home': str(user.home)
+            }
+            total_files += len(files)
+            total_size += size
+    jobs.update(job, result=dict(results))
+    return total_files, total_size
+
+
+def _store_index(job, results):
+    """Monta o índice de arquivos da análise (uma vez por análise)."""
+    jobs.update(job, current_task='Indexando resultados...')
+    index = ScanIndex(results)
+    
+    with state_lock:
+        scan_indexes[job.id] = index
+        # Descarta índices de análises antigas ou já removidas do histórico
+        stale = [job_id for job_id in scan_indexes if jobs.get(job_id) is None]
+        stale += list(scan_indexes)[:max(0, len(scan_indexes) - MAX_SCAN_INDEXES)]
+        for job_id in set(stale):
+            scan_indexes.pop(job_id, None)
+
+
+def _drop_index(job):
+    """Remove o índice de uma análise cujos resultados foram consumidos."""
+    with state_lock:
+        scan_indexes.pop(job.id, None)
 
 
 @app.route('/api/scan-results')
 def get_scan_results():
-    """Retorna os resultados da última análise."""
-    results = app_state['scan_results']
+    """Retorna os resultados da última análise (ou da análise ?job_id=)."""
+    job, results = _scan_results(request.args.get('job_id'))
     
-    total_files = sum(len(r['files']) for r in results.values())
-    total_size = sum(r['size'] for r in results.values())
+    summary = _summarize_scan(results)
+    summary['job_id'] = job.id if job else None
+    return jsonify(summary)
+
+
+@app.route('/api/scan-results/files')
+def list_scan_files():
+    """
+    Lista os arquivos de uma análise com paginação por cursor.
+    
+    Parâmetros (query string):
+        job_id: Análise (padrão: a última concluída)
+        sort: 'size', 'age' ou 'path' (padrão 'size')
+        order: 'asc' ou 'desc' (padrão 'desc')
+        prefix: Apenas caminhos com este prefixo
+        glob: Padrão fnmatch (nome do arquivo, ou caminho se tiver '/')
+        category: Apenas esta categoria
+        limit: Itens por página (máx. FILES_PAGE_LIMIT)
+        cursor: Cursor 'next_cursor' da página anterior
+    """
+    args = request.args
+    job, results = _scan_results(args.get('job_id'))
+    if not results:
+        return jsonify({'error': 'Faça uma análise primeiro'}), 400
+    
+    with state_lock:
+        index = scan_indexes.get(job.id)
+    if index is None:
+        return jsonify({'error': 'Índice da análise não disponível'}), 404
+    
+    limit = min(max(args.get('limit', 100, type=int), 1), FILES_PAGE_LIMIT)
+    descending = args.get('order', 'desc') != 'asc'
+    
+    query = (args.get('sort', 'size'), args.get('prefix'), args.get('glob'), args.get('category'))
+    try:
+        view = index.view(*query)
+        items, next_cursor = index.page(view, args.get('cursor'), limit, descending, query)
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    for item in items:
+        item['size_formatted'] = format_size(item['size'])
     
     return jsonify({
-        'results': {
-            cat_id: {
-                'name': data['name'],
-                'file_count': len(data['files']),
-                'size': data['size'],
-                'size_formatted': format_size(data['size'])
-            }
-            for cat_id, data in results.items()
-        },
-        'total_files': total_files,
-        'total_size': total_size,
-        'total_size_formatted': format_size(total_size)
+        'job_id': job.id,
+        'files': items,
+        'total': len(view),
+        'next_cursor': next_cursor
     })
 
 
 @app.route('/api/clean', methods=['POST'])
 def start_clean():
-    """Inicia a limpeza dos arquivos."""
-    if app_state['is_scanning'] or app_state['is_cleaning']:
-        return jsonify({'error': 'Operação já em andamento'}), 400
+    """Inicia a limpeza dos arquivos da última análise (ou de 'job_id')."""
+    data = request.get_json(silent=True) or {}
+    scan_job, results = _scan_results(data.get('job_id'))
     
-    if not app_state['scan_results']:
+    if not results:
         return jsonify({'error': 'Faça uma análise primeiro'}), 400
     
-    # Inicia limpeza em thread separada
-    thread = threading.Thread(target=clean_thread)
-    thread.daemon = True
-    thread.start()
+    params = _job_params(data)
     
-    return jsonify({'message': 'Limpeza iniciada'})
+    try:
+        job = _submit_clean(scan_job, results, params)
+    except JobConflictError as e:
+        return _conflict_response(e)
+    
+    return jsonify({'message': 'Limpeza iniciada', 'job_id': job.id})
 
 
-def clean_thread():
-    """Thread de limpeza."""
-    try:
-        app_state['is_cleaning'] = True
-        app_state['status'] = 'cleaning'
-        app_state['progress'] = 0
+def _job_params(data, **extra):
+    """Parâmetros comuns de análise/limpeza ('profile' e 'trace') a partir do pedido."""
+    return dict(
+        extra,
+        profile=bool(data.get('profile', app.config['PROFILE_JOBS'])),
+        trace=bool(data.get('trace', app.config['TRACE_JOBS'])),
+    )
+
+
+def _submit_clean(scan_job, results, params=None, partial=False):
+    """
+    Registra uma tarefa de limpeza para os resultados de uma análise.
+    
+    Com partial (limpeza por meta) só os arquivos removidos saem dos
+    resultados da análise; os demais candidatos continuam disponíveis.
+    """
+    params = dict(params or {}, scan_job=scan_job.id)
+    return jobs.submit(
+        'clean',
+        lambda job: clean_thread(job, results, scan_job, partial),
+        list(results.keys()),
+        params
+    )
+
+
+def _cleaner_for(result):
+    """Cleaner que remove um resultado (o do dono nas análises multiusuário)."""
+    if result.get('user') is None:
+        return get_cleaner()
+    return get_system_cleaner()(home=result['home'], uid=result['uid'])
+
+
+def _subtract_removed(scan_job, removed):
+    """Tira os arquivos removidos dos resultados da análise e refaz o índice."""
+    remaining = {}
+    for cat_id, data in (scan_job.result or {}).items():
+        files = [path for path in data['files'] if path not in removed]
+        freed = sum(removed[path] for path in data['files'] if path in removed)
+        remaining[cat_id] = dict(data, files=files, size=max(0, data['size'] - freed))
+    jobs.update(scan_job, result=remaining)
+    _drop_index(scan_job)
+    index = ScanIndex(remaining)
+    with state_lock:
+        scan_indexes[scan_job.id] = index
+
+
+def clean_thread(job, results, scan_job=None, partial=False):
+    """
+    Thread de limpeza.
+    
+    Args:
+        job: Tarefa de limpeza
+        results: Resultados a limpar ({categoria: {'files', 'name'}} e, se
+                 vierem da análise, 'sizes' com os tamanhos já medidos)
+        scan_job: Análise de origem; seus resultados são consumidos ao final
+        partial: Só os arquivos removidos saem da análise (limpeza por meta)
         
+    Returns:
+        Dicionário com 'removed', 'size_freed' e 'errors'
+    """
+    try:
         add_log('', 'info')
         add_log('🗑️ Iniciando limpeza...', 'header')
         
         total_removed = 0
         total_size_freed = 0
         total_errors = 0
+        cancel_token = job.cancel_token
+        removed_paths = {}
         
-        categories = list(app_state['scan_results'].keys())
-        all_categories = cleaner.get_categories()
+        categories = list(results.keys())
         
         for i, cat_id in enumerate(categories):
+            if cancel_token.cancelled:
+                break
+            
             progress = ((i + 1) / len(categories)) * 100
-            app_state['progress'] = progress
+            jobs.update(job, progress=progress)
             
-            result = app_state['scan_results'][cat_id]
+            result = results[cat_id]
             files = result['files']
             cat_name = result['name']
             
             if not files:
                 continue
             
-            app_state['current_task'] = f"Limpando: {cat_name}"
+            jobs.update(job, current_task=f"Limpando: {cat_name}")
             add_log(f'🧹 Limpando: {cat_name}...', 'info')
             
             # Remove os arquivos com callback para log detalhado
             def log_removed_file(filepath, size):
+                removed_paths[filepath] = size
                 # Mostrar apenas o nome do arquivo, não caminho completo
                 filename = os.path.basename(filepath)
                 add_log(f'  ✓ {filename} ({format_size(size)})', 'file')
             
-            removed, size_freed, errors, error_files = cleaner.clean_files(files, log_removed_file)
+            failed_dirs = []
+            
+            def on_dir_report(path, report):
+                if not report:
+                    failed_dirs.append(report)
+            
+            with tracing.span(cat_id, 'category', files=len(files)):
+                removed, size_freed, errors, error_files = _cleaner_for(result).clean_files(
+                    files, log_removed_file, cancel_token, result.get('sizes'), on_dir_report
+                )
             
             total_removed += removed
             total_size_freed += size_freed
@@ -279,49 +838,262 @@ def clean_thread():
                 add_log(f'  └─ {errors} erros (arquivos em uso)', 'warning')
                 for err_file in error_files[:3]:  # Mostra no máximo 3 erros
                     add_log(f'    ✗ {os.path.basename(err_file)}', 'error')
+            for report in failed_dirs[:3]:
+                add_log(f'    ⚠ {report.path}: {report.files} arquivos ({format_size(report.bytes)}) '
+                        f'removidos, {report.totals.failures} falhas', 'warning')
+                for failure in report.failures[:3]:
+                    add_log(f'      ✗ {failure.path}: {failure.message} ({failure.reason})', 'error')
         
         add_log('', 'info')
         add_log('═' * 40, 'header')
-        add_log('✅ LIMPEZA CONCLUÍDA!', 'header')
+        if cancel_token.cancelled:
+            add_log('⏹️ LIMPEZA CANCELADA', 'warning')
+        else:
+            add_log('✅ LIMPEZA CONCLUÍDA!', 'header')
         add_log(f'   Arquivos removidos: {total_removed}', 'success')
         add_log(f'   Espaço liberado: {format_size(total_size_freed)}', 'success')
         if total_errors > 0:
             add_log(f'   Erros: {total_errors}', 'warning')
         add_log('═' * 40, 'header')
         
-        app_state['status'] = 'clean_complete'
-        app_state['current_task'] = ''
-        app_state['progress'] = 100
-        app_state['scan_results'] = {}
+        if partial and scan_job is not None:
+            # Os candidatos não selecionados pelo plano continuam válidos
+            _subtract_removed(scan_job, removed_paths)
+        
+        if cancel_token.cancelled:
+            # Os arquivos já removidos são ignorados se a limpeza for repetida
+            jobs.update(job, current_task='')
+        else:
+            # Os resultados da análise não são mais válidos após a limpeza
+            if scan_job is not None and not partial:
+                jobs.update(scan_job, result={})
+                _drop_index(scan_job)
+            jobs.update(job, current_task='', progress=100)
         
     except Exception as e:
         add_log(f'❌ Erro durante limpeza: {str(e)}', 'error')
         logger.error(f"Erro na limpeza: {e}")
-        app_state['status'] = 'error'
-    finally:
-        app_state['is_cleaning'] = False
+        raise
+    
+    return {
+        'removed': total_removed,
+        'size_freed': total_size_freed,
+        'errors': total_errors
+    }
+
+
+def _policy_number(data, key, maximum=None):
+    """Número opcional, finito e não negativo do corpo da requisição."""
+    value = data.get(key)
+    if value is None:
+        return None
+    if (isinstance(value, bool) or not isinstance(value, (int, float))
+            or not math.isfinite(value) or value < 0
+            or (maximum is not None and value > maximum)):
+        limit = f" entre 0 e {maximum}" if maximum is not None else " >= 0"
+        raise ValueError(f"{key} deve ser um número{limit}: {value!r}")
+    return value
+
+
+def _build_policy(data):
+    """
+    Cria a política de espaço livre a partir do corpo da requisição.
+    
+    Raises:
+        ValueError: Meta, ordenação ou caminhos inválidos (resposta 400)
+    """
+    target_free_bytes = _policy_number(data, 'target_free_bytes')
+    paths = data.get('paths')
+    if paths is not None and (isinstance(paths, str) or not isinstance(paths, list)
+                              or not all(isinstance(p, str) for p in paths)):
+        raise ValueError("paths deve ser uma lista de caminhos")
+    order = data.get('order', 'atime')
+    if not isinstance(order, str):
+        raise ValueError(f"Ordenação inválida: {order!r}")
+    return FreeSpacePolicy(
+        target_free_bytes=int(target_free_bytes) if target_free_bytes is not None else None,
+        target_free_percent=_policy_number(data, 'target_free_percent', 100),
+        order=order,
+        paths=paths
+    )
+
+
+def _policy_results(plan, results):
+    """Converte os arquivos selecionados pelo plano no formato de scan_results."""
+    return {
+        cat_id: dict(
+            {key: results[cat_id][key] for key in ('user', 'uid', 'home', 'sizes')
+             if key in results[cat_id]},
+            files=files,
+            name=results[cat_id]['name']
+        )
+        for cat_id, files in plan['selected'].items()
+    }
+
+
+@app.route('/api/policy/plan', methods=['POST'])
+def policy_plan():
+    """Projeta o resultado de uma meta de espaço livre sem remover nada."""
+    data = request.get_json() or {}
+    _, results = _scan_results(data.get('job_id'))
+    if not results:
+        return jsonify({'error': 'Faça uma análise primeiro'}), 400
+    
+    try:
+        policy = _build_policy(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    plan = policy.plan(results)
+    plan['selected'] = {cat_id: len(files) for cat_id, files in plan['selected'].items()}
+    return jsonify(plan)
+
+
+@app.route('/api/policy/apply', methods=['POST'])
+def policy_apply():
+    """Remove os arquivos mais antigos até atingir a meta de espaço livre."""
+    data = request.get_json() or {}
+    scan_job, results = _scan_results(data.get('job_id'))
+    if not results:
+        return jsonify({'error': 'Faça uma análise primeiro'}), 400
+    
+    try:
+        policy = _build_policy(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # O plano é recalculado aqui para refletir o espaço livre atual
+    plan = policy.plan(results)
+    if not plan['total_files']:
+        return jsonify({'message': 'Meta de espaço livre já atingida', 'plan': plan})
+    
+    try:
+        params = _job_params(data, policy=True)
+        job = _submit_clean(scan_job, _policy_results(plan, results), params, partial=True)
+    except JobConflictError as e:
+        return _conflict_response(e)
+    
+    plan['selected'] = {cat_id: len(files) for cat_id, files in plan['selected'].items()}
+    return jsonify({'message': 'Limpeza por meta iniciada', 'plan': plan, 'job_id': job.id})
+
+
+@app.route('/api/cancel', methods=['POST'])
+def cancel_operation():
+    """Cancela a tarefa 'job_id' ou todas as análises e limpezas ativas."""
+    data = request.get_json(silent=True) or {}
+    job_id = data.get('job_id')
+    
+    cancelled = jobs.cancel(job_id)
+    if job_id and not cancelled:
+        return jsonify({'error': 'Tarefa não encontrada ou já concluída'}), 404
+    
+    if cancelled:
+        add_log('⏹️ Cancelamento solicitado...', 'warning')
+    return jsonify({
+        'message': 'Cancelamento solicitado' if cancelled else 'Nenhuma operação em andamento',
+        'job_ids': [job.id for job in cancelled]
+    })
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Métricas de desempenho no formato de texto do Prometheus."""
+    counts = {}
+    for job in jobs.list():
+        counts[(job.kind, job.status)] = counts.get((job.kind, job.status), 0) + 1
+    for kind in JOB_KINDS:
+        for status in JOB_STATES:
+            metrics.JOBS.labels(kind=kind, status=status).set(counts.get((kind, status), 0))
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Lista as tarefas (ativas e recentes)."""
+    return jsonify([jobs.snapshot(job) for job in jobs.list()])
+
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Retorna o estado e o resultado de uma tarefa."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    
+    data = jobs.snapshot(job)
+    result = job.result
+    if job.kind == 'scan':
+        data['result'] = _summarize_scan(result or {})
+    else:
+        data['result'] = result
+    return jsonify(data)
+
+
+@app.route('/api/jobs/<job_id>/profile')
+def get_job_profile(job_id):
+    """
+    Resumo do perfil de uma tarefa executada com 'profile': true.
+    
+    Query params:
+        limit: Quantidade de funções (padrão 25)
+        sort: 'cumulative' (padrão), 'tottime' ou 'ncalls'
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    if job.profile_path is None:
+        return jsonify({'error': 'Tarefa não foi executada com perfil'}), 404
+    if job.is_active:
+        return jsonify({'error': 'Tarefa ainda em andamento'}), 409
+    
+    try:
+        limit = max(1, request.args.get('limit', DEFAULT_TOP, type=int))
+        summary = summarize(job.profile_path, limit, request.args.get('sort', 'cumulative'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except OSError:
+        return jsonify({'error': 'Arquivo de perfil não encontrado'}), 404
+    
+    summary['job_id'] = job.id
+    return jsonify(summary)
+
+
+@app.route('/api/jobs/<job_id>/trace')
+def get_job_trace(job_id):
+    """
+    Linha do tempo (Chrome trace-event) de uma tarefa executada com 'trace': true.
+    
+    Abra o arquivo em chrome://tracing ou ui.perfetto.dev.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    if job.trace_path is None:
+        return jsonify({'error': 'Tarefa não foi executada com trace'}), 404
+    if job.is_active:
+        return jsonify({'error': 'Tarefa ainda em andamento'}), 409
+    if not job.trace_path.exists():
+        return jsonify({'error': 'Arquivo de trace não encontrado'}), 404
+    
+    return send_file(str(job.trace_path), mimetype='application/json',
+                     as_attachment=True, download_name=job.trace_path.name)
 
 
 @app.route('/api/update', methods=['POST'])
 def start_update():
     """Executa git pull para atualizar a aplicação."""
-    if app_state['is_updating']:
+    try:
+        job = jobs.submit('update', update_thread)
+    except JobConflictError:
         return jsonify({'error': 'Atualização já em andamento'}), 400
     
-    # Inicia atualização em thread separada
-    thread = threading.Thread(target=update_thread)
-    thread.daemon = True
-    thread.start()
-    
-    return jsonify({'message': 'Atualização iniciada'})
+    return jsonify({'message': 'Atualização iniciada', 'job_id': job.id})
 
 
-def update_thread():
+def update_thread(job):
     """Thread de atualização."""
     try:
-        app_state['is_updating'] = True
-        app_state['status'] = 'updating'
-        app_state['current_task'] = 'Atualizando aplicação...'
+        jobs.update(job, current_task='Atualizando aplicação...')
         
         add_log('', 'info')
         add_log('🔄 Verificando atualizações...', 'header')
@@ -348,24 +1120,45 @@ def update_thread():
         else:
             add_log(f'⚠️ Erro na atualização: {result.stderr}', 'warning')
         
-        app_state['status'] = 'idle'
-        app_state['current_task'] = ''
+        jobs.update(job, current_task='')
+        return {'returncode': result.returncode}
         
     except subprocess.TimeoutExpired:
         add_log('❌ Tempo esgotado durante atualização', 'error')
-        app_state['status'] = 'error'
+        raise
     except Exception as e:
         add_log(f'❌ Erro na atualização: {str(e)}', 'error')
         logger.error(f"Erro na atualização: {e}")
-        app_state['status'] = 'error'
-    finally:
-        app_state['is_updating'] = False
+        raise
+
+
+@app.route('/api/logs')
+def get_logs():
+    """
+    Retorna apenas as linhas de log novas.
+    
+    Parâmetros (query string):
+        after: Último 'seq' que o cliente já recebeu (padrão 0)
+        limit: Quantidade máxima de linhas
+        
+    'dropped' informa quantas linhas o cliente perdeu porque saíram do
+    buffer antes de serem buscadas.
+    """
+    after = request.args.get('after', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    
+    entries, dropped = logs.since(after, limit)
+    return jsonify({
+        'logs': entries,
+        'dropped': dropped,
+        'last_seq': logs.last_seq
+    })
 
 
 @app.route('/api/clear-logs', methods=['POST'])
 def clear_logs():
     """Limpa os logs."""
-    app_state['logs'] = []
+    clear_log_entries()
     return jsonify({'message': 'Logs limpos'})
 
 
@@ -377,10 +1170,33 @@ def serve_project_assets(filename):
     return send_from_directory(str(assets_dir), filename)
 
 
-def run_api(host='0.0.0.0', port=5000, debug=False):
-    """Inicia o servidor da API."""
+def run_api(host='0.0.0.0', port=5000, debug=False, server='auto',
+            threads=DEFAULT_THREADS, backlog=DEFAULT_BACKLOG, keepalive=DEFAULT_KEEPALIVE,
+            profile=False, trace=False):
+    """
+    Inicia o servidor da API.
+
+    Args:
+        host: Endereço de escuta
+        port: Porta
+        debug: Usa o servidor de desenvolvimento com debug do Flask
+        server: Backend ('auto', 'waitress', 'builtin' ou 'dev')
+        threads: Quantidade de workers (metade no máximo para SSE e long-poll)
+        backlog: Limite da fila de conexões
+        keepalive: Timeout de inatividade das conexões (segundos)
+        profile: Executa análises e limpezas sob o cProfile por padrão
+        trace: Grava a linha do tempo das análises e limpezas por padrão
+    """
+    app.config['PROFILE_JOBS'] = profile
+    app.config['TRACE_JOBS'] = trace
+    long_requests.limit = long_request_limit(threads)
+    precompress_assets(FRONTEND_DIST)
     logger.info(f"Iniciando API em http://{host}:{port}")
-    app.run(host=host, port=port, debug=debug, threaded=True)
+    if debug:
+        app.run(host=host, port=port, debug=True, threaded=True)
+        return
+    serve(app, host=host, port=port, server=server, threads=threads,
+          backlog=backlog, keepalive=keepalive)
 
 
 if __name__ == '__main__':
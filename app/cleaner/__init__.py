@@ -1,12 +1,26 @@
 # Módulo de limpeza - limpeza_david
 # Suporta Windows e Linux
 
-import platform
+import sys
 
-# Importa apenas o cleaner apropriado para o sistema operacional
-if platform.system() == 'Windows':
-    from .windows import WindowsCleaner
-    __all__ = ['WindowsCleaner']
-else:
+# O cleaner de cada sistema só é importado quando usado
+__all__ = ['WindowsCleaner'] if sys.platform == 'win32' else ['LinuxCleaner']
+
+
+def get_system_cleaner():
+    """Retorna a classe do cleaner do sistema operacional atual."""
+    if sys.platform == 'win32':
+        from .windows import WindowsCleaner
+        return WindowsCleaner
     from .linux import LinuxCleaner
-    __all__ = ['LinuxCleaner']
+    return LinuxCleaner
+
+
+def __getattr__(name):
+    if name == 'WindowsCleaner':
+        from .windows import WindowsCleaner
+        return WindowsCleaner
+    if name == 'LinuxCleaner':
+        from .linux import LinuxCleaner
+        return LinuxCleaner
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
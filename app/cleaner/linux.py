@@ -8,16 +8,38 @@ Descrição: Implementa a limpeza de arquivos temporários, cache e
 """
 
 import os
-import shutil
+import logging
 import subprocess
 from pathlib import Path
-from typing import List, Tuple, Dict
-from datetime import datetime, timedelta
+from typing import List, Tuple, Dict, Optional
 
 # Importa utilitários
-import sys
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app.utils import get_logger, safe_remove_file, safe_remove_dir, get_file_size
+from app.utils import (
+    get_logger, safe_remove_file, safe_remove_dir, get_file_size,
+    CancelToken, is_cancelled
+)
+from app import metrics, tracing
+from app.cleaner import rules
+from app.cleaner.rules import Category, Rule, HOUR, DAY
+
+
+# Orçamento padrão (em bytes) para caches de desenvolvimento em ~/.cache.
+# Esses caches não são apagados por 'user_cache'; no modo orçamento apenas
+# os arquivos acessados há mais tempo são removidos até caber no limite.
+DEFAULT_CACHE_BUDGETS = {
+    'pip': 1024 ** 3,
+    'npm': 1024 ** 3,
+    'yarn': 1024 ** 3,
+    'go-build': 2 * 1024 ** 3,
+    'cargo': 2 * 1024 ** 3,
+    'rustup': 2 * 1024 ** 3,
+}
+
+# IDs das categorias embutidas (não podem ser redefinidos pelo usuário)
+BUILTIN_CATEGORIES = (
+    'tmp', 'user_cache', 'dev_cache_budget', 'browser_cache', 'thumbnails', 'trash',
+    'old_logs', 'package_cache', 'journal', 'crash_reports', 'recent_docs',
+)
 
 
 class LinuxCleaner:
@@ -26,10 +48,23 @@ class LinuxCleaner:
     Remove arquivos temporários, cache e arquivos desnecessários.
     """
     
-    def __init__(self):
+    def __init__(self, cache_budgets: Dict[str, int] = None,
+                 home: Path = None, uid: int = None):
+        """
+        Args:
+            cache_budgets: Limites por cache de desenvolvimento
+            home: Diretório pessoal analisado (padrão: o do usuário atual)
+            uid: Dono aceito fora de /tmp (padrão: o usuário atual); em
+                 modo root cada usuário usa o próprio (ver multiuser)
+        """
         self.logger = get_logger("LinuxCleaner")
-        self.user_home = Path.home()
-        self.uid = os.getuid()
+        self.user_home = Path(home) if home is not None else Path.home()
+        self.uid = uid if uid is not None else os.getuid()
+        
+        # Limite de tamanho por diretório de cache de desenvolvimento
+        self.cache_budgets = dict(DEFAULT_CACHE_BUDGETS)
+        if cache_budgets:
+            self.cache_budgets.update(cache_budgets)
         
         # Diretórios protegidos - NUNCA apagar
         self.protected_dirs = {
@@ -65,144 +100,144 @@ class LinuxCleaner:
             'fstab', 'hostname', 'hosts'
         }
         
+        # Categorias do usuário só valem para o próprio usuário (no modo
+        # root, cada home analisada usa apenas as embutidas)
+        self.user_categories = (
+            rules.load_user_categories(reserved=BUILTIN_CATEGORIES) if home is None else []
+        )
+        self.categories = self._build_categories()
+        
+    def _build_categories(self) -> Dict[str, Category]:
+        """
+        Monta as categorias embutidas como conjuntos de regras.
+
+        Raízes compartilhadas (~/.cache, /var/log) são percorridas uma só
+        vez quando várias categorias são analisadas juntas.
+        """
+        home = str(self.user_home)
+        cache_dir = os.path.join(home, ".cache")
+        builtin = [
+            Category('tmp', 'Temp (/tmp)', '📁', 'Arquivos temporários do sistema', (
+                # Itens do primeiro nível modificados há menos de 1 hora ficam
+                Rule('/tmp', min_age=HOUR, age_of='top'),
+            )),
+            Category('user_cache', 'Cache Usuário', '💾', 'Cache em ~/.cache', (
+                # Os caches de desenvolvimento têm o modo orçamento
+                Rule(cache_dir, exclude=tuple(
+                    '/' + name for name in (*DEFAULT_CACHE_BUDGETS, 'mesa_shader_cache', 'fontconfig')
+                )),
+            )),
+            Category('dev_cache_budget', 'Caches Dev (limite)', '🧰',
+                     'Mantém pip, npm, cargo etc. dentro do limite de tamanho', tuple(
+                # Os links contam no uso do cache, como no du
+                Rule(os.path.join(cache_dir, name), budget=budget, symlinks=True)
+                for name, budget in self.cache_budgets.items() if budget is not None
+            )),
+            Category('browser_cache', 'Navegadores', '🌐', 'Cache do Chrome, Firefox, etc.', tuple(
+                Rule(os.path.join(home, path)) for path in (
+                    ".config/google-chrome/Default/Cache",
+                    ".config/google-chrome/Default/Code Cache",
+                    ".config/chromium/Default/Cache",
+                    ".config/chromium/Default/Code Cache",
+                    ".config/BraveSoftware/Brave-Browser/Default/Cache",
+                    ".config/opera/Cache",
+                    ".mozilla/firefox/*.default*/cache2",
+                )
+            )),
+            Category('thumbnails', 'Miniaturas', '🖼️', 'Cache de miniaturas de imagens', (
+                Rule(os.path.join(cache_dir, "thumbnails")),
+            )),
+            Category('trash', 'Lixeira', '🗑️', 'Arquivos na lixeira do usuário', (
+                Rule(os.path.join(home, ".local/share/Trash/files")),
+                Rule(os.path.join(home, ".local/share/Trash/info")),
+            )),
+            Category('old_logs', 'Logs Antigos', '📝', 'Arquivos de log antigos', tuple(
+                Rule(root, include=('*.log', '*.log.*', '*.old', '*.gz'), min_age=7 * DAY)
+                for root in ("/var/log", os.path.join(home, ".local/share/xorg"))
+            )),
+            Category('package_cache', 'Cache Pacotes', '📦', 'Cache do apt/dnf/pacman', (
+                Rule("/var/cache/apt/archives", include=('*.deb',)),
+                Rule("/var/cache/dnf"),
+                Rule("/var/cache/pacman/pkg", include=('*.pkg.tar.*',)),
+            )),
+            Category('journal', 'Journal Logs', '📋', 'Logs do systemd journal', (
+                Rule('/var/log/journal'),
+            )),
+            Category('crash_reports', 'Relatórios Crash', '💥', 'Relatórios de falhas do sistema', (
+                Rule('/var/crash'),
+                Rule(os.path.join(home, '.local/share/apport')),
+            )),
+            Category('recent_docs', 'Docs Recentes', '📄', 'Histórico de documentos recentes', (
+                Rule(os.path.join(home, '.local/share/recently-used.xbel')),
+            )),
+        ]
+        categories = {category.id: category for category in builtin}
+        for category in self.user_categories:
+            if category.id not in categories:
+                categories[category.id] = category
+        return categories
+
     def get_categories(self) -> Dict[str, Dict]:
         """
         Retorna as categorias de limpeza disponíveis.
         """
         return {
-            'tmp': {
-                'name': 'Temp (/tmp)',
-                'icon': '📁',
-                'description': 'Arquivos temporários do sistema'
-            },
-            'user_cache': {
-                'name': 'Cache Usuário',
-                'icon': '💾',
-                'description': 'Cache em ~/.cache'
-            },
-            'browser_cache': {
-                'name': 'Navegadores',
-                'icon': '🌐',
-                'description': 'Cache do Chrome, Firefox, etc.'
-            },
-            'thumbnails': {
-                'name': 'Miniaturas',
-                'icon': '🖼️',
-                'description': 'Cache de miniaturas de imagens'
-            },
-            'trash': {
-                'name': 'Lixeira',
-                'icon': '🗑️',
-                'description': 'Arquivos na lixeira do usuário'
-            },
-            'old_logs': {
-                'name': 'Logs Antigos',
-                'icon': '📝',
-                'description': 'Arquivos de log antigos'
-            },
-            'package_cache': {
-                'name': 'Cache Pacotes',
-                'icon': '📦',
-                'description': 'Cache do apt/dnf/pacman'
-            },
-            'journal': {
-                'name': 'Journal Logs',
-                'icon': '📋',
-                'description': 'Logs do systemd journal'
-            },
-            'crash_reports': {
-                'name': 'Relatórios Crash',
-                'icon': '💥',
-                'description': 'Relatórios de falhas do sistema'
-            },
-            'recent_docs': {
-                'name': 'Docs Recentes',
-                'icon': '📄',
-                'description': 'Histórico de documentos recentes'
+            cat_id: {
+                'name': category.name,
+                'icon': category.icon,
+                'description': category.description
             }
+            for cat_id, category in self.categories.items()
         }
-        
-    def scan_category(self, category: str) -> Tuple[List[str], int]:
+
+    def get_category_roots(self) -> Dict[str, List[Dict]]:
+        """
+        Retorna as raízes de cada categoria para a estimativa rápida.
+
+        Derivadas das regras (ver app.estimator.SizeEstimator para o
+        formato de cada raiz).
+        """
+        return rules.estimator_roots(self.categories.values())
+
+    def scan_category(self, category: str, cancel_token: CancelToken = None) -> Tuple[List[str], int]:
         """
         Escaneia uma categoria e retorna os arquivos encontrados.
         
         Args:
             category: ID da categoria
+            cancel_token: Token de cancelamento; se cancelado, a análise
+                          para e retorna o que já foi encontrado
             
         Returns:
             Tupla com lista de arquivos e tamanho total
         """
-        scan_methods = {
-            'tmp': self._scan_tmp,
-            'user_cache': self._scan_user_cache,
-            'browser_cache': self._scan_browser_cache,
-            'thumbnails': self._scan_thumbnails,
-            'old_logs': self._scan_old_logs,
-            'trash': self._scan_trash,
-            'package_cache': self._scan_package_cache,
-            'journal': self._scan_journal,
-            'crash_reports': self._scan_crash_reports,
-            'recent_docs': self._scan_recent_docs,
-        }
-        
-        method = scan_methods.get(category)
-        if method:
-            return method()
-        return [], 0
-    
-    def _scan_journal(self) -> Tuple[List[str], int]:
-        """Escaneia logs do journal do systemd."""
-        files = []
-        total_size = 0
-        journal_dir = Path('/var/log/journal')
-        
-        if journal_dir.exists():
-            try:
-                for f in journal_dir.rglob('*'):
-                    if f.is_file() and self._is_safe_to_delete(f):
-                        size = get_file_size(f)
-                        files.append(str(f))
-                        total_size += size
-            except PermissionError:
-                pass
-        return files, total_size
-    
-    def _scan_crash_reports(self) -> Tuple[List[str], int]:
-        """Escaneia relatórios de crash."""
-        files = []
-        total_size = 0
-        crash_dirs = [
-            Path('/var/crash'),
-            self.user_home / '.local/share/apport',
-        ]
-        
-        for crash_dir in crash_dirs:
-            if crash_dir.exists():
-                try:
-                    for f in crash_dir.rglob('*'):
-                        if f.is_file() and self._is_safe_to_delete(f):
-                            size = get_file_size(f)
-                            files.append(str(f))
-                            total_size += size
-                except PermissionError:
-                    pass
-        return files, total_size
-    
-    def _scan_recent_docs(self) -> Tuple[List[str], int]:
-        """Escaneia histórico de documentos recentes."""
-        files = []
-        total_size = 0
-        recent_files = [
-            self.user_home / '.local/share/recently-used.xbel',
-        ]
-        
-        for f in recent_files:
-            if f.exists() and f.is_file():
-                size = get_file_size(f)
-                files.append(str(f))
-                total_size += size
-        return files, total_size
-        
+        return self.scan_categories([category], cancel_token).get(category, ([], 0))
+
+    def scan_categories(self, categories: List[str], cancel_token: CancelToken = None,
+                        on_progress=None, on_results=None,
+                        sizes: Dict[str, int] = None) -> Dict[str, Tuple[List[str], int]]:
+        """
+        Escaneia várias categorias numa única varredura.
+
+        Args:
+            categories: IDs das categorias (os desconhecidos são ignorados)
+            cancel_token: Token de cancelamento
+            on_progress: Callback (raízes concluídas, total, raiz que começa)
+            on_results: Callback com os resultados parciais após cada raiz
+            sizes: Preenchido com {caminho: bytes} dos arquivos selecionados
+                   (repassado a clean_files evita medir tudo de novo)
+
+        Returns:
+            Dicionário categoria -> (arquivos, tamanho total)
+        """
+        selected = [self.categories[c] for c in categories if c in self.categories]
+        return rules.scan_categories(
+            selected, self._is_safe_to_delete, uid=self.uid,
+            cancel_token=cancel_token, on_progress=on_progress, logger=self.logger,
+            on_results=on_results, sizes=sizes
+        )
+        
+    @tracing.traced('safety_check', 'safety')
     def _is_safe_to_delete(self, path: Path) -> bool:
         """
         Verifica se é seguro deletar um arquivo/diretório.
@@ -248,279 +283,44 @@ class LinuxCleaner:
             
         except Exception:
             return False
-            
-    def _scan_directory(self, directory: Path, patterns: List[str] = None, 
-                       max_age_days: int = None) -> Tuple[List[str], int]:
-        """
-        Escaneia um diretório e retorna arquivos encontrados.
         
-        Args:
-            directory: Diretório a escanear
-            patterns: Padrões de arquivo (glob)
-            max_age_days: Idade máxima em dias (arquivos mais antigos)
+    def _removal_base(self, file_path: str) -> Optional[str]:
         """
-        files = []
-        total_size = 0
-        
-        if not directory.exists():
-            return files, total_size
-            
-        try:
-            if patterns:
-                for pattern in patterns:
-                    for file_path in directory.rglob(pattern):
-                        if self._check_file(file_path, max_age_days):
-                            size = get_file_size(file_path)
-                            files.append(str(file_path))
-                            total_size += size
-            else:
-                for file_path in directory.rglob('*'):
-                    if self._check_file(file_path, max_age_days):
-                        size = get_file_size(file_path)
-                        files.append(str(file_path))
-                        total_size += size
-                        
-        except PermissionError:
-            self.logger.warning(f"Sem permissão para acessar: {directory}")
-        except Exception as e:
-            self.logger.error(f"Erro ao escanear {directory}: {e}")
-            
-        return files, total_size
-        
-    def _check_file(self, file_path: Path, max_age_days: int = None) -> bool:
-        """Verifica se um arquivo deve ser incluído na lista."""
-        if not file_path.is_file():
-            return False
-            
-        if not self._is_safe_to_delete(file_path):
-            return False
-            
-        if max_age_days:
-            try:
-                mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
-                age = datetime.now() - mtime
-                if age.days < max_age_days:
-                    return False
-            except:
-                pass
-                
-        return True
-        
-    def _scan_tmp(self) -> Tuple[List[str], int]:
-        """Escaneia /tmp (arquivos com mais de 1 dia)."""
-        files = []
-        total_size = 0
-        
-        tmp_dir = Path("/tmp")
-        
-        if tmp_dir.exists():
-            for item in tmp_dir.iterdir():
-                try:
-                    # Pula arquivos muito recentes (menos de 1 hora)
-                    mtime = datetime.fromtimestamp(item.stat().st_mtime)
-                    age = datetime.now() - mtime
-                    
-                    if age < timedelta(hours=1):
-                        continue
-                        
-                    if self._is_safe_to_delete(item):
-                        if item.is_file():
-                            size = get_file_size(item)
-                            files.append(str(item))
-                            total_size += size
-                        elif item.is_dir():
-                            f, s = self._scan_directory(item)
-                            files.extend(f)
-                            total_size += s
-                except PermissionError:
-                    continue
-                except Exception as e:
-                    self.logger.debug(f"Erro ao verificar {item}: {e}")
-                    
-        return files, total_size
-        
-    def _scan_var_tmp(self) -> Tuple[List[str], int]:
-        """Escaneia /var/tmp (arquivos com mais de 7 dias)."""
-        var_tmp = Path("/var/tmp")
-        return self._scan_directory(var_tmp, max_age_days=7)
-        
-    def _scan_user_cache(self) -> Tuple[List[str], int]:
-        """Escaneia cache do usuário ~/.cache."""
-        cache_dir = self.user_home / ".cache"
-        
-        # Exclui caches importantes
-        exclude_dirs = {
-            'pip', 'npm', 'yarn', 'go-build', 'cargo', 'rustup',
-            'mesa_shader_cache', 'fontconfig'
-        }
-        
-        files = []
-        total_size = 0
-        
-        if cache_dir.exists():
-            for item in cache_dir.iterdir():
-                if item.name in exclude_dirs:
-                    continue
-                    
-                if item.is_dir():
-                    f, s = self._scan_directory(item)
-                    files.extend(f)
-                    total_size += s
-                elif item.is_file() and self._is_safe_to_delete(item):
-                    size = get_file_size(item)
-                    files.append(str(item))
-                    total_size += size
-                    
-        return files, total_size
-        
-    def _scan_browser_cache(self) -> Tuple[List[str], int]:
-        """Escaneia cache de navegadores."""
-        files = []
-        total_size = 0
-        
-        # Chrome/Chromium
-        chrome_paths = [
-            self.user_home / ".config/google-chrome/Default/Cache",
-            self.user_home / ".config/google-chrome/Default/Code Cache",
-            self.user_home / ".config/chromium/Default/Cache",
-            self.user_home / ".config/chromium/Default/Code Cache",
-        ]
-        
-        # Firefox
-        firefox_profiles = self.user_home / ".mozilla/firefox"
-        
-        # Brave
-        brave_paths = [
-            self.user_home / ".config/BraveSoftware/Brave-Browser/Default/Cache",
-        ]
-        
-        # Opera
-        opera_paths = [
-            self.user_home / ".config/opera/Cache",
-        ]
-        
-        all_paths = chrome_paths + brave_paths + opera_paths
-        
-        for cache_path in all_paths:
-            if cache_path.exists():
-                f, s = self._scan_directory(cache_path)
-                files.extend(f)
-                total_size += s
-                
-        # Firefox - precisa buscar perfis
-        if firefox_profiles.exists():
-            for profile in firefox_profiles.iterdir():
-                if profile.is_dir() and '.default' in profile.name:
-                    cache_path = profile / "cache2"
-                    if cache_path.exists():
-                        f, s = self._scan_directory(cache_path)
-                        files.extend(f)
-                        total_size += s
-                        
-        return files, total_size
-        
-    def _scan_thumbnails(self) -> Tuple[List[str], int]:
-        """Escaneia cache de thumbnails."""
-        thumbnails_dir = self.user_home / ".cache/thumbnails"
-        return self._scan_directory(thumbnails_dir)
-        
-    def _scan_old_logs(self) -> Tuple[List[str], int]:
-        """Escaneia logs antigos (arquivos com mais de 7 dias)."""
-        files = []
-        total_size = 0
-        
-        log_dirs = [
-            Path("/var/log"),
-            self.user_home / ".local/share/xorg",
-        ]
-        
-        patterns = ['*.log', '*.log.*', '*.old', '*.gz']
-        
-        for log_dir in log_dirs:
-            if log_dir.exists():
-                f, s = self._scan_directory(log_dir, patterns=patterns, max_age_days=7)
-                files.extend(f)
-                total_size += s
-                
-        return files, total_size
-        
-    def _scan_trash(self) -> Tuple[List[str], int]:
-        """Escaneia a lixeira do usuário."""
-        files = []
-        total_size = 0
-        
-        trash_paths = [
-            self.user_home / ".local/share/Trash/files",
-            self.user_home / ".local/share/Trash/info",
-        ]
-        
-        for trash_path in trash_paths:
-            if trash_path.exists():
-                f, s = self._scan_directory(trash_path)
-                files.extend(f)
-                total_size += s
-                
-        return files, total_size
-        
-    def _scan_old_files(self) -> Tuple[List[str], int]:
-        """Escaneia arquivos de backup antigos."""
-        patterns = ['*.old', '*.bak', '*.backup', '*~', '*.swp', '*.swo']
-        
-        scan_dirs = [
-            self.user_home,
-            self.user_home / ".config",
-        ]
-        
-        files = []
-        total_size = 0
-        
-        for scan_dir in scan_dirs:
-            # Limita a profundidade para evitar escanear muitos arquivos
-            if scan_dir.exists():
-                for pattern in patterns:
-                    for file_path in scan_dir.glob(pattern):
-                        if file_path.is_file() and self._is_safe_to_delete(file_path):
-                            size = get_file_size(file_path)
-                            files.append(str(file_path))
-                            total_size += size
-                            
-        return files, total_size
-        
-    def _scan_package_cache(self) -> Tuple[List[str], int]:
-        """Escaneia cache de gerenciadores de pacotes."""
-        files = []
-        total_size = 0
-        
-        # APT (Debian/Ubuntu)
-        apt_cache = Path("/var/cache/apt/archives")
-        if apt_cache.exists():
-            f, s = self._scan_directory(apt_cache, patterns=['*.deb'])
-            files.extend(f)
-            total_size += s
-            
-        # DNF/YUM (Fedora/RHEL)
-        dnf_cache = Path("/var/cache/dnf")
-        if dnf_cache.exists():
-            f, s = self._scan_directory(dnf_cache)
-            files.extend(f)
-            total_size += s
-            
-        # Pacman (Arch)
-        pacman_cache = Path("/var/cache/pacman/pkg")
-        if pacman_cache.exists():
-            f, s = self._scan_directory(pacman_cache, patterns=['*.pkg.tar.*'])
-            files.extend(f)
-            total_size += s
-            
-        return files, total_size
-        
-    def clean_files(self, files: List[str], on_file_removed=None) -> Tuple[int, int, int, List[str]]:
+        Diretório a partir do qual a remoção não segue links.
+
+        Entre a análise e a remoção o dono de um diretório pode trocá-lo
+        por um link; se quem remove é outro usuário (root limpando uma
+        home, ou o /tmp compartilhado), o caminho é aberto a partir da
+        home ou do diretório temporário sem seguir links (app.remover).
+        """
+        if not hasattr(os, 'geteuid'):
+            return None
+        euid = os.geteuid()
+        bases = [str(self.user_home)] if self.uid != euid else []
+        if euid == 0:
+            bases += ['/tmp', '/var/tmp']
+        for base in bases:
+            if file_path.startswith(base.rstrip(os.sep) + os.sep):
+                return base
+        return None
+        
+    def clean_files(self, files: List[str], on_file_removed=None,
+                    cancel_token: CancelToken = None,
+                    sizes: Dict[str, int] = None,
+                    on_dir_report=None) -> Tuple[int, int, int, List[str]]:
         """
         Remove os arquivos da lista.
         
         Args:
             files: Lista de caminhos de arquivos
             on_file_removed: Callback opcional chamado quando arquivo é removido
+            cancel_token: Token de cancelamento (verificado a cada arquivo)
+            sizes: Tamanhos medidos na análise ({caminho: bytes}, ver
+                   scan_categories); arquivos ausentes são medidos, e
+                   diretórios contam o que a remoção liberou
+            on_dir_report: Callback opcional (caminho, RemovalReport) para cada
+                           diretório; traz os motivos das falhas e os totais
+                           por subárvore de uma remoção parcial
             
         Returns:
             Tupla com (arquivos removidos, tamanho liberado, erros, lista de erros)
@@ -529,43 +329,61 @@ class LinuxCleaner:
         size_freed = 0
         errors = 0
         error_files = []
+        # Decidido uma vez por lote: sem DEBUG, nenhum registro por arquivo
+        log_removed = self.logger.isEnabledFor(logging.DEBUG)
         
-        for file_path in files:
-            try:
-                path = Path(file_path)
+        with tracing.span('delete_batch', 'delete', files=len(files)):
+            for file_path in files:
+                if is_cancelled(cancel_token):
+                    break
                 
-                if not path.exists():
-                    continue
+                try:
+                    path = Path(file_path)
+                
+                    if not path.exists():
+                        continue
                     
-                if not self._is_safe_to_delete(path):
-                    self.logger.warning(f"Arquivo protegido ignorado: {file_path}")
-                    errors += 1
-                    error_files.append(file_path)
-                    continue
+                    if not self._is_safe_to_delete(path):
+                        self.logger.warning("Arquivo protegido ignorado: %s", file_path)
+                        errors += 1
+                        error_files.append(file_path)
+                        continue
                     
-                size = get_file_size(path)
-                
-                if path.is_file() or path.is_symlink():
-                    success = safe_remove_file(path)
-                else:
-                    success = safe_remove_dir(path)
+                    base = self._removal_base(file_path)
+                    if path.is_file() or path.is_symlink():
+                        size = sizes.get(file_path) if sizes else None
+                        if size is None:
+                            size = get_file_size(path)
+                        success = safe_remove_file(path, base)
+                    else:
+                        report = safe_remove_dir(path, cancel_token=cancel_token, base=base)
+                        success = bool(report)
+                        if on_dir_report:
+                            on_dir_report(file_path, report)
+                        # Conta o que saiu de fato, inclusive numa remoção parcial
+                        size = report.bytes
+                        if not success:
+                            size_freed += size
                     
-                if success:
-                    removed += 1
-                    size_freed += size
-                    self.logger.debug(f"Removido: {file_path}")
-                    # Chamar callback se fornecido
-                    if on_file_removed:
-                        on_file_removed(file_path, size)
-                else:
+                    if success:
+                        removed += 1
+                        size_freed += size
+                        if log_removed:
+                            self.logger.debug("Removido: %s", file_path)
+                        # Chamar callback se fornecido
+                        if on_file_removed:
+                            on_file_removed(file_path, size)
+                    else:
+                        errors += 1
+                        error_files.append(file_path)
+                    
+                except Exception as e:
+                    self.logger.error("Erro ao remover %s: %s", file_path, e)
                     errors += 1
                     error_files.append(file_path)
-                    
-            except Exception as e:
-                self.logger.error(f"Erro ao remover {file_path}: {e}")
-                errors += 1
-                error_files.append(file_path)
                 
+        metrics.FILES_REMOVED.inc(removed)
+        metrics.BYTES_RECLAIMED.inc(size_freed)
         return removed, size_freed, errors, error_files
         
     def clean_apt_cache(self) -> bool:
@@ -586,7 +404,7 @@ class LinuxCleaner:
             return False
 
 
-# Para testes diretos
+# Para testes diretos (python -m app.cleaner.linux)
 if __name__ == "__main__":
     cleaner = LinuxCleaner()
     
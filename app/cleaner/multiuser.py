@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Análise Multiusuário (Linux)
+Autor: David Fernandes
+Descrição: Em modo root, enumera os usuários locais de /etc/passwd e
+           analisa caches, miniaturas e lixeira de cada um em paralelo,
+           com um LinuxCleaner por usuário (regras de dono por usuário).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from app.utils import get_logger, CancelToken, is_cancelled
+from app import tracing
+from app.cleaner.linux import LinuxCleaner
+
+
+# Arquivo de contas locais
+PASSWD_PATH = Path('/etc/passwd')
+
+# Contas de sistema ficam abaixo deste UID
+MIN_UID = 1000
+
+# Shells de contas sem login
+NOLOGIN_SHELLS = {'/usr/sbin/nologin', '/sbin/nologin', '/bin/false', '/usr/bin/false', ''}
+
+# Categorias que ficam no diretório pessoal de cada usuário
+USER_CATEGORIES = (
+    'user_cache', 'dev_cache_budget', 'browser_cache',
+    'thumbnails', 'trash', 'recent_docs',
+)
+
+# Usuários analisados em paralelo
+DEFAULT_WORKERS = 4
+
+# Separador entre categoria e usuário nas chaves dos resultados
+USER_KEY_SEP = '@'
+
+
+class LocalUser(NamedTuple):
+    """Conta local lida de /etc/passwd."""
+    name: str
+    uid: int
+    home: Path
+
+
+def list_local_users(passwd: Path = PASSWD_PATH, min_uid: int = MIN_UID) -> List[LocalUser]:
+    """
+    Lista as contas humanas locais.
+
+    Mantém apenas contas com UID >= min_uid (exceto 'nobody'), com shell de
+    login e diretório pessoal existente. Contas de NSS/LDAP não aparecem
+    em /etc/passwd e são ignoradas de propósito.
+    """
+    users = []
+    seen_homes = set()
+    try:
+        with open(passwd, encoding='utf-8', errors='replace') as f:
+            lines = f.readlines()
+    except OSError as e:
+        get_logger("MultiUser").error(f"Erro ao ler {passwd}: {e}")
+        return users
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split(':')
+        if len(fields) < 7:
+            continue
+        name, _pw, uid, _gid, _gecos, home, shell = fields[:7]
+        try:
+            uid = int(uid)
+        except ValueError:
+            continue
+        if uid < min_uid or name == 'nobody' or shell in NOLOGIN_SHELLS:
+            continue
+        home = Path(home)
+        # Contas que compartilham o diretório pessoal são analisadas uma vez
+        if home in seen_homes or not home.is_dir():
+            continue
+        seen_homes.add(home)
+        users.append(LocalUser(name, uid, home))
+    return users
+
+
+def is_root() -> bool:
+    """Indica se o processo roda como root (necessário para ler outros usuários)."""
+    return hasattr(os, 'geteuid') and os.geteuid() == 0
+
+
+def user_key(category: str, user: str) -> str:
+    """Chave dos resultados por usuário (ex: 'trash@maria')."""
+    return f"{category}{USER_KEY_SEP}{user}"
+
+
+class MultiUserScanner:
+    """
+    Analisa as categorias pessoais de vários usuários em paralelo.
+
+    Cada usuário tem o próprio LinuxCleaner (home e UID do usuário), então
+    a verificação de dono aceita apenas arquivos daquele usuário.
+    """
+
+    def __init__(self, users: List[LocalUser] = None, max_workers: int = DEFAULT_WORKERS,
+                 cache_budgets: Dict[str, int] = None):
+        self.logger = get_logger("MultiUser")
+        self.users = list_local_users() if users is None else list(users)
+        self.max_workers = max(1, max_workers)
+        self.cleaners = {
+            user.name: LinuxCleaner(cache_budgets, home=user.home, uid=user.uid)
+            for user in self.users
+        }
+
+    def cleaner_for(self, user: str) -> LinuxCleaner:
+        """Cleaner de um usuário (para remover com as regras dele)."""
+        return self.cleaners[user]
+
+    def scan(self, categories: List[str], cancel_token: CancelToken = None,
+             on_user_done=None, sizes: Dict[str, int] = None
+             ) -> Dict[str, Dict[str, Tuple[List[str], int]]]:
+        """
+        Analisa as categorias pessoais de todos os usuários.
+
+        Args:
+            categories: Categorias pedidas (as que não são pessoais são ignoradas)
+            cancel_token: Token de cancelamento compartilhado pelos workers
+            on_user_done: Callback opcional (usuário, resultados) ao terminar cada usuário
+            sizes: Preenchido com {caminho: bytes} dos arquivos de todos os
+                   usuários (as homes não se sobrepõem)
+
+        Returns:
+            {usuário: {categoria: (arquivos, tamanho)}}
+        """
+        categories = [c for c in categories if c in USER_CATEGORIES]
+        if not categories or not self.users:
+            return {}
+
+        # Os workers herdam o tracer da tarefa
+        tracer = tracing.current_tracer()
+
+        def scan_user(user: LocalUser):
+            cleaner = self.cleaners[user.name]
+            results = {}
+            with tracing.activate(tracer), tracing.span(user.name, 'user'):
+                # Uma varredura por usuário para todas as categorias
+                if not is_cancelled(cancel_token):
+                    results = cleaner.scan_categories(categories, cancel_token, sizes=sizes)
+            if on_user_done:
+                on_user_done(user.name, results)
+            return user.name, results
+
+        per_user = {}
+        workers = min(self.max_workers, len(self.users))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='multiuser') as pool:
+            for name, results in pool.map(scan_user, self.users):
+                per_user[name] = results
+        return per_user
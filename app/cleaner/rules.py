@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Regras Declarativas de Categorias
+Autor: David Fernandes
+Descrição: Categorias de limpeza descritas como regras (raiz, padrões de
+           inclusão e exclusão, idade, tamanho, dono) e compiladas num
+           plano de varredura única: raízes iguais ou aninhadas de várias
+           categorias são percorridas uma só vez, e cada entrada é testada
+           contra todas as regras ativas no mesmo passo.
+
+Categorias do usuário podem ser definidas em JSON (ver
+load_user_categories), no arquivo apontado por LIMPEZA_DAVID_CATEGORIES
+ou em ~/.config/limpeza_david/categories.json (%APPDATA% no Windows):
+
+    {"categories": [{
+        "id": "logs_projetos", "name": "Logs de Projetos", "icon": "🧩",
+        "description": "Logs antigos em ~/projetos",
+        "rules": [{"root": "~/projetos", "include": ["*.log"],
+                   "exclude": ["node_modules"], "min_age_days": 30}]
+    }]}
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import stat
+import time
+import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app import metrics, tracing
+from app.policy import select_lru
+from app.sizes import allocated_size
+from app.utils import get_logger, is_cancelled, format_size
+
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Nomes diferenciam maiúsculas de minúsculas só fora do Windows
+_GLOB_FLAGS = re.IGNORECASE if sys.platform == 'win32' else 0
+
+
+class Rule(NamedTuple):
+    """
+    Uma regra de seleção de arquivos.
+
+    Padrões sem '/' são comparados com o nome da entrada; com '/', com o
+    caminho relativo à raiz ('/nome' só casa no primeiro nível). Um
+    diretório excluído não é percorrido. Só arquivos regulares são
+    selecionados (e links simbólicos, se a regra permitir); FIFOs,
+    sockets e dispositivos nunca entram.
+    """
+    root: str                           # diretório ou arquivo; aceita curingas
+    include: Tuple[str, ...] = ()       # vazio = todos os arquivos
+    exclude: Tuple[str, ...] = ()
+    min_age: float = 0                  # segundos desde a última modificação
+    age_of: str = 'file'                # 'file' ou 'top' (a entrada do 1º nível sob a raiz)
+    min_size: int = 0
+    max_size: Optional[int] = None
+    owner: str = 'any'                  # 'any' ou 'user' (dono = usuário do cleaner)
+    max_depth: Optional[int] = None     # 1 = só as entradas diretas da raiz
+    budget: Optional[int] = None        # modo orçamento: só o excesso, menos usados primeiro
+    symlinks: bool = False              # aceita links simbólicos (remove o link, não o alvo)
+
+
+class Category(NamedTuple):
+    """Categoria de limpeza: metadados e conjunto de regras."""
+    id: str
+    name: str
+    icon: str
+    description: str
+    rules: Tuple[Rule, ...]
+    user_defined: bool = False
+
+
+class _Matcher:
+    """Lista de padrões fnmatch compilada em uma expressão por tipo."""
+
+    def __init__(self, patterns: Iterable[str]):
+        names = [p for p in patterns if '/' not in p]
+        paths = [p.lstrip('/') for p in patterns if '/' in p]
+        self.name_re = self._compile(names)
+        self.path_re = self._compile(paths)
+
+    @staticmethod
+    def _compile(patterns: List[str]):
+        if not patterns:
+            return None
+        return re.compile('|'.join(fnmatch.translate(p) for p in patterns), _GLOB_FLAGS)
+
+    def matches(self, name: str, rel: str) -> bool:
+        if self.name_re is not None and self.name_re.match(name):
+            return True
+        if self.path_re is not None:
+            return bool(self.path_re.match(rel.replace(os.sep, '/')))
+        return False
+
+
+class _Bound:
+    """Regra compilada e ligada a uma raiz já expandida."""
+
+    __slots__ = ('category', 'rule', 'root', 'root_len', 'include', 'exclude')
+
+    def __init__(self, category: str, rule: Rule, root: str):
+        self.category = category
+        self.rule = rule
+        self.root = root
+        self.root_len = len(root) if root.endswith(os.sep) else len(root) + 1
+        self.include = _Matcher(rule.include) if rule.include else None
+        self.exclude = _Matcher(rule.exclude) if rule.exclude else None
+
+
+class _Walk:
+    """Uma travessia: a raiz mais externa e as regras que começam em cada diretório."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.starts = {}        # diretório -> regras que começam nele
+        self.through = set()    # diretórios entre a raiz e raízes aninhadas
+
+    def add(self, bound: _Bound):
+        self.starts.setdefault(bound.root, []).append(bound)
+        # Garante a descida até a raiz aninhada mesmo sem regra ativa no caminho
+        path = os.path.dirname(bound.root)
+        while len(path) > len(self.root) and path not in self.through:
+            self.through.add(path)
+            path = os.path.dirname(path)
+
+
+def _components(path: str) -> Tuple[str, ...]:
+    return tuple(path.split(os.sep))
+
+
+def expand_roots(rule: Rule) -> List[str]:
+    """Raízes absolutas e existentes de uma regra (curingas expandidos)."""
+    if not rule.root or not os.path.isabs(rule.root):
+        return []
+    root = os.path.normpath(rule.root)
+    if glob.has_magic(root):
+        return sorted(glob.glob(root))
+    return [root] if os.path.lexists(root) else []
+
+
+class ScanPlan:
+    """
+    Plano de varredura de várias categorias.
+
+    Montado por compile_plan; run() percorre cada raiz externa uma vez.
+    """
+
+    def __init__(self, category_ids: List[str], walks: List[_Walk], file_targets: List[_Bound]):
+        self.category_ids = category_ids
+        self.walks = walks
+        self.file_targets = file_targets
+
+    @property
+    def roots(self) -> List[str]:
+        return [walk.root for walk in self.walks] + [b.root for b in self.file_targets]
+
+    def run(self, is_safe: Callable[[Path], bool], uid: Optional[int] = None,
+            cancel_token=None, on_progress: Callable[[int, int, str], None] = None,
+            logger=None, on_results: Callable[[Dict], None] = None,
+            sizes: Dict[str, int] = None) -> Dict[str, Tuple[List[str], int]]:
+        """
+        Executa o plano.
+
+        Args:
+            is_safe: Verificação de segurança do cleaner (por arquivo selecionado;
+                     no modo orçamento, só nos escolhidos pelo LRU)
+            uid: Dono exigido pelas regras com owner='user'
+            cancel_token: Token de cancelamento (verificado a cada entrada)
+            on_progress: Callback (raízes concluídas, total, raiz que começa);
+                         chamado antes de cada raiz e, no fim, com ''
+            on_results: Callback com os resultados parciais (cópia) após
+                        cada raiz; o modo orçamento só entra no final (e
+                        não entra se a análise for cancelada)
+            sizes: Preenchido com o tamanho de cada arquivo selecionado
+                   ({caminho: bytes}), para a limpeza não medir de novo
+
+        Returns:
+            {categoria: (arquivos, tamanho total)}
+        """
+        run = _PlanRun(self, is_safe, uid, cancel_token, logger or get_logger("rules"), sizes)
+        total = len(self.walks) + (1 if self.file_targets else 0)
+        for i, walk in enumerate(self.walks):
+            if is_cancelled(cancel_token):
+                break
+            if on_progress:
+                on_progress(i, total, walk.root)
+            with tracing.span(walk.root, 'root'):
+                run.walk(walk)
+            if on_results:
+                on_results(run.results(copy=True))
+        if self.file_targets and not is_cancelled(cancel_token):
+            if on_progress:
+                on_progress(len(self.walks), total, self.file_targets[0].root)
+            run.files(self.file_targets)
+        if is_cancelled(cancel_token):
+            # Cancelada: devolve o parcial sem pagar a seleção do orçamento
+            return run.results()
+        run.apply_budgets()
+        if on_progress and total:
+            on_progress(total, total, '')
+        return run.results()
+
+
+class _PlanRun:
+    """Estado de uma execução do plano."""
+
+    def __init__(self, plan: ScanPlan, is_safe, uid, cancel_token, logger, file_sizes=None):
+        self.is_safe = is_safe
+        self.uid = uid
+        self.cancel_token = cancel_token
+        self.logger = logger
+        self.now = time.time()
+        self.files_by_cat = {cat_id: [] for cat_id in plan.category_ids}
+        self.sizes = dict.fromkeys(plan.category_ids, 0)
+        self.candidates = {}    # regra em modo orçamento -> [(último uso, caminho, bytes)]
+        self.file_sizes = file_sizes
+
+    def results(self, copy: bool = False) -> Dict[str, Tuple[List[str], int]]:
+        return {
+            cat_id: (list(files) if copy else files, self.sizes[cat_id])
+            for cat_id, files in self.files_by_cat.items()
+        }
+
+    def _accepts_dir(self, bound: _Bound, entry, rel: str) -> bool:
+        """A regra continua ativa dentro deste subdiretório?"""
+        rule = bound.rule
+        if bound.exclude is not None and bound.exclude.matches(entry.name, rel):
+            return False
+        if rule.max_depth is not None and rel.count(os.sep) + 1 >= rule.max_depth:
+            return False
+        if rule.min_age and rule.age_of == 'top' and os.sep not in rel:
+            # Subdiretório recente no primeiro nível: nada dentro dele entra
+            if self.now - entry.stat(follow_symlinks=False).st_mtime < rule.min_age:
+                return False
+        return True
+
+    def _accepts_file(self, bound: _Bound, name: str, rel: str, st: os.stat_result) -> bool:
+        rule = bound.rule
+        if not stat.S_ISREG(st.st_mode) and not (rule.symlinks and stat.S_ISLNK(st.st_mode)):
+            # Sockets do X11/ssh-agent/tmux e FIFOs não são espaço recuperável
+            return False
+        if bound.exclude is not None and bound.exclude.matches(name, rel):
+            return False
+        if bound.include is not None and not bound.include.matches(name, rel):
+            return False
+        if rule.max_depth is not None and rel.count(os.sep) + 1 > rule.max_depth:
+            return False
+        if rule.min_age and (rule.age_of == 'file' or os.sep not in rel):
+            if self.now - st.st_mtime < rule.min_age:
+                return False
+        if st.st_size < rule.min_size:
+            return False
+        if rule.max_size is not None and st.st_size > rule.max_size:
+            return False
+        if rule.owner == 'user' and self.uid is not None and st.st_uid != self.uid:
+            return False
+        return True
+
+    def _select(self, path: str, st: os.stat_result, matched: List[_Bound]):
+        """Registra um arquivo aceito por uma ou mais regras."""
+        safe = None
+        seen = set()
+        for bound in matched:
+            if bound.rule.budget is not None:
+                # Candidato do orçamento: a segurança só é verificada se ele
+                # for selecionado (ver apply_budgets)
+                last_used = max(st.st_atime, st.st_mtime)
+                self.candidates.setdefault(bound, []).append((last_used, path, allocated_size(st)))
+            elif bound.category not in seen:
+                if safe is None:
+                    safe = self.is_safe(Path(path))
+                if not safe:
+                    continue
+                # Raízes aninhadas da mesma categoria não duplicam o arquivo
+                seen.add(bound.category)
+                self.files_by_cat[bound.category].append(path)
+                self.sizes[bound.category] += st.st_size
+                if self.file_sizes is not None:
+                    self.file_sizes[path] = st.st_size
+
+    def walk(self, walk: _Walk):
+        visited = 0
+        stack = [(walk.root, list(walk.starts.get(walk.root, ())))]
+        try:
+            while stack:
+                dir_path, active = stack.pop()
+                try:
+                    it = os.scandir(dir_path)
+                except PermissionError:
+                    self.logger.warning("Sem permissão para acessar: %s", dir_path)
+                    continue
+                except OSError as e:
+                    self.logger.debug("Erro ao escanear %s: %s", dir_path, e)
+                    continue
+
+                with it:
+                    for entry in it:
+                        visited += 1
+                        if is_cancelled(self.cancel_token):
+                            return
+                        path = entry.path
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                child = [b for b in active
+                                         if self._accepts_dir(b, entry, path[b.root_len:])]
+                                child.extend(walk.starts.get(path, ()))
+                                if child or path in walk.through:
+                                    stack.append((path, child))
+                                continue
+                            if not active:
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        matched = [b for b in active
+                                   if self._accepts_file(b, entry.name, path[b.root_len:], st)]
+                        if matched:
+                            self._select(path, st, matched)
+        finally:
+            metrics.ENTRIES_VISITED.inc(visited)
+
+    def files(self, targets: List[_Bound]):
+        """Raízes que são arquivos (avaliadas sem travessia)."""
+        for bound in targets:
+            try:
+                st = os.lstat(bound.root)
+            except OSError:
+                continue
+            name = os.path.basename(bound.root)
+            if self._accepts_file(bound, name, name, st):
+                self._select(bound.root, st, [bound])
+        metrics.ENTRIES_VISITED.inc(len(targets))
+
+    def apply_budgets(self):
+        """Modo orçamento: seleciona os menos usados até caber no limite."""
+        for bound, candidates in self.candidates.items():
+            used = sum(size for _, _, size in candidates)
+            excess = used - bound.rule.budget
+            if excess <= 0:
+                continue
+            selected, _ = select_lru(candidates, excess)
+            for _, path, size in selected:
+                if not self.is_safe(Path(path)):
+                    continue
+                self.files_by_cat[bound.category].append(path)
+                self.sizes[bound.category] += size
+                if self.file_sizes is not None:
+                    self.file_sizes[path] = size
+            self.logger.info(
+                "Cache %s: %s (limite %s), %d arquivos antigos selecionados",
+                os.path.basename(bound.root), format_size(used),
+                format_size(bound.rule.budget), len(selected)
+            )
+
+
+def compile_plan(categories: Iterable[Category]) -> ScanPlan:
+    """
+    Junta as regras das categorias num plano de varredura única.
+
+    Raízes são expandidas (curingas) e ordenadas por componentes; uma raiz
+    dentro de outra vira um ponto de ativação na travessia da externa.
+    """
+    categories = list(categories)
+    bounds = []
+    for category in categories:
+        for rule in category.rules:
+            for root in expand_roots(rule):
+                bounds.append(_Bound(category.id, rule, root))
+
+    file_targets = []
+    dir_bounds = []
+    for bound in bounds:
+        try:
+            is_dir = stat.S_ISDIR(os.stat(bound.root).st_mode)
+        except OSError:
+            continue
+        (dir_bounds if is_dir else file_targets).append(bound)
+
+    walks = []
+    for bound in sorted(dir_bounds, key=lambda b: _components(b.root)):
+        current = walks[-1] if walks else None
+        if current is not None and (bound.root == current.root or
+                                    bound.root.startswith(current.root.rstrip(os.sep) + os.sep)):
+            current.add(bound)
+        else:
+            walk = _Walk(bound.root)
+            walk.add(bound)
+            walks.append(walk)
+
+    return ScanPlan([c.id for c in categories], walks, file_targets)
+
+
+def scan_categories(categories: List[Category], is_safe: Callable[[Path], bool],
+                    uid: Optional[int] = None, cancel_token=None,
+                    on_progress: Callable[[int, int, str], None] = None,
+                    logger=None, on_results: Callable[[Dict], None] = None,
+                    sizes: Dict[str, int] = None) -> Dict[str, Tuple[List[str], int]]:
+    """
+    Compila e executa o plano, registrando as métricas por categoria.
+
+    A duração registrada de cada categoria é a da varredura conjunta.
+    """
+    start = time.perf_counter()
+    with tracing.span('scan_plan', 'category', categories=[c.id for c in categories]):
+        results = compile_plan(categories).run(is_safe, uid, cancel_token, on_progress,
+                                               logger, on_results, sizes)
+    elapsed = time.perf_counter() - start
+    for cat_id, (files, size) in results.items():
+        metrics.record_scan(cat_id, len(files), size, elapsed)
+    return results
+
+
+def estimator_roots(categories: Iterable[Category]) -> Dict[str, List[Dict]]:
+    """Raízes no formato do app.estimator.SizeEstimator, derivadas das regras."""
+    roots = {}
+    for category in categories:
+        entries = roots.setdefault(category.id, [])
+        for rule in category.rules:
+            for root in expand_roots(rule):
+                entry = {'path': Path(root)}
+                if rule.include:
+                    entry['patterns'] = list(rule.include)
+                # O estimador só exclui nomes do primeiro nível
+                first_level = {p.lstrip('/') for p in rule.exclude if '/' not in p.lstrip('/')}
+                if first_level:
+                    entry['exclude'] = first_level
+                if rule.min_age and rule.age_of == 'file':
+                    entry['max_age_days'] = rule.min_age / DAY
+                if rule.budget is not None:
+                    entry['budget'] = rule.budget
+                entries.append(entry)
+    return roots
+
+
+# === Categorias do usuário (JSON) ===
+
+_RULE_KEYS = {
+    'root', 'include', 'exclude', 'min_age_days', 'min_age_hours', 'age_of',
+    'min_size', 'max_size', 'owner', 'max_depth', 'budget', 'symlinks',
+}
+
+
+def user_categories_path() -> Path:
+    """Arquivo JSON das categorias do usuário."""
+    override = os.environ.get('LIMPEZA_DAVID_CATEGORIES')
+    if override:
+        return Path(override)
+    if sys.platform == 'win32':
+        return Path(os.environ.get('APPDATA', '')) / 'limpeza_david' / 'categories.json'
+    return Path.home() / '.config' / 'limpeza_david' / 'categories.json'
+
+
+def _expand(path: str, home: Path) -> str:
+    path = os.path.expandvars(path)
+    if path == '~' or path.startswith('~/') or path.startswith('~' + os.sep):
+        path = str(home) + path[1:]
+    return path
+
+
+def rule_from_dict(data: Dict, home: Path = None) -> Rule:
+    """
+    Cria uma regra a partir do JSON.
+
+    Raises:
+        ValueError: Campo desconhecido ou valor inválido
+    """
+    if not isinstance(data, dict):
+        raise ValueError("regra deve ser um objeto")
+    unknown = set(data) - _RULE_KEYS
+    if unknown:
+        raise ValueError(f"campos desconhecidos: {', '.join(sorted(unknown))}")
+
+    root = _expand(str(data.get('root') or ''), home or Path.home())
+    if not os.path.isabs(root):
+        raise ValueError(f"raiz deve ser absoluta: {data.get('root')!r}")
+
+    owner = data.get('owner', 'user')
+    if owner not in ('any', 'user'):
+        raise ValueError("owner deve ser 'any' ou 'user'")
+    age_of = data.get('age_of', 'file')
+    if age_of not in ('file', 'top'):
+        raise ValueError("age_of deve ser 'file' ou 'top'")
+    symlinks = data.get('symlinks', False)
+    if not isinstance(symlinks, bool):
+        raise ValueError("symlinks deve ser true ou false")
+
+    def patterns(key):
+        value = data.get(key) or []
+        if isinstance(value, str) or not all(isinstance(p, str) for p in value):
+            raise ValueError(f"{key} deve ser uma lista de padrões")
+        return tuple(value)
+
+    def number(key, minimum=0):
+        value = data.get(key)
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < minimum:
+            raise ValueError(f"{key} deve ser um número >= {minimum}")
+        return value
+
+    min_age = (number('min_age_days') or 0) * DAY + (number('min_age_hours') or 0) * HOUR
+    max_size = number('max_size')
+    max_depth = number('max_depth', 1)
+    budget = number('budget')
+    return Rule(
+        root=root,
+        include=patterns('include'),
+        exclude=patterns('exclude'),
+        min_age=min_age,
+        age_of=age_of,
+        min_size=int(number('min_size') or 0),
+        max_size=int(max_size) if max_size is not None else None,
+        owner=owner,
+        max_depth=int(max_depth) if max_depth is not None else None,
+        budget=int(budget) if budget is not None else None,
+        symlinks=symlinks,
+    )
+
+
+def category_from_dict(data: Dict, home: Path = None) -> Category:
+    """
+    Cria uma categoria do usuário a partir do JSON.
+
+    Raises:
+        ValueError: Campo obrigatório ausente ou regra inválida
+    """
+    if not isinstance(data, dict):
+        raise ValueError("categoria deve ser um objeto")
+    cat_id = data.get('id')
+    if not isinstance(cat_id, str) or not re.fullmatch(r'[a-z0-9_]+', cat_id):
+        raise ValueError(f"id inválido: {cat_id!r} (use letras minúsculas, números e _)")
+    rules = data.get('rules')
+    if not isinstance(rules, list) or not rules:
+        raise ValueError(f"{cat_id}: 'rules' deve ser uma lista não vazia")
+    try:
+        parsed = tuple(rule_from_dict(rule, home) for rule in rules)
+    except ValueError as e:
+        raise ValueError(f"{cat_id}: {e}")
+    return Category(
+        id=cat_id,
+        name=str(data.get('name') or cat_id),
+        icon=str(data.get('icon') or '🧩'),
+        description=str(data.get('description') or ''),
+        rules=parsed,
+        user_defined=True,
+    )
+
+
+def load_user_categories(path: Path = None, home: Path = None,
+                         reserved: Iterable[str] = ()) -> List[Category]:
+    """
+    Lê as categorias do usuário.
+
+    Categorias inválidas ou com id de uma categoria embutida são
+    ignoradas com um aviso no log; arquivo ausente = nenhuma categoria.
+    Regras do usuário exigem, por padrão, que os arquivos sejam dele
+    (owner='user').
+    """
+    path = Path(path) if path is not None else user_categories_path()
+    logger = get_logger("rules")
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logger.warning("Categorias do usuário ignoradas (%s): %s", path, e)
+        return []
+
+    entries = data.get('categories', []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        logger.warning("Categorias do usuário ignoradas (%s): esperada uma lista", path)
+        return []
+
+    reserved = set(reserved)
+    categories = []
+    for entry in entries:
+        try:
+            category = category_from_dict(entry, home)
+        except ValueError as e:
+            logger.warning("Categoria do usuário ignorada: %s", e)
+            continue
+        if category.id in reserved:
+            logger.warning("Categoria do usuário ignorada: id '%s' já existe", category.id)
+            continue
+        reserved.add(category.id)
+        categories.append(category)
+    return categories
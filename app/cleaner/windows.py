@@ -8,21 +8,31 @@ Descrição: Implementa a limpeza de arquivos temporários, cache e
 """
 
 import os
-import shutil
-import glob
-import platform
+import logging
+import sys
 from pathlib import Path
 from typing import List, Tuple, Dict
 
 # Imports específicos do Windows (só carrega se estiver no Windows)
-if platform.system() == 'Windows':
+if sys.platform == 'win32':
     import winreg
     import ctypes
 
 # Importa utilitários
-import sys
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app.utils import get_logger, safe_remove_file, safe_remove_dir, get_file_size
+from app.utils import (
+    get_logger, safe_remove_file, safe_remove_dir, get_file_size,
+    CancelToken, is_cancelled
+)
+from app import metrics, tracing
+from app.cleaner import rules
+from app.cleaner.rules import Category, Rule
+
+
+# IDs das categorias embutidas (não podem ser redefinidos pelo usuário)
+BUILTIN_CATEGORIES = (
+    'temp_user', 'temp_windows', 'prefetch', 'browser_cache', 'windows_cache',
+    'recent_files', 'log_files', 'old_files',
+)
 
 
 class WindowsCleaner:
@@ -56,79 +66,118 @@ class WindowsCleaner:
             '.doc', '.docx', '.xls', '.xlsx', '.pdf', '.ppt', '.pptx'
         }
         
+        self.user_categories = rules.load_user_categories(reserved=BUILTIN_CATEGORIES)
+        self.categories = self._build_categories()
+        
+    def _build_categories(self) -> Dict[str, Category]:
+        """
+        Monta as categorias embutidas como conjuntos de regras.
+
+        TEMP e os perfis ficam dentro de %LOCALAPPDATA% e da pasta do
+        usuário; analisadas juntas, essas raízes são percorridas uma vez.
+        """
+        temp = str(self.temp_dir)
+        local = str(self.local_app_data)
+        old_patterns = ('*.old', '*.bak', '*.tmp', '*.temp', '~*')
+        builtin = [
+            Category('temp_user', 'Arquivos Temporários do Usuário', '📁',
+                     'Pasta TEMP do usuário atual', (Rule(temp),)),
+            Category('temp_windows', 'Arquivos Temporários do Windows', '🪟',
+                     'Pasta C:\\Windows\\Temp', (Rule("C:/Windows/Temp"),)),
+            Category('prefetch', 'Prefetch', '⚡', 'Arquivos de pré-carregamento do Windows', (
+                Rule("C:/Windows/Prefetch", include=('*.pf',)),
+            )),
+            Category('browser_cache', 'Cache de Navegadores', '🌐', 'Cache do Chrome, Firefox, Edge', tuple(
+                Rule(os.path.join(local, path)) for path in (
+                    "Google/Chrome/User Data/Default/Cache",
+                    "Google/Chrome/User Data/Default/Code Cache",
+                    "Microsoft/Edge/User Data/Default/Cache",
+                    "Microsoft/Edge/User Data/Default/Code Cache",
+                    "Mozilla/Firefox/Profiles/*/cache2",
+                )
+            )),
+            Category('windows_cache', 'Cache do Windows', '💾', 'Cache de thumbnails e ícones', (
+                Rule(os.path.join(local, "Microsoft/Windows/Explorer"),
+                     include=('thumbcache_*.db',), max_depth=1),
+                Rule(os.path.join(local, "IconCache.db")),
+            )),
+            Category('recent_files', 'Arquivos Recentes', '📋', 'Lista de arquivos recentes', (
+                Rule(os.path.join(str(self.app_data), "Microsoft/Windows/Recent"), include=('*.lnk',)),
+            )),
+            Category('log_files', 'Arquivos de Log', '📝', 'Arquivos .log antigos', tuple(
+                Rule(root, include=('*.log',)) for root in (temp, local, "C:/Windows/Logs")
+            )),
+            Category('old_files', 'Arquivos Antigos/Backup', '📦', 'Arquivos .old, .bak, .tmp', tuple(
+                Rule(root, include=old_patterns) for root in (temp, str(self.user_home), local)
+            )),
+        ]
+        categories = {category.id: category for category in builtin}
+        for category in self.user_categories:
+            if category.id not in categories:
+                categories[category.id] = category
+        return categories
+
     def get_categories(self) -> Dict[str, Dict]:
         """
         Retorna as categorias de limpeza disponíveis.
         """
         return {
-            'temp_user': {
-                'name': 'Arquivos Temporários do Usuário',
-                'icon': '📁',
-                'description': 'Pasta TEMP do usuário atual'
-            },
-            'temp_windows': {
-                'name': 'Arquivos Temporários do Windows',
-                'icon': '🪟',
-                'description': 'Pasta C:\\Windows\\Temp'
-            },
-            'prefetch': {
-                'name': 'Prefetch',
-                'icon': '⚡',
-                'description': 'Arquivos de pré-carregamento do Windows'
-            },
-            'browser_cache': {
-                'name': 'Cache de Navegadores',
-                'icon': '🌐',
-                'description': 'Cache do Chrome, Firefox, Edge'
-            },
-            'windows_cache': {
-                'name': 'Cache do Windows',
-                'icon': '💾',
-                'description': 'Cache de thumbnails e ícones'
-            },
-            'recent_files': {
-                'name': 'Arquivos Recentes',
-                'icon': '📋',
-                'description': 'Lista de arquivos recentes'
-            },
-            'log_files': {
-                'name': 'Arquivos de Log',
-                'icon': '📝',
-                'description': 'Arquivos .log antigos'
-            },
-            'old_files': {
-                'name': 'Arquivos Antigos/Backup',
-                'icon': '📦',
-                'description': 'Arquivos .old, .bak, .tmp'
+            cat_id: {
+                'name': category.name,
+                'icon': category.icon,
+                'description': category.description
             }
+            for cat_id, category in self.categories.items()
         }
-        
-    def scan_category(self, category: str) -> Tuple[List[str], int]:
+
+    def get_category_roots(self) -> Dict[str, List[Dict]]:
+        """
+        Retorna as raízes de cada categoria para a estimativa rápida.
+
+        Derivadas das regras (ver app.estimator.SizeEstimator para o
+        formato de cada raiz).
+        """
+        return rules.estimator_roots(self.categories.values())
+
+    def scan_category(self, category: str, cancel_token: CancelToken = None) -> Tuple[List[str], int]:
         """
         Escaneia uma categoria e retorna os arquivos encontrados.
         
         Args:
             category: ID da categoria
+            cancel_token: Token de cancelamento; se cancelado, a análise
+                          para e retorna o que já foi encontrado
             
         Returns:
             Tupla com lista de arquivos e tamanho total
         """
-        scan_methods = {
-            'temp_user': self._scan_temp_user,
-            'temp_windows': self._scan_temp_windows,
-            'prefetch': self._scan_prefetch,
-            'browser_cache': self._scan_browser_cache,
-            'windows_cache': self._scan_windows_cache,
-            'recent_files': self._scan_recent_files,
-            'log_files': self._scan_log_files,
-            'old_files': self._scan_old_files,
-        }
-        
-        method = scan_methods.get(category)
-        if method:
-            return method()
-        return [], 0
-        
+        return self.scan_categories([category], cancel_token).get(category, ([], 0))
+
+    def scan_categories(self, categories: List[str], cancel_token: CancelToken = None,
+                        on_progress=None, on_results=None,
+                        sizes: Dict[str, int] = None) -> Dict[str, Tuple[List[str], int]]:
+        """
+        Escaneia várias categorias numa única varredura.
+
+        Args:
+            categories: IDs das categorias (os desconhecidos são ignorados)
+            cancel_token: Token de cancelamento
+            on_progress: Callback (raízes concluídas, total, raiz que começa)
+            on_results: Callback com os resultados parciais após cada raiz
+            sizes: Preenchido com {caminho: bytes} dos arquivos selecionados
+                   (repassado a clean_files evita medir tudo de novo)
+
+        Returns:
+            Dicionário categoria -> (arquivos, tamanho total)
+        """
+        selected = [self.categories[c] for c in categories if c in self.categories]
+        return rules.scan_categories(
+            selected, self._is_safe_to_delete,
+            cancel_token=cancel_token, on_progress=on_progress, logger=self.logger,
+            on_results=on_results, sizes=sizes
+        )
+        
+    @tracing.traced('safety_check', 'safety')
     def _is_safe_to_delete(self, path: Path) -> bool:
         """
         Verifica se é seguro deletar um arquivo/diretório.
@@ -152,201 +201,85 @@ class WindowsCleaner:
         except Exception:
             return False
             
-    def _scan_directory(self, directory: Path, patterns: List[str] = None) -> Tuple[List[str], int]:
-        """
-        Escaneia um diretório e retorna arquivos encontrados.
-        """
-        files = []
-        total_size = 0
-        
-        if not directory.exists():
-            return files, total_size
-            
-        try:
-            if patterns:
-                for pattern in patterns:
-                    for file_path in directory.rglob(pattern):
-                        if file_path.is_file() and self._is_safe_to_delete(file_path):
-                            size = get_file_size(file_path)
-                            files.append(str(file_path))
-                            total_size += size
-            else:
-                for file_path in directory.rglob('*'):
-                    if file_path.is_file() and self._is_safe_to_delete(file_path):
-                        size = get_file_size(file_path)
-                        files.append(str(file_path))
-                        total_size += size
-                        
-        except PermissionError:
-            self.logger.warning(f"Sem permissão para acessar: {directory}")
-        except Exception as e:
-            self.logger.error(f"Erro ao escanear {directory}: {e}")
-            
-        return files, total_size
-        
-    def _scan_temp_user(self) -> Tuple[List[str], int]:
-        """Escaneia a pasta TEMP do usuário."""
-        return self._scan_directory(self.temp_dir)
-        
-    def _scan_temp_windows(self) -> Tuple[List[str], int]:
-        """Escaneia a pasta C:\\Windows\\Temp."""
-        windows_temp = Path("C:/Windows/Temp")
-        return self._scan_directory(windows_temp)
-        
-    def _scan_prefetch(self) -> Tuple[List[str], int]:
-        """Escaneia a pasta Prefetch."""
-        prefetch_dir = Path("C:/Windows/Prefetch")
-        return self._scan_directory(prefetch_dir, ['*.pf'])
-        
-    def _scan_browser_cache(self) -> Tuple[List[str], int]:
-        """Escaneia cache de navegadores."""
-        files = []
-        total_size = 0
-        
-        # Chrome
-        chrome_cache = self.local_app_data / "Google/Chrome/User Data/Default/Cache"
-        chrome_code_cache = self.local_app_data / "Google/Chrome/User Data/Default/Code Cache"
-        
-        # Edge
-        edge_cache = self.local_app_data / "Microsoft/Edge/User Data/Default/Cache"
-        edge_code_cache = self.local_app_data / "Microsoft/Edge/User Data/Default/Code Cache"
-        
-        # Firefox
-        firefox_profiles = self.local_app_data / "Mozilla/Firefox/Profiles"
-        
-        cache_dirs = [
-            chrome_cache, chrome_code_cache,
-            edge_cache, edge_code_cache
-        ]
-        
-        for cache_dir in cache_dirs:
-            f, s = self._scan_directory(cache_dir)
-            files.extend(f)
-            total_size += s
-            
-        # Firefox cache
-        if firefox_profiles.exists():
-            for profile in firefox_profiles.iterdir():
-                if profile.is_dir():
-                    ff_cache = profile / "cache2"
-                    f, s = self._scan_directory(ff_cache)
-                    files.extend(f)
-                    total_size += s
-                    
-        return files, total_size
-        
-    def _scan_windows_cache(self) -> Tuple[List[str], int]:
-        """Escaneia cache do Windows (thumbnails, ícones)."""
-        files = []
-        total_size = 0
-        
-        # Thumbnail cache
-        thumbnail_cache = self.local_app_data / "Microsoft/Windows/Explorer"
-        
-        for file_path in thumbnail_cache.glob("thumbcache_*.db"):
-            if self._is_safe_to_delete(file_path):
-                size = get_file_size(file_path)
-                files.append(str(file_path))
-                total_size += size
-                
-        # Icon cache
-        icon_cache = self.local_app_data / "IconCache.db"
-        if icon_cache.exists() and self._is_safe_to_delete(icon_cache):
-            size = get_file_size(icon_cache)
-            files.append(str(icon_cache))
-            total_size += size
-            
-        return files, total_size
-        
-    def _scan_recent_files(self) -> Tuple[List[str], int]:
-        """Escaneia arquivos recentes (atalhos)."""
-        recent_dir = self.app_data / "Microsoft/Windows/Recent"
-        return self._scan_directory(recent_dir, ['*.lnk'])
-        
-    def _scan_log_files(self) -> Tuple[List[str], int]:
-        """Escaneia arquivos de log."""
-        files = []
-        total_size = 0
-        
-        # Logs em várias localizações
-        log_locations = [
-            self.temp_dir,
-            self.local_app_data,
-            Path("C:/Windows/Logs"),
-        ]
-        
-        for location in log_locations:
-            f, s = self._scan_directory(location, ['*.log'])
-            files.extend(f)
-            total_size += s
-            
-        return files, total_size
-        
-    def _scan_old_files(self) -> Tuple[List[str], int]:
-        """Escaneia arquivos antigos/backup."""
-        files = []
-        total_size = 0
-        
-        patterns = ['*.old', '*.bak', '*.tmp', '*.temp', '~*']
-        
-        scan_locations = [
-            self.temp_dir,
-            self.user_home,
-            self.local_app_data,
-        ]
-        
-        for location in scan_locations:
-            f, s = self._scan_directory(location, patterns)
-            files.extend(f)
-            total_size += s
-            
-        return files, total_size
-        
-    def clean_files(self, files: List[str]) -> Tuple[int, int, int]:
+    def clean_files(self, files: List[str], on_file_removed=None,
+                    cancel_token: CancelToken = None,
+                    sizes: Dict[str, int] = None,
+                    on_dir_report=None) -> Tuple[int, int, int, List[str]]:
         """
         Remove os arquivos da lista.
         
         Args:
             files: Lista de caminhos de arquivos
+            on_file_removed: Callback opcional chamado quando arquivo é removido
+            cancel_token: Token de cancelamento (verificado a cada arquivo)
+            sizes: Tamanhos medidos na análise ({caminho: bytes}, ver
+                   scan_categories); arquivos ausentes são medidos, e
+                   diretórios contam o que a remoção liberou
+            on_dir_report: Callback opcional (caminho, RemovalReport) para cada
+                           diretório; traz os motivos das falhas e os totais
+                           por subárvore de uma remoção parcial
             
         Returns:
-            Tupla com (arquivos removidos, tamanho liberado, erros)
+            Tupla com (arquivos removidos, tamanho liberado, erros, lista de erros)
         """
         removed = 0
         size_freed = 0
         errors = 0
-        
-        for file_path in files:
-            try:
-                path = Path(file_path)
+        error_files = []
+        # Decidido uma vez por lote: sem DEBUG, nenhum registro por arquivo
+        log_removed = self.logger.isEnabledFor(logging.DEBUG)
+        
+        with tracing.span('delete_batch', 'delete', files=len(files)):
+            for file_path in files:
+                if is_cancelled(cancel_token):
+                    break
+                
+                try:
+                    path = Path(file_path)
                 
-                if not path.exists():
-                    continue
+                    if not path.exists():
+                        continue
                     
-                if not self._is_safe_to_delete(path):
-                    self.logger.warning(f"Arquivo protegido ignorado: {file_path}")
-                    errors += 1
-                    continue
+                    if not self._is_safe_to_delete(path):
+                        self.logger.warning("Arquivo protegido ignorado: %s", file_path)
+                        errors += 1
+                        error_files.append(file_path)
+                        continue
                     
-                size = get_file_size(path)
-                
-                if path.is_file():
-                    success = safe_remove_file(path)
-                else:
-                    success = safe_remove_dir(path)
+                    if path.is_file():
+                        size = sizes.get(file_path) if sizes else None
+                        if size is None:
+                            size = get_file_size(path)
+                        success = safe_remove_file(path)
+                    else:
+                        report = safe_remove_dir(path, cancel_token=cancel_token)
+                        success = bool(report)
+                        if on_dir_report:
+                            on_dir_report(file_path, report)
+                        # Conta o que saiu de fato, inclusive numa remoção parcial
+                        size = report.bytes
+                        if not success:
+                            size_freed += size
                     
-                if success:
-                    removed += 1
-                    size_freed += size
-                    self.logger.debug(f"Removido: {file_path}")
-                else:
-                    errors += 1
+                    if success:
+                        removed += 1
+                        size_freed += size
+                        if log_removed:
+                            self.logger.debug("Removido: %s", file_path)
+                        if on_file_removed:
+                            on_file_removed(file_path, size)
+                    else:
+                        errors += 1
+                        error_files.append(file_path)
                     
-            except Exception as e:
-                self.logger.error(f"Erro ao remover {file_path}: {e}")
-                errors += 1
+                except Exception as e:
+                    self.logger.error("Erro ao remover %s: %s", file_path, e)
+                    errors += 1
+                    error_files.append(file_path)
                 
-        return removed, size_freed, errors
+        metrics.FILES_REMOVED.inc(removed)
+        metrics.BYTES_RECLAIMED.inc(size_freed)
+        return removed, size_freed, errors, error_files
         
     def empty_recycle_bin(self) -> bool:
         """
@@ -372,7 +305,7 @@ class WindowsCleaner:
             return False
 
 
-# Para testes diretos
+# Para testes diretos (python -m app.cleaner.windows)
 if __name__ == "__main__":
     cleaner = WindowsCleaner()
     
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Linha de Comando (NDJSON)
+Autor: David Fernandes
+Descrição: Análise e limpeza sem interface para automação (cron, Ansible).
+           Escreve um objeto JSON por linha no stdout; os logs vão para o
+           stderr. Nunca importa tkinter nem Flask.
+
+Eventos emitidos ('event'):
+    start      categorias pedidas e modo
+    file       um arquivo encontrado (ou 'batch' com --batch N)
+    category   totais da análise de uma categoria
+    removed    um arquivo removido (ou 'removed_batch' com --batch N)
+    cleaned    totais da limpeza de uma categoria
+    error      erro que interrompeu a execução
+    summary    totais finais e código de saída
+
+No subcomando 'daemon' os eventos são os do app.daemon.Daemon
+('pressure', 'plan', 'cleaned', 'recovered', ...).
+"""
+
+import sys
+import json
+import signal
+import argparse
+import threading
+from typing import Callable, Dict, List, TextIO
+
+from app.utils import CancelToken
+from app.cleaner import get_system_cleaner
+from app.daemon import (
+    Daemon, DEFAULT_CATEGORIES, DEFAULT_LOW_PERCENT, DEFAULT_HIGH_PERCENT,
+    DEFAULT_LOW_INODES_PERCENT, DEFAULT_HIGH_INODES_PERCENT,
+    DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL, DEFAULT_COOLDOWN
+)
+
+
+# Códigos de saída
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3        # limpeza concluída com arquivos não removidos
+EXIT_CANCELLED = 130    # interrompido por SIGINT/SIGTERM
+
+
+class NDJSONWriter:
+    """Escreve eventos como JSON compacto, um por linha."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def emit(self, event: str, flush: bool = False, **fields):
+        fields = dict(event=event, **fields)
+        self.stream.write(json.dumps(fields, ensure_ascii=False, separators=(',', ':')) + '\n')
+        if flush:
+            self.stream.flush()
+
+
+class FileStream:
+    """
+    Emite arquivos um a um ou em lotes de 'batch' (lotes reduzem o volume
+    de linhas em execuções com milhares de hosts).
+    """
+
+    def __init__(self, writer: NDJSONWriter, event: str, batch_event: str,
+                 category: str, batch: int = 0):
+        self.writer = writer
+        self.event = event
+        self.batch_event = batch_event
+        self.category = category
+        self.batch = batch
+        self.pending = []
+
+    def add(self, path: str, size: int):
+        if self.batch <= 0:
+            self.writer.emit(self.event, category=self.category, path=path, size=size)
+            return
+        self.pending.append({'path': path, 'size': size})
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.emit(self.batch_event, flush=True, category=self.category, files=self.pending)
+            self.pending = []
+
+
+def _install_signal_handlers(on_signal: Callable[[], None]):
+    """SIGINT/SIGTERM pedem cancelamento; a execução termina com resultados parciais."""
+    def handler(signum, frame):
+        on_signal()
+
+    for signum in (signal.SIGINT, getattr(signal, 'SIGTERM', None)):
+        if signum is not None:
+            signal.signal(signum, handler)
+
+
+def _targets(categories: List[str], all_users: bool) -> List[Dict]:
+    """
+    Monta a lista de (chave, categoria, cleaner) a analisar.
+
+    Com all_users as categorias pessoais viram 'categoria@usuário', cada
+    uma com o cleaner do dono.
+    """
+    cleaner = get_system_cleaner()()
+    if not all_users:
+        return [{'key': cat_id, 'category': cat_id, 'cleaner': cleaner} for cat_id in categories]
+
+    from app.cleaner import multiuser
+
+    scanner = multiuser.MultiUserScanner()
+    targets = []
+    for cat_id in categories:
+        if cat_id not in multiuser.USER_CATEGORIES:
+            targets.append({'key': cat_id, 'category': cat_id, 'cleaner': cleaner})
+            continue
+        for user in scanner.users:
+            targets.append({
+                'key': multiuser.user_key(cat_id, user.name),
+                'category': cat_id,
+                'cleaner': scanner.cleaner_for(user.name),
+                'user': user.name,
+            })
+    return targets
+
+
+def run_scan(categories: List[str], clean: bool = False, batch: int = 0,
+             all_users: bool = False, stream: TextIO = None,
+             cancel_token: CancelToken = None, profile_path=None) -> int:
+    """
+    Analisa (e opcionalmente limpa) as categorias, emitindo NDJSON.
+
+    As categorias de um mesmo cleaner são analisadas numa única
+    varredura; depois, cada uma é emitida e limpa em sequência. Com a
+    análise cancelada, todas as categorias são emitidas com os resultados
+    parciais e nada é limpo. Com profile_path (a execução já roda sob o
+    cProfile, ver main) o evento 'start' informa onde o perfil é gravado.
+
+    Returns:
+        Código de saída (EXIT_*)
+    """
+    writer = NDJSONWriter(stream or sys.stdout)
+    cancel_token = cancel_token or CancelToken()
+    totals = {'files': 0, 'size': 0, 'removed': 0, 'size_freed': 0, 'errors': 0}
+
+    writer.emit('start', flush=True, categories=categories, clean=clean, all_users=all_users,
+                profile=str(profile_path) if profile_path else None)
+
+    try:
+        targets = _targets(categories, all_users)
+
+        # Uma varredura conjunta por cleaner, antes de emitir qualquer
+        # categoria: um cancelamento no meio ainda deixa os resultados
+        # parciais de todas elas
+        scanned = {}    # id(cleaner) -> resultados da varredura conjunta
+        sizes = {}      # caminho -> bytes medidos na análise
+        for target in targets:
+            cleaner = target['cleaner']
+            if id(cleaner) in scanned or cancel_token.cancelled:
+                continue
+            scanned[id(cleaner)] = cleaner.scan_categories(
+                [t['category'] for t in targets if t['cleaner'] is cleaner], cancel_token,
+                sizes=sizes
+            )
+
+        for target in targets:
+            key = target['key']
+            cleaner = target['cleaner']
+            if id(cleaner) not in scanned:
+                continue
+
+            files, size = scanned[id(cleaner)].get(target['category'], ([], 0))
+            found = FileStream(writer, 'file', 'batch', key, batch)
+            for path in files:
+                found.add(path, sizes.get(path, 0))
+            found.flush()
+            writer.emit('category', flush=True, category=key, user=target.get('user'),
+                        files=len(files), size=size)
+            totals['files'] += len(files)
+            totals['size'] += size
+
+            if not clean or not files or cancel_token.cancelled:
+                continue
+
+            removed_stream = FileStream(writer, 'removed', 'removed_batch', key, batch)
+            # Diretórios removidos só em parte: motivos e totais por subárvore
+            partial_dirs = []
+
+            def on_dir_report(path, report):
+                if not report:
+                    partial_dirs.append(report.to_dict())
+
+            removed, size_freed, errors, error_files = cleaner.clean_files(
+                files, removed_stream.add, cancel_token, sizes, on_dir_report
+            )
+            removed_stream.flush()
+            writer.emit('cleaned', flush=True, category=key, removed=removed,
+                        size_freed=size_freed, errors=errors, error_files=error_files,
+                        partial_dirs=partial_dirs)
+            totals['removed'] += removed
+            totals['size_freed'] += size_freed
+            totals['errors'] += errors
+
+    except Exception as e:
+        writer.emit('error', message=str(e), type=type(e).__name__)
+        writer.emit('summary', flush=True, exit_code=EXIT_ERROR, cancelled=cancel_token.cancelled, **totals)
+        return EXIT_ERROR
+
+    if cancel_token.cancelled:
+        code = EXIT_CANCELLED
+    elif totals['errors']:
+        code = EXIT_PARTIAL
+    else:
+        code = EXIT_OK
+    writer.emit('summary', flush=True, exit_code=code, cancelled=cancel_token.cancelled, **totals)
+    return code
+
+
+def list_categories(stream: TextIO = None) -> int:
+    """Emite uma linha por categoria disponível."""
+    writer = NDJSONWriter(stream or sys.stdout)
+    for cat_id, info in get_system_cleaner()().get_categories().items():
+        writer.emit('category_info', id=cat_id, name=info['name'], description=info['description'])
+    writer.stream.flush()
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser da linha de comando."""
+    parser = argparse.ArgumentParser(
+        prog='run_cli.py',
+        description="Limpeza David - análise e limpeza sem interface (saída NDJSON)"
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('list', help="Lista as categorias disponíveis")
+
+    scan = sub.add_parser('scan', help="Analisa (e opcionalmente limpa) categorias")
+    scan.add_argument('categories', nargs='+', help="IDs das categorias (ver 'list')")
+    scan.add_argument('--clean', action='store_true', help="Remove os arquivos encontrados")
+    scan.add_argument('--batch', type=int, default=0,
+                      help="Agrupa arquivos em lotes de N por linha (padrão: um por linha)")
+    scan.add_argument('--all-users', action='store_true',
+                      help="Analisa as categorias pessoais de todos os usuários locais (Linux, root)")
+    scan.add_argument('--profile', action='store_true',
+                      help="Executa a análise e a limpeza sob o cProfile (.pstats junto aos logs)")
+
+    daemon = sub.add_parser('daemon', help="Monitora o espaço livre e limpa sob pressão")
+    daemon.add_argument('--path', dest='paths', action='append',
+                        help="Sistema de arquivos monitorado (repetível; padrão: /)")
+    daemon.add_argument('--categories', nargs='+', default=list(DEFAULT_CATEGORIES),
+                        help=f"Categorias limpas sob pressão (padrão: {' '.join(DEFAULT_CATEGORIES)})")
+    daemon.add_argument('--low', type=float, default=DEFAULT_LOW_PERCENT,
+                        help=f"%% de espaço livre que dispara a limpeza (padrão: {DEFAULT_LOW_PERCENT:g})")
+    daemon.add_argument('--high', type=float, default=DEFAULT_HIGH_PERCENT,
+                        help=f"%% de espaço livre buscado e que encerra a pressão (padrão: {DEFAULT_HIGH_PERCENT:g})")
+    daemon.add_argument('--low-inodes', type=float, default=DEFAULT_LOW_INODES_PERCENT,
+                        help=f"%% de inodes livres que dispara a limpeza (padrão: {DEFAULT_LOW_INODES_PERCENT:g})")
+    daemon.add_argument('--high-inodes', type=float, default=DEFAULT_HIGH_INODES_PERCENT,
+                        help=f"%% de inodes livres buscado (padrão: {DEFAULT_HIGH_INODES_PERCENT:g})")
+    daemon.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL,
+                        help=f"Intervalo mínimo entre amostras em segundos (padrão: {DEFAULT_MIN_INTERVAL:g})")
+    daemon.add_argument('--max-interval', type=float, default=DEFAULT_MAX_INTERVAL,
+                        help=f"Intervalo máximo entre amostras em segundos (padrão: {DEFAULT_MAX_INTERVAL:g})")
+    daemon.add_argument('--cooldown', type=float, default=DEFAULT_COOLDOWN,
+                        help=f"Segundos entre limpezas do mesmo sistema de arquivos (padrão: {DEFAULT_COOLDOWN:g})")
+    daemon.add_argument('--dry-run', action='store_true', help="Apenas planeja, sem remover")
+    daemon.add_argument('--once', action='store_true', help="Faz uma única amostragem e sai (cron)")
+    return parser
+
+
+def run_daemon(args, stream: TextIO = None) -> int:
+    """Executa o modo daemon até SIGINT/SIGTERM (ou uma vez com --once)."""
+    writer = NDJSONWriter(stream or sys.stdout)
+    stop_event = threading.Event()
+
+    def on_event(event, **fields):
+        writer.emit(event, flush=True, **fields)
+
+    try:
+        daemon = Daemon(
+            paths=args.paths or ['/'], categories=args.categories,
+            low_percent=args.low, high_percent=args.high,
+            low_inodes_percent=args.low_inodes, high_inodes_percent=args.high_inodes,
+            min_interval=args.min_interval, max_interval=args.max_interval,
+            cooldown=args.cooldown, dry_run=args.dry_run, on_event=on_event
+        )
+    except (ValueError, OSError) as e:
+        writer.emit('error', flush=True, message=str(e), type=type(e).__name__)
+        return EXIT_USAGE
+
+    def on_signal():
+        stop_event.set()
+        daemon.stop()
+
+    _install_signal_handlers(on_signal)
+    try:
+        daemon.run(stop_event, once=args.once)
+    except Exception as e:
+        writer.emit('error', flush=True, message=str(e), type=type(e).__name__)
+        return EXIT_ERROR
+    return EXIT_CANCELLED if stop_event.is_set() else EXIT_OK
+
+
+def main(argv: List[str] = None) -> int:
+    """Ponto de entrada da linha de comando; retorna o código de saída."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        return list_categories()
+
+    known = get_system_cleaner()().get_categories()
+    unknown = [c for c in args.categories if c not in known]
+    if unknown:
+        parser.error(f"categorias desconhecidas: {', '.join(unknown)}")
+    if args.command == 'daemon':
+        return run_daemon(args)
+    if args.all_users:
+        if sys.platform == 'win32':
+            parser.error("--all-users requer root no Linux")
+        from app.cleaner import multiuser
+        if not multiuser.is_root():
+            parser.error("--all-users requer root no Linux")
+
+    cancel_token = CancelToken()
+    _install_signal_handlers(cancel_token.cancel)
+    kwargs = dict(clean=args.clean, batch=args.batch, all_users=args.all_users,
+                  cancel_token=cancel_token)
+    if args.profile:
+        # Como nas tarefas da API e da interface (app.jobs)
+        from app.profiling import new_profile_path, run_profiled
+        path = new_profile_path('cli-clean' if args.clean else 'cli-scan')
+        return run_profiled(path, run_scan, args.categories, profile_path=path, **kwargs)
+    return run_scan(args.categories, **kwargs)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Modo Daemon
+Autor: David Fernandes
+Descrição: Monitora espaço e inodes livres dos sistemas de arquivos com
+           os.statvfs e, ao cruzar o limite, analisa as categorias
+           configuradas daquele sistema de arquivos e limpa apenas o
+           necessário (FreeSpacePolicy) para voltar à meta.
+
+Histerese: a pressão começa abaixo de 'low' e só termina acima de 'high';
+a limpeza mira 'high'. Entre duas limpezas do mesmo sistema de arquivos
+há um intervalo mínimo (cooldown). O intervalo de amostragem encurta
+conforme a taxa de consumo aproxima o limite.
+"""
+
+import os
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.utils import get_logger, format_size, CancelToken
+from app.policy import FreeSpacePolicy, get_disk_usage, find_mount_point, select_lru, ORDER_FIELDS
+
+
+# Categorias regeneráveis analisadas por padrão
+DEFAULT_CATEGORIES = ('tmp', 'user_cache', 'dev_cache_budget', 'thumbnails')
+
+# Limites padrão (% livre): pressão abaixo de LOW, meta/saída em HIGH
+DEFAULT_LOW_PERCENT = 10.0
+DEFAULT_HIGH_PERCENT = 15.0
+DEFAULT_LOW_INODES_PERCENT = 5.0
+DEFAULT_HIGH_INODES_PERCENT = 10.0
+
+# Intervalo de amostragem (segundos)
+DEFAULT_MIN_INTERVAL = 5.0
+DEFAULT_MAX_INTERVAL = 300.0
+
+# Intervalo mínimo entre limpezas do mesmo sistema de arquivos (segundos)
+DEFAULT_COOLDOWN = 600.0
+
+# Resultados de uma categoria são reaproveitados por este tempo (segundos)
+DEFAULT_RESCAN_AFTER = 300.0
+
+# Fração do tempo estimado até o limite usada como próximo intervalo
+INTERVAL_SAFETY = 0.25
+
+
+def sample_filesystem(path: str) -> Dict[str, Optional[int]]:
+    """
+    Lê espaço e inodes livres do sistema de arquivos que contém o caminho.
+
+    Returns:
+        Dicionário com 'total', 'free', 'inodes' e 'free_inodes' (os dois
+        últimos None onde o statvfs não existe ou não informa inodes)
+    """
+    usage = get_disk_usage(path)
+    inodes = free_inodes = None
+    if hasattr(os, 'statvfs'):
+        st = os.statvfs(path)
+        # Sistemas sem limite de inodes (btrfs, alguns FUSE) informam 0
+        if st.f_files:
+            inodes = st.f_files
+            free_inodes = st.f_favail
+    return {'total': usage['total'], 'free': usage['free'],
+            'inodes': inodes, 'free_inodes': free_inodes}
+
+
+def _percent(part: int, total: int) -> float:
+    return part * 100 / total if total else 100.0
+
+
+class WatchedFilesystem:
+    """Estado de monitoramento de um sistema de arquivos."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mount_point = find_mount_point(path)
+        self.device = os.stat(path).st_dev
+        self.under_pressure = False
+        self.last_clean = None
+        self.last_sample = None
+        self.last_sample_at = None
+        self.next_sample_at = 0.0
+
+
+class Daemon:
+    """
+    Rede de segurança contra disco cheio.
+
+    Cada chamada a tick() amostra os sistemas de arquivos vencidos, limpa
+    os que estão sob pressão (respeitando o cooldown) e retorna quantos
+    segundos esperar até a próxima amostra.
+    """
+
+    def __init__(self, paths: Iterable[str] = ('/',),
+                 categories: Iterable[str] = DEFAULT_CATEGORIES,
+                 low_percent: float = DEFAULT_LOW_PERCENT,
+                 high_percent: float = DEFAULT_HIGH_PERCENT,
+                 low_inodes_percent: float = DEFAULT_LOW_INODES_PERCENT,
+                 high_inodes_percent: float = DEFAULT_HIGH_INODES_PERCENT,
+                 min_interval: float = DEFAULT_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 cooldown: float = DEFAULT_COOLDOWN,
+                 rescan_after: float = DEFAULT_RESCAN_AFTER,
+                 order: str = 'atime', dry_run: bool = False,
+                 cleaner=None, on_event: Callable = None,
+                 sampler: Callable = sample_filesystem, clock: Callable = time.monotonic):
+        """
+        Args:
+            paths: Caminhos dos sistemas de arquivos monitorados
+            categories: Categorias analisadas e limpas sob pressão
+            low_percent / high_percent: Limites de espaço livre (%)
+            low_inodes_percent / high_inodes_percent: Limites de inodes livres (%)
+            min_interval / max_interval: Faixa do intervalo de amostragem (s)
+            cooldown: Intervalo mínimo entre limpezas de um sistema de arquivos (s)
+            rescan_after: Idade máxima dos resultados reaproveitados (s)
+            order: 'atime' ou 'mtime' - critério de antiguidade
+            dry_run: Apenas planeja, sem remover
+            cleaner: Cleaner do sistema (padrão: o do sistema operacional)
+            on_event: Callback opcional (evento, **campos) para cada ação
+            sampler: Função de amostragem (injetável em testes)
+            clock: Relógio monotônico (injetável em testes)
+        """
+        if not 0 <= low_percent <= high_percent <= 100:
+            raise ValueError("Os limites devem satisfazer 0 <= low <= high <= 100")
+        if not 0 <= low_inodes_percent <= high_inodes_percent <= 100:
+            raise ValueError("Os limites de inodes devem satisfazer 0 <= low <= high <= 100")
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Os intervalos devem satisfazer 0 < min <= max")
+        if order not in ORDER_FIELDS:
+            raise ValueError(f"Ordenação inválida: {order}")
+
+        if cleaner is None:
+            from app.cleaner import get_system_cleaner
+            cleaner = get_system_cleaner()()
+
+        self.logger = get_logger("Daemon")
+        self.cleaner = cleaner
+        self.categories = list(categories)
+        self.low_percent = low_percent
+        self.high_percent = high_percent
+        self.low_inodes_percent = low_inodes_percent
+        self.high_inodes_percent = high_inodes_percent
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cooldown = cooldown
+        self.rescan_after = rescan_after
+        self.order = order
+        self.dry_run = dry_run
+        self.on_event = on_event
+        self.sampler = sampler
+        self.clock = clock
+        self.cancel_token = CancelToken()
+
+        # Um registro por sistema de arquivos (caminhos no mesmo dispositivo se fundem)
+        self.filesystems = {}
+        for path in paths:
+            fs = WatchedFilesystem(path)
+            self.filesystems.setdefault(fs.device, fs)
+
+        # Cache da análise incremental: categoria -> (instante, resultado)
+        self._scan_cache = {}
+
+    def _emit(self, event: str, **fields):
+        if self.on_event:
+            self.on_event(event, **fields)
+
+    # === Amostragem ===
+
+    def _pressure(self, sample: Dict) -> Dict[str, bool]:
+        """Quais recursos estão abaixo do limite baixo e acima do alto."""
+        free_pct = _percent(sample['free'], sample['total'])
+        below = {'space': free_pct < self.low_percent}
+        above = {'space': free_pct >= self.high_percent}
+        if sample['inodes']:
+            inode_pct = _percent(sample['free_inodes'], sample['inodes'])
+            below['inodes'] = inode_pct < self.low_inodes_percent
+            above['inodes'] = inode_pct >= self.high_inodes_percent
+        return {'below': any(below.values()), 'recovered': all(above.values()),
+                'inodes': below.get('inodes', False)}
+
+    def _next_interval(self, fs: WatchedFilesystem, sample: Dict, now: float) -> float:
+        """
+        Intervalo até a próxima amostra: uma fração do tempo estimado até
+        o limite baixo, pela taxa de consumo desde a amostra anterior.
+        """
+        if fs.under_pressure:
+            return self.min_interval
+
+        intervals = [self.max_interval]
+        previous, previous_at = fs.last_sample, fs.last_sample_at
+        if previous is not None and now > previous_at:
+            elapsed = now - previous_at
+            checks = [('free', 'total', self.low_percent)]
+            if sample['inodes'] and previous['inodes']:
+                checks.append(('free_inodes', 'inodes', self.low_inodes_percent))
+            for free_key, total_key, low in checks:
+                rate = (previous[free_key] - sample[free_key]) / elapsed
+                if rate <= 0:
+                    continue
+                headroom = sample[free_key] - sample[total_key] * low / 100
+                intervals.append(max(0.0, headroom) / rate * INTERVAL_SAFETY)
+
+        return max(self.min_interval, min(intervals))
+
+    def tick(self) -> float:
+        """
+        Amostra os sistemas de arquivos vencidos e reage à pressão.
+
+        Returns:
+            Segundos até a próxima amostra
+        """
+        now = self.clock()
+        for fs in self.filesystems.values():
+            if now < fs.next_sample_at:
+                continue
+            try:
+                sample = self.sampler(fs.path)
+            except OSError as e:
+                self.logger.warning(f"Não foi possível ler {fs.path}: {e}")
+                fs.next_sample_at = now + self.max_interval
+                continue
+
+            pressure = self._pressure(sample)
+            if pressure['below'] and not fs.under_pressure:
+                fs.under_pressure = True
+                self.logger.warning(
+                    f"Pressão em {fs.mount_point}: {format_size(sample['free'])} livres"
+                )
+                self._emit('pressure', mount_point=fs.mount_point, **sample)
+            elif fs.under_pressure and pressure['recovered']:
+                fs.under_pressure = False
+                self.logger.info(f"{fs.mount_point} voltou ao normal")
+                self._emit('recovered', mount_point=fs.mount_point, **sample)
+
+            cooling = fs.last_clean is not None and now - fs.last_clean < self.cooldown
+            if fs.under_pressure and pressure['below'] and not cooling:
+                fs.last_clean = now
+                self._relieve(fs, sample, pressure['inodes'])
+
+            fs.next_sample_at = now + self._next_interval(fs, sample, now)
+            fs.last_sample, fs.last_sample_at = sample, now
+
+        return max(0.0, min(fs.next_sample_at for fs in self.filesystems.values()) - self.clock())
+
+    # === Análise e limpeza ===
+
+    def _categories_on(self, device: int) -> List[str]:
+        """Categorias configuradas com alguma raiz no dispositivo."""
+        roots = self.cleaner.get_category_roots()
+        selected = []
+        for cat_id in self.categories:
+            for root in roots.get(cat_id, []):
+                try:
+                    if os.stat(root['path']).st_dev == device:
+                        selected.append(cat_id)
+                        break
+                except OSError:
+                    continue
+        return selected
+
+    def _scan(self, categories: List[str]) -> Dict[str, Dict]:
+        """
+        Análise incremental: reaproveita os resultados recentes e só
+        analisa de novo as categorias com resultado vencido.
+        """
+        now = self.clock()
+        stale = [
+            cat_id for cat_id in categories
+            if cat_id not in self._scan_cache or now - self._scan_cache[cat_id][0] > self.rescan_after
+        ]
+        # As vencidas são analisadas juntas, numa única varredura
+        if stale:
+            scanned = self.cleaner.scan_categories(stale, self.cancel_token)
+            for cat_id, (files, size) in scanned.items():
+                self._scan_cache[cat_id] = (now, {'files': files, 'size': size, 'name': cat_id})
+        return {cat_id: self._scan_cache[cat_id][1] for cat_id in categories if cat_id in self._scan_cache}
+
+    def _inode_plan(self, fs: WatchedFilesystem, sample: Dict, results: Dict) -> Dict:
+        """Seleciona os arquivos mais antigos até cobrir o déficit de inodes."""
+        target = int(sample['inodes'] * self.high_inodes_percent / 100)
+        deficit = max(0, target - sample['free_inodes'])
+        field = ORDER_FIELDS[self.order]
+        candidates = []
+        for cat_id, result in results.items():
+            for file_path in result['files']:
+                try:
+                    st = os.lstat(file_path)
+                except OSError:
+                    continue
+                if st.st_dev == fs.device:
+                    candidates.append((getattr(st, field), file_path, cat_id, 1))
+
+        chosen, _ = select_lru(candidates, deficit)
+        selected = {}
+        for _, file_path, cat_id, _ in chosen:
+            selected.setdefault(cat_id, []).append(file_path)
+        return {'selected': selected, 'total_files': len(chosen), 'inode_deficit': deficit}
+
+    def _relieve(self, fs: WatchedFilesystem, sample: Dict, inode_pressure: bool):
+        """Analisa e limpa o necessário para levar o sistema de arquivos à meta."""
+        categories = self._categories_on(fs.device)
+        if not categories:
+            self.logger.warning(f"Nenhuma categoria configurada em {fs.mount_point}")
+            self._emit('no_categories', mount_point=fs.mount_point)
+            return
+
+        results = self._scan(categories)
+        policy = FreeSpacePolicy(target_free_percent=self.high_percent,
+                                 order=self.order, paths=[fs.path])
+        plan = policy.plan(results)
+
+        # Sob pressão de inodes, complementa com os mais antigos até cobrir o déficit
+        if inode_pressure:
+            inode_plan = self._inode_plan(fs, sample, results)
+            for cat_id, files in inode_plan['selected'].items():
+                chosen = plan['selected'].setdefault(cat_id, [])
+                known = set(chosen)
+                chosen.extend(f for f in files if f not in known)
+            plan['total_files'] = sum(len(files) for files in plan['selected'].values())
+
+        self._emit('plan', mount_point=fs.mount_point, categories=categories,
+                   files=plan['total_files'], to_free=plan['total_to_free'], dry_run=self.dry_run)
+        if self.dry_run or not plan['total_files']:
+            return
+
+        removed, size_freed, errors, _ = policy.apply(self.cleaner, plan)
+        # Arquivos removidos saem do cache da análise
+        for cat_id in plan['selected']:
+            self._scan_cache.pop(cat_id, None)
+
+        self.logger.info(
+            f"Limpeza em {fs.mount_point}: {removed} arquivos ({format_size(size_freed)}), {errors} erros"
+        )
+        self._emit('cleaned', mount_point=fs.mount_point, removed=removed,
+                   size_freed=size_freed, errors=errors)
+
+    # === Laço principal ===
+
+    def run(self, stop_event: threading.Event = None, once: bool = False):
+        """
+        Executa até stop_event ser sinalizado (ou uma única amostragem com once).
+        """
+        stop_event = stop_event or threading.Event()
+        self.logger.info(
+            f"Daemon monitorando {', '.join(fs.mount_point for fs in self.filesystems.values())}"
+        )
+        while not stop_event.is_set():
+            delay = self.tick()
+            if once:
+                break
+            stop_event.wait(delay)
+
+    def stop(self):
+        """Interrompe uma análise em andamento."""
+        self.cancel_token.cancel()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Estimativa Rápida de Tamanho
+Autor: David Fernandes
+Descrição: Estima quanto espaço cada categoria ocupa em ~100 ms, por
+           amostragem aleatória da árvore de diretórios, com intervalo de
+           confiança, antes de pagar por uma análise completa.
+"""
+
+import os
+import math
+import time
+import random
+import fnmatch
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from app.policy import get_disk_usage
+
+
+# Tempo total padrão para estimar todas as categorias (segundos)
+DEFAULT_BUDGET = 0.1
+
+# Fração do tempo de cada raiz gasta tentando listar a árvore inteira
+EXACT_WALK_SHARE = 0.5
+
+# z para intervalo de confiança de 95%
+Z_95 = 1.96
+
+
+class SizeEstimator:
+    """
+    Estimador de Knuth para o tamanho de uma árvore de diretórios.
+
+    Cada sonda desce da raiz escolhendo um subdiretório aleatório por
+    nível; os bytes encontrados em cada nível são multiplicados pelo
+    produto dos fatores de ramificação até ali. A média das sondas é um
+    estimador não-viesado do total, e a variância entre elas dá o
+    intervalo de confiança. As listagens ficam em cache, então sondas
+    repetidas só pagam pelos diretórios ainda não visitados.
+
+    Antes das sondas, metade do tempo é usada numa listagem em largura:
+    árvores pequenas são percorridas por inteiro e o resultado é exato.
+
+    Cada raiz é um dicionário com:
+        path: Diretório (ou arquivo) a medir
+        patterns: Padrões fnmatch do nome do arquivo (opcional)
+        max_age_days: Conta só arquivos mais antigos que isso (opcional)
+        exclude: Nomes ignorados no primeiro nível (opcional)
+        budget: Bytes mantidos por limite de tamanho; só o excesso conta (opcional)
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self._rng = random.Random(seed)
+
+    def estimate(self, roots: List[Dict], budget: float = DEFAULT_BUDGET) -> Dict:
+        """
+        Estima o total de uma categoria (soma das raízes).
+
+        Args:
+            roots: Raízes da categoria
+            budget: Tempo máximo em segundos
+
+        Returns:
+            Dicionário com 'bytes', 'low', 'high', 'exact' e 'probes'
+        """
+        total = {'bytes': 0, 'low': 0, 'high': 0, 'exact': True, 'probes': 0}
+        existing = [r for r in roots if os.path.lexists(r['path'])]
+        start = time.monotonic()
+
+        for i, root in enumerate(existing):
+            # Divide o tempo que sobrou entre as raízes restantes
+            remaining = budget - (time.monotonic() - start)
+            deadline = time.monotonic() + max(0.0, remaining) / (len(existing) - i)
+            mean, var, observed, probes, exact, cap = self._estimate_root(root, deadline)
+
+            keep = root.get('budget') or 0
+            margin = Z_95 * math.sqrt(var)
+            # Bytes já vistos são um limite inferior garantido; o uso do
+            # sistema de arquivos, um limite superior
+            low = max(observed, mean - margin)
+            high = mean + margin
+            if cap is not None:
+                high = min(high, cap)
+            high = max(high, low)
+            mean = min(max(mean, low), high)
+
+            total['bytes'] += max(0, int(mean) - keep)
+            total['low'] += max(0, int(low) - keep)
+            total['high'] += max(0, int(high) - keep)
+            total['probes'] += probes
+            total['exact'] = total['exact'] and exact
+
+        return total
+
+    def _estimate_root(self, root: Dict, deadline: float) -> Tuple[float, float, int, int, bool, Optional[int]]:
+        """
+        Estima uma raiz.
+
+        Returns:
+            Tupla (média, variância da média, bytes vistos, sondas, exato,
+            limite superior pelo uso do sistema de arquivos)
+        """
+        path = str(root['path'])
+        patterns = root.get('patterns')
+        exclude = set(root.get('exclude') or ())
+        cutoff = None
+        if root.get('max_age_days'):
+            cutoff = time.time() - root['max_age_days'] * 86400
+
+        try:
+            cap = get_disk_usage(path)['used']
+        except OSError:
+            cap = None
+
+        if not os.path.isdir(path) or os.path.islink(path):
+            size = self._file_bytes(path, patterns, cutoff)
+            return float(size), 0.0, size, 0, True, cap
+
+        listings = {}
+
+        def listing(dir_path: str) -> Tuple[int, List[str]]:
+            cached = listings.get(dir_path)
+            if cached is None:
+                skip = exclude if dir_path == path else ()
+                cached = self._list(dir_path, patterns, cutoff, skip)
+                listings[dir_path] = cached
+            return cached
+
+        # Listagem em largura: se terminar no prazo, o resultado é exato
+        walk_deadline = time.monotonic() + (deadline - time.monotonic()) * EXACT_WALK_SHARE
+        frontier = deque([path])
+        while frontier and time.monotonic() < walk_deadline:
+            dir_path = frontier.popleft()
+            frontier.extend(listing(dir_path)[1])
+
+        observed = sum(size for size, _ in listings.values())
+        if not frontier:
+            return float(observed), 0.0, observed, 0, True, cap
+
+        samples = []
+        while True:
+            samples.append(self._probe(path, listing))
+            if time.monotonic() >= deadline:
+                break
+
+        observed = sum(size for size, _ in listings.values())
+        n = len(samples)
+        mean = sum(samples) / n
+        if n > 1:
+            var = sum((s - mean) ** 2 for s in samples) / (n - 1) / n
+        else:
+            # Uma só sonda não dá variância: intervalo bem largo
+            var = mean ** 2
+        return mean, var, observed, n, False, cap
+
+    def _probe(self, root: str, listing) -> float:
+        """Uma sonda aleatória da raiz até uma folha."""
+        weight = 1
+        total = 0.0
+        dir_path = root
+        while True:
+            size, subdirs = listing(dir_path)
+            total += weight * size
+            if not subdirs:
+                return total
+            weight *= len(subdirs)
+            dir_path = self._rng.choice(subdirs)
+
+    @staticmethod
+    def _matches(name: str, st, patterns: Optional[List[str]], cutoff: Optional[float]) -> bool:
+        """Aplica os filtros de padrão e idade da categoria."""
+        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+            return False
+        if cutoff is not None and st.st_mtime > cutoff:
+            return False
+        return True
+
+    def _file_bytes(self, path: str, patterns, cutoff) -> int:
+        """Tamanho de uma raiz que é um arquivo."""
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return 0
+        return st.st_size if self._matches(os.path.basename(path), st, patterns, cutoff) else 0
+
+    def _list(self, dir_path: str, patterns, cutoff, exclude) -> Tuple[int, List[str]]:
+        """Bytes dos arquivos do diretório (sem recursão) e seus subdiretórios."""
+        size = 0
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.name in exclude:
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if self._matches(entry.name, st, patterns, cutoff):
+                        size += st.st_size
+        except OSError:
+            pass
+        return size, subdirs
+
+
+def estimate_categories(category_roots: Dict[str, List[Dict]], categories: List[str] = None,
+                        budget: float = DEFAULT_BUDGET, seed: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Estima o tamanho de várias categorias dividindo o tempo entre elas.
+
+    Args:
+        category_roots: {categoria: [raízes]} (ver SizeEstimator)
+        categories: Categorias a estimar (padrão: todas)
+        budget: Tempo total em segundos
+        seed: Semente do gerador aleatório (para resultados reproduzíveis)
+
+    Returns:
+        {categoria: {'bytes', 'low', 'high', 'exact', 'probes'}}
+    """
+    estimator = SizeEstimator(seed)
+    if categories is None:
+        categories = list(category_roots)
+    categories = [c for c in categories if c in category_roots]
+
+    results = {}
+    start = time.monotonic()
+    for i, cat_id in enumerate(categories):
+        remaining = max(0.0, budget - (time.monotonic() - start))
+        results[cat_id] = estimator.estimate(category_roots[cat_id], remaining / (len(categories) - i))
+    return results
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Barramento de Eventos
+Autor: David Fernandes
+Descrição: Distribui transições de estado, progresso e linhas de log
+           para os clientes conectados (Server-Sent Events).
+"""
+
+import json
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+
+# Eventos que podem ser substituídos pelo mais recente na fila de um
+# assinante lento (só o último valor importa)
+COALESCED_EVENTS = {'progress'}
+
+
+class Subscription:
+    """
+    Fila limitada de eventos de um único cliente.
+
+    Um cliente lento nunca bloqueia quem publica: eventos de progresso são
+    coalescidos e, se a fila encher, ela é descartada e substituída por um
+    evento 'resync' para que o cliente recarregue o estado completo.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.dropped = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def put(self, event_id: int, event: str, data: dict):
+        """Enfileira um evento (chamado pelo barramento)."""
+        with self._cond:
+            if event in COALESCED_EVENTS and self._queue and self._queue[-1][1] == event:
+                self._queue[-1] = (event_id, event, data)
+            elif len(self._queue) >= self.max_size:
+                self.dropped += len(self._queue)
+                self._queue.clear()
+                self._queue.append((event_id, 'resync', {'dropped': self.dropped}))
+            elif self._queue and self._queue[0][1] == 'resync':
+                # Já vai recarregar tudo; só conta o que foi descartado
+                self.dropped += 1
+            else:
+                self._queue.append((event_id, event, data))
+            self._cond.notify()
+
+    def get(self, timeout: float) -> Optional[Tuple[int, str, dict]]:
+        """
+        Retira o próximo evento.
+
+        Returns:
+            Tupla (id, evento, dados) ou None se o timeout expirar
+        """
+        with self._cond:
+            if not self._queue:
+                self._cond.wait(timeout)
+            if not self._queue:
+                return None
+            return self._queue.popleft()
+
+
+class EventBus:
+    """Barramento publish/subscribe thread-safe."""
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._subscribers = set()
+        self._last_id = 0
+
+    def subscribe(self) -> Subscription:
+        """Registra um novo assinante."""
+        subscription = Subscription(self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove um assinante."""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        """Número de assinantes conectados."""
+        with self._lock:
+            return len(self._subscribers)
+
+    @property
+    def version(self) -> int:
+        """Versão atual: ID do último evento publicado (monotônico)."""
+        with self._lock:
+            return self._last_id
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """
+        Bloqueia até a versão ser diferente de 'version' ou o timeout expirar.
+
+        Returns:
+            A versão atual
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._last_id != version, timeout)
+            return self._last_id
+
+    def publish(self, event: str, data: dict) -> int:
+        """
+        Envia um evento para todos os assinantes.
+
+        Enfileira para os assinantes ainda sob o lock (put nunca bloqueia):
+        assim cada cliente recebe os eventos na ordem dos IDs, mesmo com
+        várias threads publicando ao mesmo tempo.
+
+        Returns:
+            O ID do evento, que passa a ser a versão atual
+        """
+        with self._changed:
+            self._last_id += 1
+            event_id = self._last_id
+            for subscription in self._subscribers:
+                subscription.put(event_id, event, data)
+            self._changed.notify_all()
+        return event_id
+
+
+def format_sse(event: str, data: dict, event_id: int = None) -> str:
+    """
+    Formata um evento no padrão text/event-stream.
+
+    Args:
+        event: Nome do evento
+        data: Dados serializáveis em JSON
+        event_id: ID opcional do evento
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Gerenciador de Tarefas
+Autor: David Fernandes
+Descrição: Executa análises, limpezas e atualizações em threads, com
+           estado protegido por lock e identificadores únicos por tarefa.
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.utils import get_logger, CancelToken
+from app.profiling import new_profile_path, run_profiled
+from app.tracing import new_trace_path, run_traced
+
+
+# Estados possíveis de uma tarefa
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+ACTIVE_STATES = {JOB_PENDING, JOB_RUNNING}
+JOB_STATES = (JOB_PENDING, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+# Tipos de tarefa
+JOB_KINDS = ('scan', 'clean', 'update')
+
+# Tipos de tarefa que mexem nos arquivos (não podem rodar junto com limpeza)
+FILE_JOB_KINDS = {'scan', 'clean'}
+
+
+class JobConflictError(Exception):
+    """Tarefa conflita com outra em andamento."""
+
+
+class Job:
+    """
+    Uma tarefa em execução ou concluída.
+
+    Os campos só devem ser alterados pelo JobManager (sob lock); leitores
+    usam to_dict(), que retorna uma cópia consistente.
+    """
+
+    def __init__(self, kind: str, categories: Iterable[str] = (), params: Dict = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.categories = list(categories)
+        self.params = params or {}
+        self.status = JOB_PENDING
+        self.progress = 0
+        self.current_task = ''
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_token = CancelToken()
+        self.done = threading.Event()
+        # Arquivo .pstats quando a tarefa roda com params['profile']
+        self.profile_path = None
+        # Arquivo de trace (JSON) quando a tarefa roda com params['trace']
+        self.trace_path = None
+
+    @property
+    def is_active(self) -> bool:
+        """True enquanto a tarefa não terminou."""
+        return self.status in ACTIVE_STATES
+
+    def to_dict(self) -> Dict:
+        """Representação serializável (sem o resultado completo)."""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'categories': self.categories,
+            'status': self.status,
+            'progress': self.progress,
+            'current_task': self.current_task,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'cancel_requested': self.cancel_token.cancelled,
+            'profiled': self.profile_path is not None,
+            'traced': self.trace_path is not None,
+        }
+
+
+class JobManager:
+    """
+    Registro thread-safe de tarefas.
+
+    A verificação de conflito e o registro da nova tarefa acontecem sob o
+    mesmo lock, então duas requisições simultâneas nunca passam ambas pela
+    verificação. Análises de categorias diferentes podem rodar em paralelo;
+    uma limpeza é exclusiva em relação a análises e outras limpezas.
+    """
+
+    def __init__(self, on_change: Callable[[Job, set], None] = None, max_finished: int = 50):
+        """
+        Args:
+            on_change: Callback chamado (fora do lock) a cada alteração,
+                       com a tarefa e o conjunto de campos alterados
+            max_finished: Quantas tarefas concluídas manter no histórico
+        """
+        self.logger = get_logger("JobManager")
+        self.on_change = on_change
+        self.max_finished = max_finished
+        self._lock = threading.RLock()
+        self._jobs = OrderedDict()
+
+    def _conflicts(self, kind: str, categories: Iterable[str]) -> Optional[Job]:
+        """Retorna a tarefa ativa que impede a nova, se houver."""
+        categories = set(categories)
+        for job in self._jobs.values():
+            if not job.is_active:
+                continue
+            if kind == job.kind == 'update':
+                return job
+            if kind not in FILE_JOB_KINDS or job.kind not in FILE_JOB_KINDS:
+                continue
+            if 'clean' in (kind, job.kind):
+                return job
+            if categories & set(job.categories):
+                return job
+        return None
+
+    def submit(self, kind: str, target: Callable[[Job], object],
+               categories: Iterable[str] = (), params: Dict = None) -> Job:
+        """
+        Registra e inicia uma tarefa em uma thread separada.
+
+        Args:
+            kind: Tipo da tarefa ('scan', 'clean', 'update')
+            target: Função executada na thread; recebe a Job e retorna o resultado
+            categories: Categorias afetadas (usadas na detecção de conflito)
+            params: Parâmetros extras guardados na tarefa ('profile': True
+                    executa sob o cProfile; 'trace': True grava a linha do tempo)
+
+        Returns:
+            A tarefa criada
+
+        Raises:
+            JobConflictError: Se conflitar com uma tarefa em andamento
+        """
+        with self._lock:
+            blocking = self._conflicts(kind, categories)
+            if blocking:
+                raise JobConflictError(f"Conflita com a tarefa {blocking.id} ({blocking.kind})")
+
+            job = Job(kind, categories, params)
+            self._jobs[job.id] = job
+            self._prune()
+
+        thread = threading.Thread(target=self._run, args=(job, target), name=f"job-{kind}-{job.id}")
+        thread.daemon = True
+        thread.start()
+        return job
+
+    def _run(self, job: Job, target: Callable[[Job], object]):
+        """Executa a tarefa e registra o resultado final."""
+        self.update(job, status=JOB_RUNNING, started_at=time.time())
+        try:
+            result = self._execute(job, target)
+            # Uma tarefa cancelada termina normalmente com resultados parciais
+            status = JOB_CANCELLED if job.cancel_token.cancelled else JOB_COMPLETED
+            self.update(job, status=status, result=result, finished_at=time.time())
+        except Exception as e:
+            self.logger.error(f"Tarefa {job.id} ({job.kind}) falhou: {e}")
+            self.update(job, status=JOB_FAILED, error=str(e), finished_at=time.time())
+        finally:
+            job.done.set()
+
+    def _execute(self, job: Job, target: Callable[[Job], object]):
+        """Chama o alvo sob o tracer e/ou o cProfile, se pedidos."""
+        name = f"{job.kind}-{job.id}"
+
+        def call():
+            if job.params.get('profile'):
+                self.update(job, profile_path=new_profile_path(name))
+                return run_profiled(job.profile_path, target, job)
+            return target(job)
+
+        if job.params.get('trace'):
+            self.update(job, trace_path=new_trace_path(name))
+            return run_traced(job.trace_path, name, call)
+        return call()
+
+    def update(self, job: Job, **fields):
+        """Altera campos da tarefa de forma atômica e notifica."""
+        with self._lock:
+            for key, value in fields.items():
+                setattr(job, key, value)
+        if self.on_change:
+            self.on_change(job, set(fields))
+
+    def cancel(self, job_id: str = None, kinds: Iterable[str] = FILE_JOB_KINDS) -> List[Job]:
+        """
+        Solicita o cancelamento cooperativo de tarefas ativas.
+
+        Args:
+            job_id: Tarefa específica; se omitido cancela todas as ativas
+            kinds: Tipos considerados quando job_id é omitido
+
+        Returns:
+            Tarefas que receberam o pedido de cancelamento
+        """
+        with self._lock:
+            if job_id is not None:
+                job = self._jobs.get(job_id)
+                targets = [job] if job is not None and job.is_active else []
+            else:
+                targets = [j for j in self._jobs.values() if j.is_active and j.kind in kinds]
+            for job in targets:
+                job.cancel_token.cancel()
+
+        for job in targets:
+            if self.on_change:
+                self.on_change(job, {'cancel_requested'})
+        return targets
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retorna a tarefa pelo ID."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind: str = None, active: bool = None) -> List[Job]:
+        """Lista tarefas (mais antigas primeiro), com filtros opcionais."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if kind is not None:
+            jobs = [j for j in jobs if j.kind == kind]
+        if active is not None:
+            jobs = [j for j in jobs if j.is_active == active]
+        return jobs
+
+    def snapshot(self, job: Job) -> Dict:
+        """Cópia consistente dos campos públicos da tarefa."""
+        with self._lock:
+            return job.to_dict()
+
+    def _prune(self):
+        """Descarta as tarefas concluídas mais antigas além do limite."""
+        finished = [j.id for j in self._jobs.values() if not j.is_active]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Buffer Circular de Logs
+Autor: David Fernandes
+Descrição: Guarda as últimas linhas de log com números de sequência para
+           que os clientes busquem apenas as linhas novas.
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+
+class LogRingBuffer:
+    """
+    Buffer circular de capacidade fixa com números de sequência.
+
+    Cada linha recebe um 'seq' crescente. A linha de seq N fica na posição
+    N % capacidade, então append e leitura incremental são O(1) por linha
+    e a memória é constante.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._lock = threading.Lock()
+        # Próximo seq a ser atribuído e primeiro seq ainda disponível
+        self._next_seq = 1
+        self._first_seq = 1
+        # Maior seq descartado por estouro de capacidade (não por clear)
+        self._evicted_through = 0
+
+    def append(self, message: str, level: str = 'info') -> Dict:
+        """Adiciona uma linha e retorna a entrada criada."""
+        with self._lock:
+            seq = self._next_seq
+            entry = {'seq': seq, 'message': message, 'level': level}
+            self._slots[seq % self.capacity] = entry
+            self._next_seq += 1
+            if seq - self._first_seq >= self.capacity:
+                self._evicted_through = self._first_seq
+                self._first_seq += 1
+            return entry
+
+    def clear(self):
+        """Descarta todas as linhas (a sequência continua crescendo)."""
+        with self._lock:
+            self._first_seq = self._next_seq
+            self._slots = [None] * self.capacity
+
+    def __len__(self) -> int:
+        """Quantidade de linhas disponíveis."""
+        with self._lock:
+            return self._next_seq - self._first_seq
+
+    @property
+    def last_seq(self) -> int:
+        """Seq da última linha adicionada (0 se nenhuma)."""
+        with self._lock:
+            return self._next_seq - 1
+
+    def since(self, after: int = 0, limit: int = None) -> Tuple[List[Dict], int]:
+        """
+        Retorna as linhas com seq maior que 'after'.
+
+        Args:
+            after: Último seq que o cliente já tem
+            limit: Quantidade máxima de linhas
+
+        Returns:
+            Tupla com (linhas, quantidade de linhas perdidas por estouro
+            do buffer desde 'after')
+        """
+        with self._lock:
+            start = max(after + 1, self._first_seq)
+            end = self._next_seq
+            if limit is not None:
+                end = min(end, start + limit)
+            entries = [self._slots[seq % self.capacity] for seq in range(start, end)]
+            dropped = max(0, self._evicted_through - after)
+            return entries, dropped
+
+    def tail(self, count: int) -> List[Dict]:
+        """Retorna as últimas 'count' linhas."""
+        with self._lock:
+            start = max(self._first_seq, self._next_seq - count)
+            return [self._slots[seq % self.capacity] for seq in range(start, self._next_seq)]
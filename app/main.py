@@ -8,28 +8,24 @@ Descrição: Ferramenta cross-platform para limpeza de arquivos temporários,
 """
 
 import os
-import sys
 import platform
 import threading
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox
 from datetime import datetime
 
-# Adiciona o diretório pai ao path para imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
+from app.scan_index import ScanIndex
 from app.utils import (
     format_size, 
     get_logger, 
     CENTER_WINDOW,
-    COLORS
+    COLORS,
+    CancelToken
 )
-
-# Importa o cleaner apropriado baseado no SO
-if platform.system() == 'Windows':
-    from app.cleaner.windows import WindowsCleaner as SystemCleaner
-else:
-    from app.cleaner.linux import LinuxCleaner as SystemCleaner
+from app.profiling import new_profile_path, run_profiled
+from app.uiqueue import UIDispatcher
+from app.widgets import BoundedLogView, ResultsTree
+from app.cleaner import get_system_cleaner
 
 
 class LimpezaDavidApp:
@@ -37,7 +33,7 @@ class LimpezaDavidApp:
     Aplicação principal com interface gráfica Tkinter.
     """
     
-    def __init__(self):
+    def __init__(self, profile: bool = False):
         self.root = tk.Tk()
         self.root.title("Limpeza David - Limpador de Sistema")
         self.root.geometry("800x600")
@@ -47,23 +43,36 @@ class LimpezaDavidApp:
         # self._set_icon()
         
         # Inicializa o cleaner
-        self.cleaner = SystemCleaner()
+        self.cleaner = get_system_cleaner()()
         self.logger = get_logger("LimpezaDavid")
         
         # Variáveis de controle
         self.scan_results = {}
+        self.scan_sizes = {}
+        self.scan_total = (0, 0)
         self.is_scanning = False
         self.is_cleaning = False
+        self.cancel_token = None
+        # Roda análises e limpezas sob o cProfile (run.py --profile)
+        self.profile = profile
         
         # Checkboxes para categorias
         self.category_vars = {}
         
+        # Atualizações vindas das threads de trabalho passam por esta fila
+        self.ui = UIDispatcher(self.root)
+        
         # Configura o estilo
         self._setup_style()
         
         # Constrói a interface
         self._build_ui()
         
+        self.ui.on_batch('log', self.log_text.append)
+        self.ui.on_value('status', self._set_status)
+        self.ui.on_value('progress', self.progress_var.set)
+        self.ui.start()
+        
         # Centraliza a janela
         CENTER_WINDOW(self.root)
         
@@ -199,6 +208,15 @@ class LimpezaDavidApp:
         )
         self.clean_btn.pack(side=tk.LEFT, padx=(0, 10))
         
+        self.cancel_btn = ttk.Button(
+            buttons_frame,
+            text="⏹️ Cancelar",
+            style='Secondary.TButton',
+            command=self._cancel,
+            state=tk.DISABLED
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
         self.select_all_btn = ttk.Button(
             buttons_frame,
             text="✅ Selecionar Todos",
@@ -238,13 +256,18 @@ class LimpezaDavidApp:
         # === Área de Resultados/Log ===
         results_frame = ttk.LabelFrame(
             main_frame,
-            text="📋 Log de Operações",
+            text="📋 Log e Resultados",
             padding="10"
         )
         results_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
         
-        self.log_text = scrolledtext.ScrolledText(
-            results_frame,
+        notebook = ttk.Notebook(results_frame)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        
+        # Mantém poucas linhas no widget; o histórico completo fica no
+        # buffer do BoundedLogView, com filtro
+        self.log_text = BoundedLogView(
+            notebook,
             height=12,
             font=('Consolas', 9),
             wrap=tk.WORD,
@@ -252,7 +275,11 @@ class LimpezaDavidApp:
             fg='#d4d4d4',
             insertbackground='white'
         )
-        self.log_text.pack(fill=tk.BOTH, expand=True)
+        notebook.add(self.log_text, text="Log")
+        
+        # Árvore dos resultados: filhos carregados ao expandir
+        self.results_tree = ResultsTree(notebook, on_change=self._on_exclusions_changed)
+        notebook.add(self.results_tree, text="🌳 Resultados")
         
         # Tags para colorir o log
         self.log_text.tag_configure('info', foreground='#569cd6')
@@ -290,24 +317,34 @@ class LimpezaDavidApp:
         self._log("Clique em 'Analisar Sistema' para iniciar.", 'info')
         
     def _log(self, message, tag=None):
-        """Adiciona mensagem ao log."""
-        self.log_text.configure(state=tk.NORMAL)
-        if tag:
-            self.log_text.insert(tk.END, message + "\n", tag)
-        else:
-            self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state=tk.DISABLED)
+        """Adiciona mensagem ao log (de qualquer thread)."""
+        self.ui.post('log', (message, tag))
         
     def _update_status(self, message):
-        """Atualiza o status."""
+        """Atualiza o status (de qualquer thread; vale o último do quadro)."""
+        self.ui.set('status', message)
+        
+    def _set_status(self, message):
         self.status_label.configure(text=message)
-        self.root.update_idletasks()
         
     def _update_progress(self, value):
-        """Atualiza a barra de progresso."""
-        self.progress_var.set(value)
-        self.root.update_idletasks()
+        """Atualiza a barra de progresso (de qualquer thread; vale o último do quadro)."""
+        self.ui.set('progress', value)
+        
+    def _on_exclusions_changed(self, size, files):
+        """Atualiza o resumo quando subárvores são excluídas da limpeza."""
+        if not self.scan_results or self.is_scanning or self.is_cleaning:
+            return
+        total_size, total_files = self.scan_total
+        text = f"Espaço a liberar: {format_size(max(0, total_size - size))}"
+        if files:
+            text += f" ({format_size(size)} excluídos)"
+        self.summary_label.configure(text=text)
+        
+    def _job_finished(self):
+        """Reabilita os botões ao fim de uma análise ou limpeza (thread do Tk)."""
+        self.scan_btn.configure(state=tk.NORMAL)
+        self.cancel_btn.configure(state=tk.DISABLED)
         
     def _select_all(self):
         """Seleciona todas as categorias."""
@@ -319,6 +356,14 @@ class LimpezaDavidApp:
         for var in self.category_vars.values():
             var.set(False)
             
+    def _cancel(self):
+        """Solicita o cancelamento da operação em andamento."""
+        if self.cancel_token is not None and not self.cancel_token.cancelled:
+            self.cancel_token.cancel()
+            self.cancel_btn.configure(state=tk.DISABLED)
+            self._log("⏹️ Cancelamento solicitado...", 'warning')
+            self._update_status("Cancelando...")
+            
     def _get_selected_categories(self):
         """Retorna as categorias selecionadas."""
         return [cat_id for cat_id, var in self.category_vars.items() if var.get()]
@@ -337,13 +382,23 @@ class LimpezaDavidApp:
             return
             
         self.is_scanning = True
+        self.cancel_token = CancelToken()
+        self.results_tree.clear()
         self.scan_btn.configure(state=tk.DISABLED)
         self.clean_btn.configure(state=tk.DISABLED)
+        self.cancel_btn.configure(state=tk.NORMAL)
         
-        thread = threading.Thread(target=self._scan_thread, args=(selected,))
+        thread = threading.Thread(target=self._run_job, args=('scan', self._scan_thread, selected))
         thread.daemon = True
         thread.start()
         
+    def _run_job(self, name, target, *args):
+        """Executa a thread de trabalho, sob o cProfile se habilitado."""
+        if self.profile:
+            run_profiled(new_profile_path(f"gui-{name}"), target, *args)
+        else:
+            target(*args)
+            
     def _scan_thread(self, categories):
         """Thread de análise."""
         try:
@@ -354,18 +409,25 @@ class LimpezaDavidApp:
             total_size = 0
             total_files = 0
             self.scan_results = {}
+            # Tamanhos medidos na análise, reaproveitados pela limpeza
+            self.scan_sizes = {}
             
-            for i, cat_id in enumerate(categories):
-                progress = ((i + 1) / len(categories)) * 100
-                self._update_progress(progress)
-                
-                cat_info = self.cleaner.get_categories()[cat_id]
-                self._log(f"  📂 Analisando: {cat_info['name']}...", 'info')
-                self._update_status(f"Analisando: {cat_info['name']}...")
-                
-                # Escaneia a categoria
-                files, size = self.cleaner.scan_category(cat_id)
-                
+            all_categories = self.cleaner.get_categories()
+            for cat_id in categories:
+                self._log(f"  📂 Analisando: {all_categories[cat_id]['name']}...", 'info')
+            
+            def on_progress(done, total, root):
+                # Chamado antes de cada raiz: mostra a que está sendo percorrida
+                self._update_progress((done / total) * 100)
+                self._update_status(f"Analisando: {root}..." if root else "Finalizando análise...")
+            
+            # Uma única varredura para todas as categorias
+            scanned = self.cleaner.scan_categories(
+                categories, self.cancel_token, on_progress, sizes=self.scan_sizes
+            )
+            
+            for cat_id in categories:
+                files, size = scanned.get(cat_id, ([], 0))
                 self.scan_results[cat_id] = {
                     'files': files,
                     'size': size
@@ -374,24 +436,37 @@ class LimpezaDavidApp:
                 total_size += size
                 total_files += len(files)
                 
-                self._log(f"    └─ {len(files)} arquivos ({format_size(size)})", 'success')
+                self._log(f"    └─ {all_categories[cat_id]['name']}: {len(files)} arquivos ({format_size(size)})", 'success')
                 
+            # Índice e árvores montados aqui, fora da thread do Tk
+            index = ScanIndex(self.scan_results)
+            trees = {cat_id: index.tree(cat_id) for cat_id in self.scan_results}
+            names = {cat_id: info['name'] for cat_id, info in self.cleaner.get_categories().items()}
+            self.scan_total = (total_size, total_files)
+            self.ui.call(self.results_tree.load, trees, names)
+            
             self._log("")
             self._log("═" * 50, 'header')
+            if self.cancel_token.cancelled:
+                self._log("⏹️ ANÁLISE CANCELADA (resultados parciais)", 'warning')
             self._log(f"📊 RESUMO DA ANÁLISE:", 'header')
             self._log(f"   Total de arquivos: {total_files}", 'success')
             self._log(f"   Espaço a liberar: {format_size(total_size)}", 'success')
             self._log("═" * 50, 'header')
             
-            self.summary_label.configure(
+            self.ui.call(
+                self.summary_label.configure,
                 text=f"Espaço a liberar: {format_size(total_size)} ({total_files} arquivos)"
             )
             
-            self._update_status("Análise concluída!")
-            self._update_progress(100)
+            if self.cancel_token.cancelled:
+                self._update_status("Análise cancelada")
+            else:
+                self._update_status("Análise concluída!")
+                self._update_progress(100)
             
             if total_files > 0:
-                self.clean_btn.configure(state=tk.NORMAL)
+                self.ui.call(self.clean_btn.configure, state=tk.NORMAL)
                 self._log("")
                 self._log("✅ Clique em 'Limpar Selecionados' para remover os arquivos.", 'info')
             else:
@@ -403,16 +478,23 @@ class LimpezaDavidApp:
             self.logger.error(f"Erro na análise: {e}")
         finally:
             self.is_scanning = False
-            self.scan_btn.configure(state=tk.NORMAL)
+            self.ui.call(self._job_finished)
             
     def _start_clean(self):
         """Inicia a limpeza em uma thread separada."""
         if self.is_cleaning or not self.scan_results:
             return
             
+        # Subárvores excluídas na aba de resultados ficam de fora
+        plan = {
+            cat_id: self.results_tree.files_to_clean(cat_id, result['files'])
+            for cat_id, result in self.scan_results.items()
+        }
+        excluded_size, _ = self.results_tree.excluded_totals()
+        
         # Confirmação
-        total_files = sum(len(r['files']) for r in self.scan_results.values())
-        total_size = sum(r['size'] for r in self.scan_results.values())
+        total_files = sum(len(files) for files in plan.values())
+        total_size = max(0, sum(r['size'] for r in self.scan_results.values()) - excluded_size)
         
         confirm = messagebox.askyesno(
             "Confirmar Limpeza",
@@ -425,15 +507,17 @@ class LimpezaDavidApp:
             return
             
         self.is_cleaning = True
+        self.cancel_token = CancelToken()
         self.scan_btn.configure(state=tk.DISABLED)
         self.clean_btn.configure(state=tk.DISABLED)
+        self.cancel_btn.configure(state=tk.NORMAL)
         
-        thread = threading.Thread(target=self._clean_thread)
+        thread = threading.Thread(target=self._run_job, args=('clean', self._clean_thread, plan))
         thread.daemon = True
         thread.start()
         
-    def _clean_thread(self):
-        """Thread de limpeza."""
+    def _clean_thread(self, plan):
+        """Thread de limpeza ({categoria: arquivos})."""
         try:
             self._log("")
             self._log("🗑️ Iniciando limpeza...", 'header')
@@ -443,14 +527,17 @@ class LimpezaDavidApp:
             total_size_freed = 0
             total_errors = 0
             
-            categories = list(self.scan_results.keys())
+            categories = list(plan.keys())
             
             for i, cat_id in enumerate(categories):
+                if self.cancel_token.cancelled:
+                    break
+                    
                 progress = ((i + 1) / len(categories)) * 100
                 self._update_progress(progress)
                 
                 cat_info = self.cleaner.get_categories()[cat_id]
-                files = self.scan_results[cat_id]['files']
+                files = plan[cat_id]
                 
                 if not files:
                     continue
@@ -458,8 +545,17 @@ class LimpezaDavidApp:
                 self._log(f"  🧹 Limpando: {cat_info['name']}...", 'info')
                 self._update_status(f"Limpando: {cat_info['name']}...")
                 
+                failed_dirs = []
+                
+                def on_dir_report(path, report):
+                    if not report:
+                        failed_dirs.append(report)
+                
                 # Remove os arquivos
-                removed, size_freed, errors = self.cleaner.clean_files(files)
+                removed, size_freed, errors, _ = self.cleaner.clean_files(
+                    files, cancel_token=self.cancel_token, sizes=self.scan_sizes,
+                    on_dir_report=on_dir_report
+                )
                 
                 total_removed += removed
                 total_size_freed += size_freed
@@ -468,27 +564,43 @@ class LimpezaDavidApp:
                 self._log(f"    └─ {removed} removidos ({format_size(size_freed)})", 'success')
                 if errors > 0:
                     self._log(f"    └─ {errors} erros (arquivos em uso ou protegidos)", 'warning')
+                for report in failed_dirs[:3]:
+                    for failure in report.failures[:3]:
+                        self._log(f"      ✗ {failure.path}: {failure.message} ({failure.reason})", 'error')
                     
             self._log("")
             self._log("═" * 50, 'header')
-            self._log(f"✅ LIMPEZA CONCLUÍDA!", 'header')
+            if self.cancel_token.cancelled:
+                self._log("⏹️ LIMPEZA CANCELADA", 'warning')
+            else:
+                self._log(f"✅ LIMPEZA CONCLUÍDA!", 'header')
             self._log(f"   Arquivos removidos: {total_removed}", 'success')
             self._log(f"   Espaço liberado: {format_size(total_size_freed)}", 'success')
             if total_errors > 0:
                 self._log(f"   Erros: {total_errors}", 'warning')
             self._log("═" * 50, 'header')
             
-            self.summary_label.configure(
+            self.ui.call(
+                self.summary_label.configure,
                 text=f"✅ Liberado: {format_size(total_size_freed)}"
             )
             
+            if self.cancel_token.cancelled:
+                # Mantém os resultados: arquivos já removidos são ignorados
+                self._update_status("Limpeza cancelada")
+                self.ui.call(self.clean_btn.configure, state=tk.NORMAL)
+                return
+                
             self._update_status("Limpeza concluída!")
             self._update_progress(100)
             
             # Limpa os resultados
             self.scan_results = {}
+            self.scan_sizes = {}
+            self.ui.call(self.results_tree.clear)
             
-            messagebox.showinfo(
+            self.ui.call(
+                messagebox.showinfo,
                 "Limpeza Concluída",
                 f"✅ Limpeza realizada com sucesso!\n\n"
                 f"Arquivos removidos: {total_removed}\n"
@@ -500,18 +612,24 @@ class LimpezaDavidApp:
             self.logger.error(f"Erro na limpeza: {e}")
         finally:
             self.is_cleaning = False
-            self.scan_btn.configure(state=tk.NORMAL)
+            self.ui.call(self._job_finished)
             
     def run(self):
         """Inicia a aplicação."""
         self.logger.info("Aplicação iniciada")
         self.root.mainloop()
+        self.ui.stop()
         self.logger.info("Aplicação encerrada")
 
 
-def main():
-    """Ponto de entrada principal."""
-    app = LimpezaDavidApp()
+def main(profile: bool = False):
+    """
+    Ponto de entrada principal.
+    
+    Args:
+        profile: Grava um perfil .pstats de cada análise e limpeza
+    """
+    app = LimpezaDavidApp(profile=profile)
     app.run()
 
 
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Métricas de Desempenho
+Autor: David Fernandes
+Descrição: Contadores, gauges e histogramas no formato de texto do
+           Prometheus, expostos pela API em /metrics.
+"""
+
+import abc
+import errno
+import threading
+from bisect import bisect_left
+from typing import Iterable, List, Sequence, Tuple
+
+
+# Content-Type do formato de exposição em texto
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites padrão dos histogramas de duração (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    """Escapa um valor de label."""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """Monta '{a="1",b="2"}' (vazio se não houver labels)."""
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    """Base das famílias de métricas (uma série por combinação de labels)."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 registry: 'Registry' = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            # Série sem labels aparece com zero desde o início
+            self._children[()] = self._new_child()
+        if registry is None:
+            registry = REGISTRY
+        registry.register(self)
+
+    def labels(self, **labels):
+        """Série para a combinação de labels (criada na primeira vez)."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}")
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _default(self):
+        """Série sem labels."""
+        if self.labelnames:
+            raise ValueError(f"{self.name} exige labels {self.labelnames}")
+        return self.labels()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Cria a série de uma combinação de labels."""
+
+    @abc.abstractmethod
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        """Amostras (sufixo, labels formatados, valor) para a exposição."""
+
+    def render(self) -> str:
+        """Bloco de texto da família (HELP, TYPE e amostras)."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, value in self._samples():
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class _Value:
+    """Valor numérico protegido por lock."""
+
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        """Incrementa a série sem labels."""
+        if amount < 0:
+            raise ValueError("Contadores só podem aumentar")
+        self._default().inc(amount)
+
+    def _samples(self):
+        return [('', _format_labels(self.labelnames, key), child.value)
+                for key, child in self._items()]
+
+
+class Gauge(_Metric):
+    """Valor que sobe e desce."""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        """Define o valor da série sem labels."""
+        self._default().set(value)
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def _samples(self):
+        return [('', _format_labels(self.labelnames, key), child.value)
+                for key, child in self._items()]
+
+
+class _HistogramValue:
+    """Contagens por faixa, soma e total de observações."""
+
+    __slots__ = ('_lock', 'upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * len(upper_bounds)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class Histogram(_Metric):
+    """Distribuição de valores em faixas cumulativas."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: 'Registry' = None):
+        self.upper_bounds = tuple(sorted(buckets)) + (float('inf'),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def observe(self, value: float):
+        """Registra uma observação na série sem labels."""
+        self._default().observe(value)
+
+    def _samples(self):
+        samples = []
+        for key, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds, counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                samples.append(('_bucket', _format_labels(self.labelnames, key, le), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append(('_sum', labels, total))
+            samples.append(('_count', labels, cumulative))
+        return samples
+
+
+class Registry:
+    """Conjunto de métricas expostas juntas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(m.render() for m in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+
+# === Métricas do limpador ===
+
+ENTRIES_VISITED = Counter(
+    'limpeza_entries_visited_total',
+    'Entradas do sistema de arquivos examinadas durante as análises')
+FILES_MATCHED = Counter(
+    'limpeza_files_matched_total',
+    'Arquivos selecionados para limpeza', ['category'])
+BYTES_RECLAIMABLE = Counter(
+    'limpeza_bytes_reclaimable_total',
+    'Bytes encontrados para limpeza nas análises', ['category'])
+BYTES_RECLAIMED = Counter(
+    'limpeza_bytes_reclaimed_total',
+    'Bytes efetivamente liberados')
+FILES_REMOVED = Counter(
+    'limpeza_files_removed_total',
+    'Arquivos e diretórios removidos')
+UNLINK_ERRORS = Counter(
+    'limpeza_unlink_errors_total',
+    'Falhas ao remover arquivos ou diretórios', ['reason'])
+SYSCALLS = Counter(
+    'limpeza_syscalls_total',
+    'Chamadas de sistema de arquivos feitas pelo limpador', ['op'])
+SCAN_DURATION = Histogram(
+    'limpeza_scan_duration_seconds',
+    'Duração da análise por categoria', ['category'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+DELETE_LATENCY = Histogram(
+    'limpeza_delete_latency_seconds',
+    'Latência de remoção por arquivo',
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0))
+TREE_REMOVAL_DURATION = Histogram(
+    'limpeza_tree_removal_seconds',
+    'Duração da remoção de um diretório inteiro',
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+SIZE_CACHE = Counter(
+    'limpeza_size_cache_total',
+    'Consultas ao cache de tamanhos de diretório', ['result'])
+JOBS = Gauge(
+    'limpeza_jobs',
+    'Tarefas registradas por tipo e estado', ['kind', 'status'])
+
+
+def record_scan(category: str, files: int, size: int, duration: float):
+    """Registra o resultado da análise de uma categoria."""
+    FILES_MATCHED.labels(category=category).inc(files)
+    BYTES_RECLAIMABLE.labels(category=category).inc(size)
+    SCAN_DURATION.labels(category=category).observe(duration)
+
+
+def error_reason(error: BaseException) -> str:
+    """Nome curto do erro para o label 'reason' (ex: EACCES)."""
+    code = getattr(error, 'errno', None)
+    if code is not None and code in errno.errorcode:
+        return errno.errorcode[code]
+    return type(error).__name__
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Política de Espaço Livre
+Autor: David Fernandes
+Descrição: Seleciona, a partir dos resultados da análise, os arquivos
+           usados há mais tempo (LRU) até atingir uma meta de espaço
+           livre por sistema de arquivos.
+"""
+
+import os
+import shutil
+import heapq
+from pathlib import Path
+from typing import Dict, List, Optional, Iterable, Tuple
+
+from app.utils import get_logger, format_size
+from app.sizes import allocated_size
+
+
+# Ordenações suportadas para a seleção LRU
+ORDER_FIELDS = {
+    'atime': 'st_atime',
+    'mtime': 'st_mtime',
+}
+
+
+def get_disk_usage(path) -> Dict[str, int]:
+    """
+    Retorna o uso de disco do sistema de arquivos que contém o caminho.
+
+    Args:
+        path: Qualquer caminho dentro do sistema de arquivos
+
+    Returns:
+        Dicionário com 'total', 'free' e 'used' em bytes
+    """
+    if hasattr(os, 'statvfs'):
+        st = os.statvfs(path)
+        total = st.f_blocks * st.f_frsize
+        # f_bavail: blocos livres para usuários comuns (sem a reserva do root)
+        free = st.f_bavail * st.f_frsize
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    else:
+        usage = shutil.disk_usage(path)
+        total, free, used = usage.total, usage.free, usage.used
+
+    return {'total': total, 'free': free, 'used': used}
+
+
+def find_mount_point(path) -> str:
+    """Retorna o ponto de montagem que contém o caminho."""
+    path = Path(os.path.abspath(path))
+    try:
+        device = path.lstat().st_dev
+    except OSError:
+        return str(path.anchor or '/')
+
+    while path != path.parent:
+        try:
+            if path.parent.lstat().st_dev != device:
+                break
+        except OSError:
+            break
+        path = path.parent
+
+    return str(path)
+
+
+def select_lru(candidates: List[Tuple], bytes_needed: int) -> Tuple[List[Tuple], int]:
+    """
+    Seleciona os candidatos mais antigos até somar bytes_needed.
+
+    Os candidatos devem ser tuplas cujo primeiro elemento é o timestamp e
+    cujo último elemento é o tamanho em bytes. A lista é transformada em
+    heap no lugar (O(n)) e apenas os itens retirados são ordenados, então
+    o custo é O(n + k log n) para k arquivos selecionados.
+
+    Args:
+        candidates: Lista de tuplas (timestamp, ..., tamanho)
+        bytes_needed: Quantidade de bytes a liberar
+
+    Returns:
+        Tupla com (candidatos selecionados, bytes selecionados)
+    """
+    selected = []
+    selected_bytes = 0
+
+    if bytes_needed <= 0:
+        return selected, selected_bytes
+
+    heapq.heapify(candidates)
+    while candidates and selected_bytes < bytes_needed:
+        item = heapq.heappop(candidates)
+        selected.append(item)
+        selected_bytes += item[-1]
+
+    return selected, selected_bytes
+
+
+class FreeSpacePolicy:
+    """
+    Política que remove dados recuperáveis do mais antigo para o mais
+    recente até que cada sistema de arquivos atinja a meta de espaço livre.
+    """
+
+    def __init__(self, target_free_bytes: Optional[int] = None,
+                 target_free_percent: Optional[float] = None,
+                 order: str = 'atime', paths: Optional[Iterable[str]] = None):
+        """
+        Args:
+            target_free_bytes: Meta de bytes livres por sistema de arquivos
+            target_free_percent: Meta de espaço livre em % (0-100)
+            order: 'atime' ou 'mtime' - critério de antiguidade
+            paths: Restringe a política aos sistemas de arquivos destes caminhos
+        """
+        if target_free_bytes is None and target_free_percent is None:
+            raise ValueError("Informe target_free_bytes ou target_free_percent")
+        if target_free_percent is not None and not 0 <= target_free_percent <= 100:
+            raise ValueError("target_free_percent deve estar entre 0 e 100")
+        if order not in ORDER_FIELDS:
+            raise ValueError(f"Ordenação inválida: {order}")
+
+        self.logger = get_logger("FreeSpacePolicy")
+        self.target_free_bytes = target_free_bytes
+        self.target_free_percent = target_free_percent
+        self.order = order
+        self.devices = None
+
+        if paths:
+            self.devices = set()
+            for p in paths:
+                try:
+                    self.devices.add(os.stat(p).st_dev)
+                except OSError:
+                    self.logger.warning(f"Caminho ignorado na política: {p}")
+
+    def target_for(self, usage: Dict[str, int]) -> int:
+        """Calcula a meta de bytes livres para um sistema de arquivos."""
+        target = 0
+        if self.target_free_bytes is not None:
+            target = max(target, int(self.target_free_bytes))
+        if self.target_free_percent is not None:
+            target = max(target, int(usage['total'] * self.target_free_percent / 100))
+        return target
+
+    def _collect(self, scan_results: Dict[str, Dict]) -> Dict[int, Dict]:
+        """Agrupa os candidatos da análise por dispositivo (st_dev)."""
+        field = ORDER_FIELDS[self.order]
+        devices = {}
+
+        for cat_id, result in scan_results.items():
+            for file_path in result.get('files', []):
+                try:
+                    st = os.lstat(file_path)
+                except OSError:
+                    continue
+
+                if self.devices is not None and st.st_dev not in self.devices:
+                    continue
+
+                device = devices.setdefault(st.st_dev, {
+                    'sample_path': file_path,
+                    'candidates': [],
+                    'reclaimable': 0,
+                })
+                size = allocated_size(st)
+                device['candidates'].append((getattr(st, field), file_path, cat_id, size))
+                device['reclaimable'] += size
+
+        return devices
+
+    def plan(self, scan_results: Dict[str, Dict]) -> Dict:
+        """
+        Calcula o resultado projetado sem remover nada.
+
+        Args:
+            scan_results: Resultados da análise ({categoria: {'files': [...]}})
+
+        Returns:
+            Dicionário com a projeção por sistema de arquivos e os
+            arquivos selecionados por categoria
+        """
+        filesystems = []
+        selected = {}
+        total_to_free = 0
+        total_files = 0
+
+        for device, info in self._collect(scan_results).items():
+            mount = find_mount_point(info['sample_path'])
+            try:
+                usage = get_disk_usage(mount)
+            except OSError as e:
+                self.logger.warning(f"Não foi possível ler {mount}: {e}")
+                continue
+
+            target = self.target_for(usage)
+            deficit = max(0, target - usage['free'])
+            chosen, to_free = select_lru(info['candidates'], deficit)
+
+            for _, file_path, cat_id, _ in chosen:
+                selected.setdefault(cat_id, []).append(file_path)
+
+            projected_free = usage['free'] + to_free
+            filesystems.append({
+                'mount_point': mount,
+                'total': usage['total'],
+                'free': usage['free'],
+                'free_percent': _percent(usage['free'], usage['total']),
+                'target_free': target,
+                'deficit': deficit,
+                'reclaimable': info['reclaimable'],
+                'to_free': to_free,
+                'to_free_formatted': format_size(to_free),
+                'file_count': len(chosen),
+                'projected_free': projected_free,
+                'projected_free_percent': _percent(projected_free, usage['total']),
+                'reachable': to_free >= deficit,
+            })
+
+            total_to_free += to_free
+            total_files += len(chosen)
+
+        return {
+            'order': self.order,
+            'filesystems': filesystems,
+            'selected': selected,
+            'total_files': total_files,
+            'total_to_free': total_to_free,
+            'total_to_free_formatted': format_size(total_to_free),
+        }
+
+    def apply(self, cleaner, plan: Dict, on_file_removed=None) -> Tuple[int, int, int, List[str]]:
+        """
+        Remove os arquivos selecionados por um plano.
+
+        Args:
+            cleaner: Instância de LinuxCleaner/WindowsCleaner
+            plan: Resultado de plan()
+            on_file_removed: Callback opcional repassado ao cleaner
+
+        Returns:
+            Tupla com (arquivos removidos, tamanho liberado, erros, lista de erros)
+        """
+        removed = size_freed = errors = 0
+        error_files = []
+
+        for files in plan['selected'].values():
+            r, s, e, ef = cleaner.clean_files(files, on_file_removed)
+            removed += r
+            size_freed += s
+            errors += e
+            error_files.extend(ef)
+
+        return removed, size_freed, errors, error_files
+
+
+def _percent(part: int, total: int) -> float:
+    """Percentual arredondado, tolerante a total zero."""
+    if total <= 0:
+        return 0.0
+    return round(part * 100 / total, 2)
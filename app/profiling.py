@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Perfil de Desempenho
+Autor: David Fernandes
+Descrição: Executa análises e limpezas sob o cProfile, grava o resultado
+           em .pstats junto aos logs e resume as funções mais custosas.
+           cProfile e pstats só são importados quando usados.
+"""
+
+import io
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from app.utils import get_logger, get_log_path
+
+
+# Ordenações aceitas no resumo -> posição na linha (arquivo, linha, função,
+# chamadas primitivas, chamadas, tempo próprio, tempo acumulado)
+SORT_KEYS = {'cumulative': 6, 'tottime': 5, 'ncalls': 4}
+
+# Quantidade padrão de funções no resumo
+DEFAULT_TOP = 25
+
+
+def profile_dir() -> Path:
+    """Diretório dos perfis (o mesmo dos logs)."""
+    return get_log_path().parent
+
+
+def new_profile_path(name: str) -> Path:
+    """Caminho de um novo perfil (ex: profile_scan-<id>_20250101_120000.pstats)."""
+    return profile_dir() / f"profile_{name}_{time.strftime('%Y%m%d_%H%M%S')}.pstats"
+
+
+def run_profiled(path: Path, func: Callable, *args, **kwargs):
+    """
+    Executa a função sob o cProfile e grava o perfil em 'path'.
+
+    O cProfile só mede a thread atual, então a função deve rodar na
+    própria thread da tarefa. O perfil é gravado mesmo se a função falhar.
+
+    Returns:
+        O resultado da função
+    """
+    import cProfile
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
+        get_logger("Profiling").info(f"Perfil gravado em {path}")
+
+
+def summarize(path: Path, limit: int = DEFAULT_TOP, sort: str = 'cumulative') -> Dict:
+    """
+    Resume um arquivo .pstats.
+
+    Args:
+        path: Caminho do perfil
+        limit: Quantidade de funções
+        sort: 'cumulative', 'tottime' ou 'ncalls'
+
+    Returns:
+        Dicionário com o tempo total, o total de chamadas e as funções
+        mais custosas
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Ordenação inválida: {sort}")
+
+    import pstats
+    
+    stats = pstats.Stats(str(path), stream=io.StringIO())
+
+    rows = [
+        (filename, line, func, cc, nc, tt, ct)
+        for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items()
+    ]
+    rows.sort(key=lambda row: row[SORT_KEYS[sort]], reverse=True)
+
+    return {
+        'path': str(path),
+        'total_time': stats.total_tt,
+        'total_calls': stats.total_calls,
+        'sort': sort,
+        'functions': [
+            {
+                'function': func,
+                'location': f"{filename}:{line}" if line else filename,
+                'ncalls': nc,
+                'primitive_calls': cc,
+                'tottime': round(tt, 6),
+                'cumtime': round(ct, 6),
+            }
+            for filename, line, func, cc, nc, tt, ct in rows[:limit]
+        ],
+    }
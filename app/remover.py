@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Remoção Recursiva
+Autor: David Fernandes
+Descrição: Remove árvores de diretórios por descritores de arquivo
+           (os.open com O_NOFOLLOW | O_DIRECTORY, unlink/rmdir com dir_fd),
+           contando arquivos e bytes removidos por subárvore e registrando
+           cada falha com o motivo. Substitui o shutil.rmtree(ignore_errors),
+           que escondia as falhas e não dizia quanto saiu numa remoção
+           parcial.
+
+Proteção contra corrida de links simbólicos: todo diretório é aberto
+relativo ao descritor do pai e sem seguir links, e o (st_dev, st_ino) do
+descritor aberto é conferido com o do lstat feito antes; se alguém trocar
+um diretório por um link (ou por outro diretório) no meio da remoção, a
+subárvore é recusada com o motivo 'race'. Pontos de montagem dentro da
+árvore também não são atravessados ('mount_point').
+
+Com uma base (ver unlink_beneath e o parâmetro base de remove_tree), o
+caminho até o item também é aberto componente a componente a partir da
+base, sem seguir links: como root, limpando a home de outro usuário ou o
+/tmp, um diretório do caminho trocado por um link entre a análise e a
+remoção não leva a remoção para fora da base.
+
+Sem suporte a dir_fd (Windows) a remoção usa caminhos, com a mesma
+contagem e o mesmo relatório, mas sem a proteção contra corridas.
+"""
+
+import os
+import stat
+import errno
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+from app import tracing
+from app.metrics import SYSCALLS, UNLINK_ERRORS, error_reason
+from app.sizes import allocated_size
+
+
+def _env_workers(default: int = 1) -> int:
+    """LIMPEZA_DAVID_REMOVE_WORKERS; valores inválidos caem para o padrão."""
+    try:
+        return max(1, int(os.environ.get('LIMPEZA_DAVID_REMOVE_WORKERS') or default))
+    except ValueError:
+        return default
+
+
+# Subárvores removidas em paralelo (1 = sequencial; discos rotacionais
+# costumam piorar com mais de um)
+DEFAULT_WORKERS = _env_workers()
+
+# Falhas guardadas com detalhes por remoção (as demais só são contadas)
+MAX_FAILURES = 100
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_CLOEXEC', 0)
+
+# unlink/rmdir/stat/open relativos a um diretório e scandir de um descritor
+HAVE_FD_OPS = (
+    {os.open, os.stat, os.unlink, os.rmdir} <= os.supports_dir_fd
+    and os.scandir in os.supports_fd
+    and hasattr(os, 'O_NOFOLLOW') and hasattr(os, 'O_DIRECTORY')
+)
+
+
+class SubtreeStats:
+    """Contadores de uma subárvore."""
+
+    __slots__ = ('files', 'dirs', 'bytes', 'freed', 'failures', 'syscalls')
+
+    def __init__(self):
+        self.files = 0      # arquivos, links e outras entradas removidas
+        self.dirs = 0       # diretórios removidos
+        self.bytes = 0      # tamanho aparente removido (st_size)
+        self.freed = 0      # espaço em disco liberado (sem outros hard links)
+        self.failures = 0
+        self.syscalls = {}
+
+    def count_file(self, st: os.stat_result):
+        self.files += 1
+        self.bytes += st.st_size
+        # Com outros hard links o conteúdo continua ocupando o disco
+        if st.st_nlink <= 1:
+            self.freed += allocated_size(st)
+
+    def op(self, name: str, n: int = 1):
+        self.syscalls[name] = self.syscalls.get(name, 0) + n
+
+    def add(self, other: 'SubtreeStats'):
+        self.files += other.files
+        self.dirs += other.dirs
+        self.bytes += other.bytes
+        self.freed += other.freed
+        self.failures += other.failures
+        for name, n in other.syscalls.items():
+            self.op(name, n)
+
+    def to_dict(self) -> Dict:
+        return {'files': self.files, 'dirs': self.dirs, 'bytes': self.bytes,
+                'freed': self.freed, 'failures': self.failures}
+
+
+class RemovalFailure(NamedTuple):
+    """Entrada que não pôde ser removida."""
+    path: str
+    reason: str         # errno (ex: EACCES) ou 'race' / 'mount_point' / 'symlink'
+    message: str
+
+
+class RemovalReport:
+    """
+    Resultado de remove_tree.
+
+    É verdadeiro só quando a raiz foi removida por completo, então pode
+    ser usado onde antes se esperava o bool de safe_remove_dir.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.totals = SubtreeStats()
+        self.subtrees = {}          # nome do subdiretório direto -> SubtreeStats
+        self.failures = []          # até MAX_FAILURES RemovalFailure
+        self.removed_root = False
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    @property
+    def ok(self) -> bool:
+        return self.removed_root and not self.totals.failures
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    @property
+    def files(self) -> int:
+        return self.totals.files
+
+    @property
+    def bytes(self) -> int:
+        return self.totals.bytes
+
+    @property
+    def freed(self) -> int:
+        return self.totals.freed
+
+    def fail(self, stats: SubtreeStats, path: str, reason: str, message: str = ''):
+        """Registra uma falha (chamado por várias threads)."""
+        stats.failures += 1
+        UNLINK_ERRORS.labels(reason=reason).inc()
+        with self._lock:
+            if len(self.failures) < MAX_FAILURES:
+                self.failures.append(RemovalFailure(path, reason, message))
+
+    def fail_error(self, stats: SubtreeStats, path: str, error: OSError):
+        self.fail(stats, path, error_reason(error), error.strerror or str(error))
+
+    def to_dict(self) -> Dict:
+        return {
+            'path': self.path,
+            'removed_root': self.removed_root,
+            'cancelled': self.cancelled,
+            **self.totals.to_dict(),
+            'subtrees': {name: s.to_dict() for name, s in self.subtrees.items()},
+            'errors': [f._asdict() for f in self.failures],
+        }
+
+
+def _cancelled(cancel_token) -> bool:
+    return cancel_token is not None and cancel_token.cancelled
+
+
+# === Remoção por descritores ===
+
+def _open_beneath(base: str, path: str) -> int:
+    """
+    Abre o diretório path descendo de base sem seguir links.
+
+    A própria base é aberta normalmente (deve ser um caminho confiável).
+
+    Raises:
+        OSError: ELOOP/ENOTDIR se algum componente for link ou arquivo;
+                 EXDEV se path não estiver dentro de base
+    """
+    rel = os.path.relpath(path, base)
+    parts = [] if rel == os.curdir else rel.split(os.sep)
+    if os.pardir in parts:
+        raise OSError(errno.EXDEV, f"fora de {base}", path)
+    fd = os.open(base, _DIR_FLAGS & ~os.O_NOFOLLOW)
+    try:
+        for part in parts:
+            next_fd = os.open(part, _DIR_FLAGS, dir_fd=fd)
+            os.close(fd)
+            fd = next_fd
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def unlink_beneath(path, base) -> os.stat_result:
+    """
+    Remove um arquivo (ou link) sem seguir links no caminho a partir de base.
+
+    Sem suporte a dir_fd (Windows) remove pelo caminho.
+
+    Returns:
+        lstat do item removido
+
+    Raises:
+        OSError: Falha na remoção; IsADirectoryError se for um diretório
+    """
+    path = os.path.abspath(os.fspath(path))
+    if not HAVE_FD_OPS:
+        st = os.lstat(path)
+        os.unlink(path)
+        return st
+    parent, name = os.path.split(path)
+    parent_fd = _open_beneath(os.path.abspath(os.fspath(base)), parent)
+    try:
+        st = os.stat(name, dir_fd=parent_fd, follow_symlinks=False)
+        if stat.S_ISDIR(st.st_mode):
+            raise IsADirectoryError(errno.EISDIR, "é um diretório", path)
+        os.unlink(name, dir_fd=parent_fd)
+    finally:
+        os.close(parent_fd)
+    return st
+
+
+def _list_fd(fd: int, path: str, report: RemovalReport, stats: SubtreeStats) -> List:
+    """Lista um diretório aberto; retorna (nome, é_diretório) pelo d_type."""
+    stats.op('scandir')
+    try:
+        with os.scandir(fd) as entries:
+            return [(e.name, e.is_dir(follow_symlinks=False)) for e in entries]
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return []
+
+
+def _open_dir_at(parent_fd: int, name: str, path: str, st: os.stat_result, root_dev: int,
+                 report: RemovalReport, stats: SubtreeStats) -> Optional[int]:
+    """Abre um subdiretório já 'lstatado' conferindo que é o mesmo inode."""
+    if st.st_dev != root_dev:
+        report.fail(stats, path, 'mount_point', 'ponto de montagem não atravessado')
+        return None
+    stats.op('open')
+    try:
+        fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+    except OSError as e:
+        # ELOOP/ENOTDIR: virou link ou arquivo depois do lstat
+        report.fail_error(stats, path, e)
+        return None
+    opened = os.fstat(fd)
+    if (opened.st_dev, opened.st_ino) != (st.st_dev, st.st_ino):
+        os.close(fd)
+        report.fail(stats, path, 'race', 'diretório trocado durante a remoção')
+        return None
+    return fd
+
+
+def _remove_at(parent_fd: int, name: str, path: str, root_dev: int,
+               report: RemovalReport, stats: SubtreeStats) -> Optional[int]:
+    """
+    Remove uma entrada que não é diretório, ou abre o diretório.
+
+    Returns:
+        Descritor do diretório a esvaziar, ou None
+    """
+    stats.op('stat')
+    try:
+        st = os.stat(name, dir_fd=parent_fd, follow_symlinks=False)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return None
+
+    if stat.S_ISDIR(st.st_mode):
+        return _open_dir_at(parent_fd, name, path, st, root_dev, report, stats)
+
+    stats.op('unlink')
+    try:
+        os.unlink(name, dir_fd=parent_fd)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return None
+    stats.count_file(st)
+    return None
+
+
+def _rmdir_at(parent_fd: int, name: str, path: str,
+              report: RemovalReport, stats: SubtreeStats) -> bool:
+    stats.op('rmdir')
+    try:
+        os.rmdir(name, dir_fd=parent_fd)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return False
+    stats.dirs += 1
+    return True
+
+
+def _clear_fd(dir_fd: int, dir_path: str, root_dev: int, report: RemovalReport,
+              stats: SubtreeStats, cancel_token=None) -> bool:
+    """
+    Esvazia o diretório aberto em dir_fd (sem fechá-lo nem removê-lo).
+
+    A travessia é iterativa; cada nível mantém um descritor aberto até
+    ser esvaziado e removido pelo descritor do pai.
+
+    Returns:
+        True se o diretório ficou vazio
+    """
+    failures_before = stats.failures
+    # (descritor, caminho, entradas pendentes, nome no pai, falhas ao entrar)
+    stack = [(dir_fd, dir_path, _list_fd(dir_fd, dir_path, report, stats), None, failures_before)]
+    try:
+        while stack:
+            fd, path, pending, name_in_parent, failures_at = stack[-1]
+            if pending:
+                if _cancelled(cancel_token):
+                    report.cancelled = True
+                    return False
+                name, _ = pending.pop()
+                child_path = os.path.join(path, name)
+                failures = stats.failures
+                child_fd = _remove_at(fd, name, child_path, root_dev, report, stats)
+                if child_fd is not None:
+                    stack.append((child_fd, child_path,
+                                  _list_fd(child_fd, child_path, report, stats), name, failures))
+                continue
+
+            stack.pop()
+            if name_in_parent is None:
+                break
+            os.close(fd)
+            # Com falha dentro, o rmdir só repetiria o erro como ENOTEMPTY
+            if stats.failures == failures_at:
+                _rmdir_at(stack[-1][0], name_in_parent, path, report, stats)
+    finally:
+        for fd, *_ in stack:
+            if fd != dir_fd:
+                os.close(fd)
+    return stats.failures == failures_before
+
+
+def _remove_subtree_fd(root_fd: int, root_path: str, name: str, root_dev: int,
+                       report: RemovalReport, cancel_token=None) -> SubtreeStats:
+    """Remove um subdiretório direto da raiz (unidade de paralelismo)."""
+    stats = SubtreeStats()
+    path = os.path.join(root_path, name)
+    fd = _remove_at(root_fd, name, path, root_dev, report, stats)
+    if fd is None:
+        return stats
+    try:
+        emptied = _clear_fd(fd, path, root_dev, report, stats, cancel_token)
+    finally:
+        os.close(fd)
+    if emptied:
+        _rmdir_at(root_fd, name, path, report, stats)
+    return stats
+
+
+def _run_subtrees(names: List[str], remove_one, workers: int, report: RemovalReport):
+    """Remove os subdiretórios diretos, em paralelo quando workers > 1."""
+    if workers <= 1 or len(names) <= 1:
+        results = [remove_one(name) for name in names]
+    else:
+        # Os workers herdam o tracer de quem chamou
+        tracer = tracing.current_tracer()
+
+        def traced_one(name):
+            with tracing.activate(tracer):
+                return remove_one(name)
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(names)),
+                                thread_name_prefix='remover') as pool:
+            results = list(pool.map(traced_one, names))
+
+    for name, stats in zip(names, results):
+        report.subtrees[name] = stats
+        report.totals.add(stats)
+
+
+def _remove_tree_fd(path: str, report: RemovalReport, workers: int, cancel_token=None,
+                    base: str = None):
+    parent, name = os.path.split(path)
+    top = SubtreeStats()
+    top.op('open')
+    try:
+        if base is not None:
+            parent_fd = _open_beneath(base, parent)
+        else:
+            parent_fd = os.open(parent or os.curdir, _DIR_FLAGS & ~os.O_NOFOLLOW)
+    except OSError as e:
+        report.fail_error(top, path, e)
+        report.totals.add(top)
+        return
+
+    try:
+        top.op('stat')
+        try:
+            st = os.stat(name, dir_fd=parent_fd, follow_symlinks=False)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            report.fail_error(top, path, e)
+            return
+        if stat.S_ISLNK(st.st_mode) or not stat.S_ISDIR(st.st_mode):
+            report.fail(top, path, 'symlink' if stat.S_ISLNK(st.st_mode) else 'ENOTDIR',
+                        'a raiz não é um diretório')
+            return
+
+        root_fd = _open_dir_at(parent_fd, name, path, st, st.st_dev, report, top)
+        if root_fd is None:
+            return
+        try:
+            # Entradas diretas que não são diretório saem aqui; cada
+            # subdiretório é uma subárvore com contagem própria
+            subdirs = []
+            for entry_name, is_dir in _list_fd(root_fd, path, report, top):
+                if is_dir:
+                    subdirs.append(entry_name)
+                    continue
+                if _cancelled(cancel_token):
+                    report.cancelled = True
+                    return
+                child_fd = _remove_at(root_fd, entry_name, os.path.join(path, entry_name),
+                                      st.st_dev, report, top)
+                if child_fd is not None:
+                    # d_type desconhecido: era um diretório afinal
+                    os.close(child_fd)
+                    subdirs.append(entry_name)
+
+            _run_subtrees(
+                subdirs,
+                lambda sub: _remove_subtree_fd(root_fd, path, sub, st.st_dev, report, cancel_token),
+                workers, report
+            )
+        finally:
+            os.close(root_fd)
+
+        if not report.cancelled and not report.totals.failures and not top.failures:
+            if _rmdir_at(parent_fd, name, path, report, top):
+                report.removed_root = True
+    finally:
+        os.close(parent_fd)
+        report.totals.add(top)
+
+
+# === Remoção por caminhos (sem dir_fd) ===
+
+def _is_junction(path: str) -> bool:
+    isjunction = getattr(os.path, 'isjunction', None)
+    return bool(isjunction and isjunction(path))
+
+
+def _remove_path(path: str, report: RemovalReport, stats: SubtreeStats) -> bool:
+    """Remove uma entrada que não é diretório; retorna True se for um diretório."""
+    stats.op('stat')
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return False
+    if stat.S_ISDIR(st.st_mode) and not _is_junction(path):
+        return True
+
+    stats.op('unlink')
+    try:
+        # Junções do Windows saem com rmdir, sem entrar no destino
+        if stat.S_ISDIR(st.st_mode):
+            os.rmdir(path)
+        else:
+            os.unlink(path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return False
+    stats.count_file(st)
+    return False
+
+
+def _rmdir_path(path: str, report: RemovalReport, stats: SubtreeStats) -> bool:
+    stats.op('rmdir')
+    try:
+        os.rmdir(path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return False
+    stats.dirs += 1
+    return True
+
+
+def _list_path(path: str, report: RemovalReport, stats: SubtreeStats) -> List[str]:
+    stats.op('scandir')
+    try:
+        with os.scandir(path) as entries:
+            return [e.path for e in entries]
+    except OSError as e:
+        report.fail_error(stats, path, e)
+        return []
+
+
+def _remove_subtree_path(path: str, report: RemovalReport, cancel_token=None) -> SubtreeStats:
+    """Remove uma árvore por caminhos (travessia iterativa em pós-ordem)."""
+    stats = SubtreeStats()
+    if not _remove_path(path, report, stats):
+        return stats
+    # (caminho, entradas pendentes, falhas ao entrar)
+    stack = [(path, _list_path(path, report, stats), stats.failures)]
+    while stack:
+        dir_path, pending, failures_at = stack[-1]
+        if pending:
+            if _cancelled(cancel_token):
+                report.cancelled = True
+                return stats
+            child = pending.pop()
+            failures = stats.failures
+            if _remove_path(child, report, stats):
+                stack.append((child, _list_path(child, report, stats), failures))
+            continue
+        stack.pop()
+        if stats.failures == failures_at:
+            _rmdir_path(dir_path, report, stats)
+    return stats
+
+
+def _remove_tree_path(path: str, report: RemovalReport, workers: int, cancel_token=None):
+    top = SubtreeStats()
+    try:
+        top.op('stat')
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            report.fail_error(top, path, e)
+            return
+        if not stat.S_ISDIR(st.st_mode) or _is_junction(path):
+            report.fail(top, path, 'symlink' if stat.S_ISLNK(st.st_mode) or _is_junction(path) else 'ENOTDIR',
+                        'a raiz não é um diretório')
+            return
+
+        subdirs = []
+        for child in _list_path(path, report, top):
+            if _cancelled(cancel_token):
+                report.cancelled = True
+                return
+            if _remove_path(child, report, top):
+                subdirs.append(os.path.basename(child))
+
+        _run_subtrees(
+            subdirs,
+            lambda sub: _remove_subtree_path(os.path.join(path, sub), report, cancel_token),
+            workers, report
+        )
+        if not report.cancelled and not report.totals.failures and not top.failures:
+            if _rmdir_path(path, report, top):
+                report.removed_root = True
+    finally:
+        report.totals.add(top)
+
+
+def remove_tree(path, workers: int = None, cancel_token=None, base=None) -> RemovalReport:
+    """
+    Remove um diretório e todo o seu conteúdo, sem seguir links simbólicos.
+
+    Falhas não interrompem a remoção: o resto da árvore é removido e cada
+    falha entra no relatório com o motivo. A raiz só é removida se tudo
+    dentro dela saiu.
+
+    Args:
+        path: Diretório a remover (um link simbólico é recusado)
+        workers: Subdiretórios diretos removidos em paralelo
+                 (padrão: DEFAULT_WORKERS)
+        cancel_token: Token opcional; o cancelamento deixa a árvore parcial
+        base: Diretório confiável a partir do qual o caminho até path é
+              aberto sem seguir links (ver unlink_beneath)
+
+    Returns:
+        RemovalReport (verdadeiro se a raiz foi removida por completo)
+    """
+    path = os.path.abspath(os.fspath(path))
+    report = RemovalReport(path)
+    workers = DEFAULT_WORKERS if workers is None else workers
+
+    with tracing.span('remove_tree', 'delete', path=path):
+        if HAVE_FD_OPS:
+            _remove_tree_fd(path, report, workers, cancel_token,
+                            os.path.abspath(os.fspath(base)) if base is not None else None)
+        else:
+            _remove_tree_path(path, report, workers, cancel_token)
+
+    for op, n in report.totals.syscalls.items():
+        SYSCALLS.labels(op=op).inc(n)
+    return report
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Índice dos Resultados da Análise
+Autor: David Fernandes
+Descrição: Índice montado uma vez por análise para listar, ordenar e
+           filtrar os arquivos encontrados com paginação por cursor, e
+           árvore de diretórios (PathTree) para a interface gráfica.
+"""
+
+import os
+import stat
+import uuid
+import base64
+import hashlib
+import fnmatch
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.sizes import ENGINE
+
+
+# Chaves de ordenação suportadas
+SORT_KEYS = ('size', 'age', 'path')
+
+# Quantas visões filtradas manter em cache por índice
+MAX_CACHED_VIEWS = 16
+
+
+class InvalidCursorError(ValueError):
+    """Cursor malformado ou de outro índice."""
+
+
+class ScanIndex:
+    """
+    Índice imutável dos arquivos de uma análise.
+
+    Cada arquivo é consultado (lstat) uma única vez na montagem. As ordens
+    por tamanho, idade e caminho são calculadas na primeira vez que são
+    pedidas e guardadas como listas de posições; visões filtradas também
+    ficam em cache. Assim, depois da primeira página de uma combinação de
+    filtros, cada página custa O(limit), independente do total de arquivos.
+    """
+
+    def __init__(self, results: Dict[str, Dict]):
+        """
+        Args:
+            results: Resultados da análise ({categoria: {'files': [...]}})
+        """
+        self.id = uuid.uuid4().hex[:8]
+        self.categories = []
+        self.paths = []
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.category_ids = array('H')
+
+        for cat_id, result in results.items():
+            cat_index = len(self.categories)
+            self.categories.append(cat_id)
+            for file_path in result.get('files', []):
+                try:
+                    st = os.lstat(file_path)
+                    size, mtime = st.st_size, st.st_mtime
+                    # Diretórios inteiros (lixeira, caches) valem a árvore;
+                    # o motor de tamanhos já os mediu na análise
+                    if stat.S_ISDIR(st.st_mode):
+                        size = ENGINE.measure_dir(file_path, st).bytes
+                except OSError:
+                    size, mtime = 0, 0.0
+                self.paths.append(file_path)
+                self.sizes.append(size)
+                self.mtimes.append(mtime)
+                self.category_ids.append(cat_index)
+
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._views = OrderedDict()
+        self._trees = {}
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _order(self, sort: str) -> List[int]:
+        """Posições em ordem crescente pela chave (calculada uma vez)."""
+        order = self._orders.get(sort)
+        if order is None:
+            positions = range(len(self.paths))
+            if sort == 'size':
+                order = sorted(positions, key=self.sizes.__getitem__)
+            elif sort == 'age':
+                # Crescente por idade = do mais recente para o mais antigo
+                order = sorted(positions, key=self.mtimes.__getitem__, reverse=True)
+            else:
+                order = sorted(positions, key=self.paths.__getitem__)
+            self._orders[sort] = order
+        return order
+
+    def view(self, sort: str = 'size', prefix: str = None, glob: str = None,
+             category: str = None) -> List[int]:
+        """
+        Retorna as posições que passam pelos filtros, na ordem pedida.
+
+        Args:
+            sort: 'size', 'age' ou 'path'
+            prefix: Mantém apenas caminhos que começam com o prefixo
+            glob: Padrão fnmatch (no nome do arquivo, ou no caminho se tiver '/')
+            category: Mantém apenas arquivos desta categoria
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Ordenação inválida: {sort}")
+
+        key = (sort, prefix or '', glob or '', category or '')
+        with self._lock:
+            cached = self._views.get(key)
+            if cached is not None:
+                self._views.move_to_end(key)
+                return cached
+
+            order = self._order(sort)
+            if not (prefix or glob or category):
+                return order
+
+            cat_index = None
+            if category:
+                if category not in self.categories:
+                    return []
+                cat_index = self.categories.index(category)
+
+            match_path = glob and '/' in glob
+            paths = self.paths
+            result = []
+            for pos in order:
+                path = paths[pos]
+                if prefix and not path.startswith(prefix):
+                    continue
+                if cat_index is not None and self.category_ids[pos] != cat_index:
+                    continue
+                if glob:
+                    target = path if match_path else os.path.basename(path)
+                    if not fnmatch.fnmatchcase(target, glob):
+                        continue
+                result.append(pos)
+
+            self._views[key] = result
+            if len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+            return result
+
+    def tree(self, category: str) -> 'PathTree':
+        """Árvore de diretórios dos arquivos de uma categoria (montada uma vez)."""
+        with self._lock:
+            tree = self._trees.get(category)
+            if tree is None:
+                cat_index = self.categories.index(category)
+                positions = [pos for pos in self._order('path') if self.category_ids[pos] == cat_index]
+                tree = PathTree([self.paths[pos] for pos in positions],
+                                [self.sizes[pos] for pos in positions])
+                self._trees[category] = tree
+            return tree
+
+    def entry(self, pos: int) -> Dict:
+        """Dados de um arquivo do índice."""
+        return {
+            'path': self.paths[pos],
+            'size': self.sizes[pos],
+            'mtime': self.mtimes[pos],
+            'category': self.categories[self.category_ids[pos]],
+        }
+
+    def page(self, view: List[int], cursor: Optional[str] = None, limit: int = 100,
+             descending: bool = False, query: Tuple = ()) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Retorna uma página da visão.
+
+        Args:
+            view: Resultado de view()
+            cursor: Cursor devolvido pela página anterior
+            limit: Quantidade máxima de itens
+            descending: Percorre a visão de trás para frente
+            query: Parâmetros que geraram a visão (sort, prefix, glob,
+                   category); o cursor só vale para a mesma consulta
+
+        Returns:
+            Tupla com (itens, próximo cursor ou None)
+        """
+        query_hash = self._query_hash(query, descending)
+        offset = self.decode_cursor(cursor, query_hash) if cursor else 0
+        total = len(view)
+        end = min(offset + limit, total)
+
+        items = []
+        for i in range(offset, end):
+            pos = view[total - 1 - i] if descending else view[i]
+            items.append(self.entry(pos))
+
+        next_cursor = self.encode_cursor(end, query_hash) if end < total else None
+        return items, next_cursor
+
+    @staticmethod
+    def _query_hash(query: Tuple, descending: bool) -> str:
+        """Resumo curto da consulta (filtros e direção) guardado no cursor."""
+        normalized = tuple(value or '' for value in query) + (bool(descending),)
+        return hashlib.sha1(repr(normalized).encode()).hexdigest()[:8]
+
+    def encode_cursor(self, offset: int, query_hash: str = '') -> str:
+        """Cursor opaco ligado a este índice e à consulta."""
+        raw = f"{self.id}:{offset}:{query_hash}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str, query_hash: str = '') -> int:
+        """Extrai o deslocamento de um cursor deste índice e desta consulta."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            index_id, offset, cursor_hash = base64.urlsafe_b64decode(padded).decode().split(':')
+            offset = int(offset)
+        except (ValueError, UnicodeDecodeError):
+            raise InvalidCursorError("Cursor inválido")
+
+        if index_id != self.id:
+            raise InvalidCursorError("Cursor de uma análise anterior")
+        if cursor_hash != query_hash:
+            raise InvalidCursorError("Cursor de outra consulta (ordenação ou filtros diferentes)")
+        if offset < 0:
+            raise InvalidCursorError("Cursor inválido")
+        return offset
+
+
+class TreeNode(NamedTuple):
+    """Filho de um diretório na PathTree."""
+    path: str
+    name: str           # relativo ao pai (pode ter vários níveis compactados)
+    size: int
+    files: int
+    is_dir: bool
+
+
+class PathTree:
+    """
+    Hierarquia de diretórios sobre caminhos ordenados.
+
+    Com os caminhos em ordem, tudo que está sob um diretório ocupa uma
+    faixa contígua, achada por bisect; somas de prefixo dos tamanhos dão o
+    total de qualquer subárvore em O(log n). children() pula cada
+    subdiretório inteiro com um bisect, custando O(filhos * log n), e
+    cadeias de diretórios com um único filho viram um nó só.
+    """
+
+    def __init__(self, paths: List[str], sizes: Iterable[int], sep: str = os.sep):
+        """
+        Args:
+            paths: Caminhos absolutos em ordem crescente
+            sizes: Tamanho de cada caminho, na mesma ordem
+        """
+        self.paths = paths
+        self.sep = sep
+        # Primeiro caractere depois do separador: fecha a faixa de um diretório
+        self._after = chr(ord(sep) + 1)
+        self._sums = array('q', [0])
+        total = 0
+        for size in sizes:
+            total += size
+            self._sums.append(total)
+        self.root = self._common_dir(0, len(paths)) if paths else None
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def size(self) -> int:
+        return self._sums[-1]
+
+    def _base(self, path: str) -> str:
+        return path if path.endswith(self.sep) else path + self.sep
+
+    def _subtree(self, path: str, lo: int = 0, hi: int = None) -> Tuple[int, int]:
+        """Faixa [lo, hi) dos caminhos abaixo do diretório (sem ele mesmo)."""
+        base = self._base(path)
+        hi = len(self.paths) if hi is None else hi
+        start = bisect_left(self.paths, base, lo, hi)
+        end = bisect_left(self.paths, base[:-1] + self._after, start, hi)
+        return start, end
+
+    def _common_dir(self, lo: int, hi: int) -> str:
+        """Diretório mais profundo que contém os caminhos da faixa."""
+        # Ordenados: o prefixo comum do primeiro e do último vale para todos
+        common = os.path.commonprefix([self.paths[lo], self.paths[hi - 1]])
+        cut = common.rfind(self.sep)
+        if cut < 0:
+            return common
+        head = common[:cut + 1]
+        # Mantém o separador só na raiz ('/' ou 'C:\\')
+        return head if os.path.dirname(head) == head else common[:cut]
+
+    def totals(self, path: str) -> Tuple[int, int]:
+        """(bytes, arquivos) do caminho e de tudo abaixo dele."""
+        size = files = 0
+        for lo, hi in self._ranges([path]):
+            size += self._sums[hi] - self._sums[lo]
+            files += hi - lo
+        return size, files
+
+    def children(self, path: str) -> List[TreeNode]:
+        """Filhos diretos de um diretório (subdiretórios compactados)."""
+        lo, hi = self._subtree(path)
+        base_len = len(self._base(path))
+        nodes = []
+        i = lo
+        while i < hi:
+            current = self.paths[i]
+            cut = current.find(self.sep, base_len)
+            if cut < 0:
+                # Item da análise (arquivo ou diretório removido inteiro)
+                nodes.append(TreeNode(current, current[base_len:],
+                                      self._sums[i + 1] - self._sums[i], 1, False))
+                i += 1
+                continue
+            # Subdiretório: a faixa inteira é pulada com um bisect
+            end = bisect_left(self.paths, current[:cut] + self._after, i, hi)
+            dir_path = self._common_dir(i, end)
+            if len(dir_path) < cut:
+                dir_path = current[:cut]
+            nodes.append(TreeNode(dir_path, dir_path[base_len:],
+                                  self._sums[end] - self._sums[i], end - i, True))
+            i = end
+        return nodes
+
+    def _ranges(self, paths: Iterable[str]) -> List[Tuple[int, int]]:
+        """Faixas (unidas e ordenadas) cobertas pelos caminhos e suas subárvores."""
+        ranges = []
+        for path in paths:
+            i = bisect_left(self.paths, path)
+            if i < len(self.paths) and self.paths[i] == path:
+                ranges.append((i, i + 1))
+            lo, hi = self._subtree(path)
+            if lo < hi:
+                ranges.append((lo, hi))
+        ranges.sort()
+        merged = []
+        for lo, hi in ranges:
+            if merged and lo <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(hi, merged[-1][1]))
+            else:
+                merged.append((lo, hi))
+        return merged
+
+    def excluded_totals(self, excluded: Iterable[str]) -> Tuple[int, int]:
+        """(bytes, arquivos) cobertos pelos caminhos excluídos."""
+        size = files = 0
+        for lo, hi in self._ranges(excluded):
+            size += self._sums[hi] - self._sums[lo]
+            files += hi - lo
+        return size, files
+
+    def without(self, excluded: Iterable[str]) -> List[str]:
+        """Caminhos que sobram depois de tirar as subárvores excluídas."""
+        result = []
+        start = 0
+        for lo, hi in self._ranges(excluded):
+            result.extend(self.paths[start:lo])
+            start = hi
+        result.extend(self.paths[start:])
+        return result
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Servidor WSGI de Produção
+Autor: David Fernandes
+Descrição: Executa a API com um pool fixo de threads, keep-alive e fila
+           de requisições limitada. Usa o waitress se estiver instalado,
+           senão um servidor próprio sobre o wsgiref.
+
+Cada stream SSE (/api/events) ocupa um worker enquanto estiver aberto e
+cada long-poll (/api/state?wait=) ocupa um por até STATE_MAX_WAIT (30 s).
+Essas requisições longas só podem usar uma fração dos workers
+(long_request_limit); acima disso a API responde 503 e o painel volta ao
+polling simples, então as chamadas comuns sempre encontram um worker livre.
+"""
+
+import queue
+import threading
+from typing import Callable
+from wsgiref.simple_server import ServerHandler, WSGIServer, WSGIRequestHandler
+
+from app.utils import get_logger
+
+
+# Backends aceitos em --server
+SERVER_BACKENDS = ('auto', 'waitress', 'builtin', 'dev')
+
+# Valores padrão de concorrência
+DEFAULT_THREADS = 32
+DEFAULT_BACKLOG = 64
+DEFAULT_KEEPALIVE = 15
+
+# Fração dos workers que streams SSE e long-polls podem ocupar ao mesmo tempo
+LONG_REQUEST_FRACTION = 0.5
+
+# Tamanho máximo da linha de requisição
+MAX_REQUEST_LINE = 65536
+
+# Resposta enviada quando a fila de requisições está cheia
+OVERLOADED_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Length: 0\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+
+def long_request_limit(threads: int) -> int:
+    """Quantas requisições longas podem ocupar workers ao mesmo tempo."""
+    return max(1, int(threads * LONG_REQUEST_FRACTION))
+
+
+class RequestSlots:
+    """
+    Contador de vagas para requisições longas (SSE e long-poll).
+
+    Não bloqueia: sem vaga, quem pede recebe False e deve responder 503.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active = max(0, self.active - 1)
+
+
+class RequestBody:
+    """
+    Corpo da requisição limitado ao Content-Length.
+
+    Impede que a aplicação leia a próxima requisição da conexão e permite
+    descartar o que ela não leu antes de reutilizar a conexão.
+    """
+
+    def __init__(self, stream, length: int):
+        self._stream = stream
+        self.remaining = length
+
+    def _limit(self, size) -> int:
+        if size is None or size < 0 or size > self.remaining:
+            return self.remaining
+        return size
+
+    def read(self, size: int = -1) -> bytes:
+        size = self._limit(size)
+        data = self._stream.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        size = self._limit(size)
+        data = self._stream.readline(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def readlines(self, hint: int = -1):
+        return list(self)
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+    def drain(self) -> bool:
+        """Descarta o restante do corpo; False se a conexão caiu no meio."""
+        while self.remaining:
+            if not self.read(65536):
+                return False
+        return True
+
+
+class KeepAliveServerHandler(ServerHandler):
+    """Executa a aplicação WSGI respondendo em HTTP/1.1."""
+
+    http_version = '1.1'
+    origin_server = True
+
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        request_handler = self.request_handler
+        bodyless = (self.environ['REQUEST_METHOD'] == 'HEAD'
+                    or self.status[:3] in ('204', '304')
+                    or self.status[:1] == '1')
+        # Sem Content-Length (ex: stream SSE) o fim da resposta é o fim da conexão
+        if 'Content-Length' not in self.headers and not bodyless:
+            request_handler.close_connection = True
+        if request_handler.close_connection:
+            self.headers['Connection'] = 'close'
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """Handler que atende várias requisições na mesma conexão (keep-alive)."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            self.handle_one_request()
+
+    def handle_one_request(self):
+        try:
+            self.raw_requestline = self.rfile.readline(MAX_REQUEST_LINE + 1)
+        except (TimeoutError, ConnectionError):
+            # Conexão ociosa além do keep-alive ou fechada pelo cliente
+            self.close_connection = True
+            return
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        if len(self.raw_requestline) > MAX_REQUEST_LINE:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            self.close_connection = True
+            return
+        if not self.parse_request():
+            return
+
+        # Corpo chunked não é suportado aqui: atende e fecha a conexão
+        if 'Transfer-Encoding' in self.headers:
+            self.close_connection = True
+        try:
+            length = max(0, int(self.headers.get('Content-Length') or 0))
+        except ValueError:
+            self.send_error(400, "Content-Length inválido")
+            self.close_connection = True
+            return
+
+        body = RequestBody(self.rfile, length)
+        environ = self.get_environ()
+        environ['wsgi.input'] = body
+        handler = KeepAliveServerHandler(body, self.wfile, self.get_stderr(), environ,
+                                         multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+        if not body.drain():
+            self.close_connection = True
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    Servidor WSGI da biblioteca padrão com pool fixo de threads.
+
+    O servidor de desenvolvimento cria uma thread por conexão, sem limite.
+    Aqui as conexões aceitas entram em uma fila limitada e são atendidas
+    por 'threads' workers; com a fila cheia a conexão recebe 503 na hora
+    em vez de acumular. Cada conexão keep-alive (e cada stream SSE) ocupa
+    um worker enquanto estiver aberta.
+    """
+
+    def __init__(self, host: str, port: int, app: Callable, threads: int = DEFAULT_THREADS,
+                 backlog: int = DEFAULT_BACKLOG, keepalive: int = DEFAULT_KEEPALIVE):
+        """
+        Args:
+            host: Endereço de escuta
+            port: Porta
+            app: Aplicação WSGI
+            threads: Quantidade de workers
+            backlog: Conexões aguardando worker (e backlog do listen())
+            keepalive: Segundos de inatividade antes de fechar a conexão
+        """
+        if threads < 1:
+            raise ValueError("threads deve ser pelo menos 1")
+
+        self.request_queue_size = backlog
+        handler = type('PooledRequestHandler', (KeepAliveRequestHandler,),
+                       {'timeout': keepalive or None})
+        super().__init__((host, port), handler)
+        self.set_app(app)
+
+        self.logger = get_logger("Server")
+        self._queue = queue.Queue(maxsize=max(1, backlog))
+        self._workers = []
+        for i in range(threads):
+            worker = threading.Thread(target=self._worker, name=f"http-worker-{i}")
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def process_request(self, request, client_address):
+        """Enfileira a conexão aceita ou recusa se a fila estiver cheia."""
+        try:
+            self._queue.put_nowait((request, client_address))
+        except queue.Full:
+            self.logger.warning(f"Fila de requisições cheia - recusando {client_address[0]}")
+            try:
+                request.sendall(OVERLOADED_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _worker(self):
+        """Atende conexões da fila até receber o sinal de parada."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        """Fecha o socket e encerra os workers."""
+        super().server_close()
+        for _ in getattr(self, '_workers', ()):
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+
+def _load_waitress():
+    """Retorna o módulo waitress, se instalado."""
+    try:
+        import waitress
+        return waitress
+    except ImportError:
+        return None
+
+
+def serve(app, host: str = '0.0.0.0', port: int = 5000, server: str = 'auto',
+          threads: int = DEFAULT_THREADS, backlog: int = DEFAULT_BACKLOG,
+          keepalive: int = DEFAULT_KEEPALIVE):
+    """
+    Executa a aplicação Flask no backend escolhido (bloqueia).
+
+    Args:
+        app: Aplicação Flask
+        host: Endereço de escuta
+        port: Porta
+        server: 'auto' (waitress se instalado, senão builtin), 'waitress',
+                'builtin' (pool sobre o wsgiref) ou 'dev' (servidor de
+                desenvolvimento do Flask)
+        threads: Quantidade de workers
+        backlog: Limite da fila de conexões
+        keepalive: Timeout de inatividade das conexões (segundos)
+    """
+    logger = get_logger("Server")
+    if server not in SERVER_BACKENDS:
+        raise ValueError(f"Servidor inválido: {server}")
+
+    if server == 'dev':
+        logger.info("Usando o servidor de desenvolvimento do Flask")
+        app.run(host=host, port=port, threaded=True)
+        return
+
+    waitress = _load_waitress() if server in ('auto', 'waitress') else None
+    if server == 'waitress' and waitress is None:
+        raise RuntimeError("waitress não está instalado (pip install waitress)")
+
+    if waitress is not None:
+        logger.info(f"Usando waitress ({threads} threads, backlog {backlog})")
+        waitress.serve(app, host=host, port=port, threads=threads, backlog=backlog,
+                       connection_limit=threads + backlog, channel_timeout=keepalive)
+        return
+
+    logger.info(f"Usando servidor embutido ({threads} threads, fila {backlog}, "
+                f"keep-alive {keepalive}s)")
+    httpd = PooledWSGIServer(host, port, app, threads=threads, backlog=backlog,
+                             keepalive=keepalive)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Tamanho de Diretórios
+Autor: David Fernandes
+Descrição: Calcula o tamanho de árvores no estilo du, com os.scandir e um
+           cache por diretório chaveado por (st_dev, st_ino, st_mtime_ns).
+           A análise lê cada diretório uma vez; a limpeza reaproveita as
+           medidas com um lstat por subdiretório em vez de um stat por
+           arquivo.
+
+O mtime de um diretório muda quando entradas diretas são criadas, removidas
+ou renomeadas, mas não quando um arquivo dentro dele cresce; como no du com
+cache, esse crescimento só aparece quando o diretório é alterado.
+"""
+
+import os
+import stat
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.metrics import SYSCALLS, SIZE_CACHE
+
+
+# Diretórios mantidos no cache (LRU)
+DEFAULT_MAX_ENTRIES = 200_000
+
+
+class TreeSize(NamedTuple):
+    """Totais de uma árvore (ou de um único arquivo)."""
+    bytes: int = 0          # tamanho aparente (st_size)
+    allocated: int = 0      # espaço ocupado em disco (st_blocks * 512)
+    files: int = 0          # arquivos, links e outras entradas que não são diretório
+    dirs: int = 0           # diretórios, incluindo a raiz
+
+
+def allocated_size(st: os.stat_result) -> int:
+    """
+    Retorna o espaço realmente ocupado em disco por um arquivo.
+
+    Usa st_blocks quando disponível (arquivos esparsos e blocos parciais),
+    caindo para st_size em sistemas que não o expõem.
+    """
+    blocks = getattr(st, 'st_blocks', None)
+    if blocks is not None:
+        return blocks * 512
+    return st.st_size
+
+
+def _key(st: os.stat_result):
+    return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+
+class _DirEntry(NamedTuple):
+    """Entrada do cache: totais das entradas diretas e nomes dos subdiretórios."""
+    direct: TreeSize
+    subdirs: Tuple[str, ...]
+
+
+class SizeEngine:
+    """
+    Mede árvores com scandir e memoriza cada diretório.
+
+    O cache guarda, por diretório, os totais das entradas diretas e os
+    nomes dos subdiretórios. Numa nova medida, um diretório inalterado
+    custa só o lstat de cada subdiretório (nenhum stat por arquivo) e uma
+    alteração em qualquer nível da árvore invalida apenas aquele nível.
+    A travessia é iterativa (sem limite de recursão); diretórios lidos só
+    em parte (sem permissão) não entram no cache.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key) -> Optional[_DirEntry]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        SIZE_CACHE.labels(result='hit' if entry is not None else 'miss').inc()
+        return entry
+
+    def _put(self, key, entry: _DirEntry):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        """Esvazia o cache."""
+        with self._lock:
+            self._cache.clear()
+
+    def _read_dir(self, path: str, st: os.stat_result) -> Tuple[_DirEntry, List[Tuple[str, os.stat_result]]]:
+        """
+        Lê as entradas diretas de um diretório.
+
+        Returns:
+            Tupla com a entrada do cache e os subdiretórios já 'lstatados'
+        """
+        totals = [0, allocated_size(st), 0, 1]
+        subdirs = []
+        complete = True
+        stats = 0
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        stats += 1
+                        entry_st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        complete = False
+                        continue
+                    # Links para diretórios contam como o próprio link
+                    if stat.S_ISDIR(entry_st.st_mode):
+                        subdirs.append((entry.path, entry_st))
+                    else:
+                        totals[0] += entry_st.st_size
+                        totals[1] += allocated_size(entry_st)
+                        totals[2] += 1
+        except OSError:
+            complete = False
+        finally:
+            SYSCALLS.labels(op='scandir').inc()
+            SYSCALLS.labels(op='stat').inc(stats)
+
+        entry = _DirEntry(TreeSize(*totals), tuple(os.path.basename(p) for p, _ in subdirs))
+        if complete:
+            self._put(_key(st), entry)
+        return entry, subdirs
+
+    def measure_dir(self, path: str, st: os.stat_result) -> TreeSize:
+        """Mede um diretório já 'lstatado' (usa e alimenta o cache)."""
+        totals = [0, 0, 0, 0]
+        stack = [(path, st)]
+        stats = 0
+
+        while stack:
+            dir_path, dir_st = stack.pop()
+            entry = self._get(_key(dir_st))
+            if entry is None:
+                entry, subdirs = self._read_dir(dir_path, dir_st)
+                stack.extend(subdirs)
+            else:
+                # Diretório inalterado: confere só os subdiretórios
+                for name in entry.subdirs:
+                    sub_path = os.path.join(dir_path, name)
+                    try:
+                        stats += 1
+                        sub_st = os.lstat(sub_path)
+                    except OSError:
+                        continue
+                    if stat.S_ISDIR(sub_st.st_mode):
+                        stack.append((sub_path, sub_st))
+
+            for i, value in enumerate(entry.direct):
+                totals[i] += value
+
+        SYSCALLS.labels(op='stat').inc(stats)
+        return TreeSize(*totals)
+
+    def measure(self, path) -> TreeSize:
+        """
+        Mede um arquivo ou diretório (sem seguir links simbólicos).
+
+        Returns:
+            TreeSize; zerado se o caminho não existir
+        """
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return TreeSize()
+        finally:
+            SYSCALLS.labels(op='stat').inc()
+
+        if stat.S_ISDIR(st.st_mode):
+            return self.measure_dir(os.fspath(path), st)
+        return TreeSize(st.st_size, allocated_size(st), 1, 0)
+
+
+# Motor compartilhado pela análise e pela limpeza
+ENGINE = SizeEngine()
+
+
+def measure(path) -> TreeSize:
+    """Mede um caminho com o motor compartilhado."""
+    return ENGINE.measure(path)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Servidor de Assets do Frontend
+Autor: David Fernandes
+Descrição: Pré-compressão (gzip/brotli) do build React, negociação de
+           Content-Encoding e cabeçalhos de cache para os assets.
+"""
+
+import os
+import re
+import gzip
+import mimetypes
+from pathlib import Path
+from typing import Dict, Optional
+
+from flask import send_from_directory
+
+from app.utils import get_logger
+
+
+# Extensões que valem a pena comprimir
+COMPRESSIBLE_EXTENSIONS = {'.js', '.mjs', '.css', '.html', '.svg', '.json', '.map', '.txt'}
+
+# Arquivos menores que isso não compensam a compressão
+MIN_COMPRESS_SIZE = 1024
+
+# Nomes gerados pelo Vite em assets/ com hash de conteúdo (ex: index-4f2a9c1b.js):
+# '-' + exatamente 8 caracteres base64url antes da extensão
+HASHED_NAME = re.compile(r'-([A-Za-z0-9_-]{8})\.[A-Za-z0-9]+$')
+
+# Diretório de saída dos assets do build (build.assetsDir no vite.config.js)
+ASSETS_DIR = 'assets'
+
+# Sufixo do arquivo pré-comprimido por codificação, em ordem de preferência
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+
+def _load_brotli():
+    """Retorna o módulo brotli, se instalado."""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def _is_stale(source: Path, target: Path) -> bool:
+    """True se o arquivo comprimido não existe ou é mais antigo que a origem."""
+    try:
+        return target.stat().st_mtime < source.stat().st_mtime
+    except OSError:
+        return True
+
+
+def precompress_assets(directory: Path) -> int:
+    """
+    Gera versões .gz (e .br, se o brotli estiver instalado) dos assets.
+
+    Só recomprime arquivos alterados desde a última execução.
+
+    Args:
+        directory: Diretório do build (ex: frontend/dist)
+
+    Returns:
+        Quantidade de arquivos comprimidos gerados
+    """
+    logger = get_logger("StaticAssets")
+    directory = Path(directory)
+    if not directory.is_dir():
+        return 0
+
+    brotli = _load_brotli()
+    if brotli is None:
+        logger.info("brotli não instalado - usando apenas gzip para os assets")
+
+    generated = 0
+    for root, _dirs, names in os.walk(directory):
+        for name in names:
+            source = Path(root) / name
+            if source.suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            try:
+                if source.stat().st_size < MIN_COMPRESS_SIZE:
+                    continue
+
+                data = None
+                gz_path = source.with_name(name + '.gz')
+                if _is_stale(source, gz_path):
+                    data = source.read_bytes()
+                    # mtime=0 deixa a saída determinística entre builds
+                    gz_path.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+                    generated += 1
+
+                br_path = source.with_name(name + '.br')
+                if brotli is not None and _is_stale(source, br_path):
+                    data = data if data is not None else source.read_bytes()
+                    br_path.write_bytes(brotli.compress(data, quality=11))
+                    generated += 1
+            except OSError as e:
+                logger.warning(f"Não foi possível comprimir {source}: {e}")
+
+    if generated:
+        logger.info(f"{generated} assets pré-comprimidos em {directory}")
+    return generated
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Converte o cabeçalho Accept-Encoding em {codificação: q}."""
+    accepted = {}
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def select_encoding(directory: Path, filename: str, accept_encoding: Optional[str]) -> Optional[tuple]:
+    """
+    Escolhe a melhor versão pré-comprimida aceita pelo cliente.
+
+    Returns:
+        Tupla (codificação, nome do arquivo) ou None para o original
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+
+    for encoding, suffix in ENCODINGS:
+        if accepted.get(encoding, wildcard) <= 0:
+            continue
+        candidate = filename + suffix
+        if (Path(directory) / candidate).is_file():
+            return encoding, candidate
+    return None
+
+
+def is_hashed_asset(directory: Path, filename: str) -> bool:
+    """
+    True se o arquivo tem hash de conteúdo do build no nome.
+
+    Só vale dentro do diretório de assets do Vite, e o hash precisa de um
+    dígito, maiúscula ou '_': palavras como 'component' ou 'validate'
+    (some-component.css, jquery.validate.js) não passam por hash.
+    """
+    parts = Path(directory, filename).parts
+    if ASSETS_DIR not in parts[:-1]:
+        return False
+    match = HASHED_NAME.search(parts[-1])
+    return bool(match) and bool(re.search(r'[0-9A-Z_]', match.group(1)))
+
+
+def send_asset(directory: Path, filename: str, request, immutable: Optional[bool] = None):
+    """
+    Envia um asset com negociação de compressão e cabeçalhos de cache.
+
+    Args:
+        directory: Diretório base
+        filename: Caminho relativo do arquivo
+        request: Requisição Flask atual
+        immutable: Força (ou não) cache imutável; por padrão usa o hash no nome
+
+    Returns:
+        Resposta Flask (com ETag; 304 quando o cliente já tem a versão)
+    """
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    selected = select_encoding(directory, filename, request.headers.get('Accept-Encoding'))
+
+    if selected:
+        encoding, served_name = selected
+    else:
+        encoding, served_name = None, filename
+
+    response = send_from_directory(str(directory), served_name, mimetype=mimetype, etag=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+    if immutable is None:
+        immutable = is_hashed_asset(directory, filename)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+    return response
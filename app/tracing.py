@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Linha do Tempo das Tarefas
+Autor: David Fernandes
+Descrição: Spans por categoria, diretório raiz, verificação de segurança
+           e lote de remoção, exportados no formato Chrome trace-event
+           (abre em chrome://tracing ou ui.perfetto.dev).
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.utils import get_logger, get_log_path
+
+
+# Limites de eventos guardados por trace: um span por arquivo (ex:
+# safety_check) fica restrito a MAX_EVENTS_PER_NAME, e o total a
+# MAX_EVENTS; o excedente só é contado (otherData.dropped_events)
+MAX_EVENTS = 500_000
+MAX_EVENTS_PER_NAME = 20_000
+
+# Tracer ativo da thread atual (None = desligado)
+_local = threading.local()
+
+
+class _NoopSpan:
+    """Span vazio usado quando não há tracer ativo."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    """Span ativo; vira um evento 'X' (completo) ao sair."""
+
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, cat: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.complete(self.name, self.cat, self.start, end, self.args)
+        return False
+
+
+class Tracer:
+    """
+    Coleta eventos de várias threads de uma tarefa.
+
+    Cada thread que participa da tarefa chama activate(tracer); os spans
+    registram o ID e o nome da thread, então workers aparecem como
+    linhas separadas no visualizador.
+    """
+
+    def __init__(self, name: str = 'job', max_events: int = MAX_EVENTS,
+                 max_events_per_name: int = MAX_EVENTS_PER_NAME):
+        self.name = name
+        self.pid = os.getpid()
+        self.max_events = max_events
+        self.max_events_per_name = max_events_per_name
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = {}
+        self._per_name = {}     # nome -> eventos guardados
+        self._dropped = {}      # nome -> eventos descartados
+
+    def _ts(self, instant: float) -> float:
+        """Microssegundos desde o início do trace."""
+        return round((instant - self._origin) * 1e6, 3)
+
+    def _record(self, event: Dict):
+        thread = threading.current_thread()
+        event['pid'] = self.pid
+        event['tid'] = thread.ident
+        name = event['name']
+        with self._lock:
+            kept = self._per_name.get(name, 0)
+            if kept >= self.max_events_per_name or len(self._events) >= self.max_events:
+                self._dropped[name] = self._dropped.get(name, 0) + 1
+                return
+            self._per_name[name] = kept + 1
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append(event)
+
+    @property
+    def dropped(self) -> int:
+        """Eventos descartados pelos limites."""
+        with self._lock:
+            return sum(self._dropped.values())
+
+    def span(self, name: str, cat: str = '', **args) -> _Span:
+        """Context manager que mede um trecho."""
+        return _Span(self, name, cat, args)
+
+    def complete(self, name: str, cat: str, start: float, end: float, args: Dict = None):
+        """Registra um trecho já medido (perf_counter de início e fim)."""
+        event = {'name': name, 'cat': cat, 'ph': 'X',
+                 'ts': self._ts(start), 'dur': round((end - start) * 1e6, 3)}
+        if args:
+            event['args'] = args
+        self._record(event)
+
+    def instant(self, name: str, cat: str = '', **args):
+        """Marca um instante (ex: cancelamento pedido)."""
+        event = {'name': name, 'cat': cat, 'ph': 'i', 's': 't',
+                 'ts': self._ts(time.perf_counter())}
+        if args:
+            event['args'] = args
+        self._record(event)
+
+    def to_dict(self) -> Dict:
+        """Documento no formato Chrome trace-event."""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            dropped = dict(self._dropped)
+
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                     'args': {'name': f"limpeza_david {self.name}"}}]
+        for tid, thread_name in threads.items():
+            metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                             'args': {'name': thread_name}})
+        return {
+            'traceEvents': metadata + events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'max_events': self.max_events,
+                'max_events_per_name': self.max_events_per_name,
+                'dropped_events': sum(dropped.values()),
+                'dropped_by_name': dropped,
+            },
+        }
+
+    def dump(self, path: Path):
+        """Grava o trace em JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+
+def current_tracer() -> Optional[Tracer]:
+    """Tracer ativo na thread atual (para repassar a workers)."""
+    return getattr(_local, 'tracer', None)
+
+
+@contextmanager
+def activate(tracer: Optional[Tracer]):
+    """Ativa o tracer na thread atual enquanto o bloco executa."""
+    previous = getattr(_local, 'tracer', None)
+    _local.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _local.tracer = previous
+
+
+def span(name: str, cat: str = '', **args):
+    """
+    Span no tracer da thread atual.
+
+    Sem tracer ativo retorna um span vazio compartilhado: o custo é uma
+    leitura de thread-local.
+    """
+    tracer = getattr(_local, 'tracer', None)
+    if tracer is None:
+        return _NOOP_SPAN
+    return _Span(tracer, name, cat, args)
+
+
+def traced(name: str, cat: str = ''):
+    """Decorador: executa a função dentro de um span quando há tracer ativo."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = getattr(_local, 'tracer', None)
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _Span(tracer, name, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def new_trace_path(name: str) -> Path:
+    """Caminho de um novo trace junto aos logs."""
+    return get_log_path().parent / f"trace_{name}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+
+
+def run_traced(path: Path, name: str, func: Callable, *args, **kwargs):
+    """
+    Executa a função com um tracer ativo e grava o trace em 'path'.
+
+    O trace é gravado mesmo se a função falhar.
+
+    Returns:
+        O resultado da função
+    """
+    tracer = Tracer(name)
+    try:
+        with activate(tracer), tracer.span(name, 'job'):
+            return func(*args, **kwargs)
+    finally:
+        tracer.dump(path)
+        get_logger("Tracing").info(f"Trace gravado em {path}")
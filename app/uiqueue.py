@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Fila de Atualizações da Interface
+Autor: David Fernandes
+Descrição: Leva as atualizações das threads de trabalho para a thread do
+           Tk. As threads só enfileiram; o mainloop esvazia a fila com
+           root.after a uma taxa fixa de quadros, agrupando eventos
+           consecutivos do mesmo tipo (uma inserção no log por quadro) e
+           guardando só o último valor de status e progresso.
+
+Nenhum widget é tocado fora da thread do Tk, e o custo por quadro é
+limitado: o que não couber no orçamento fica para o quadro seguinte.
+"""
+
+import time
+import queue
+import threading
+from typing import Callable, List
+
+
+# ~30 quadros por segundo
+FRAME_MS = 33
+
+# Tempo máximo gasto esvaziando a fila em cada quadro
+FRAME_BUDGET_MS = 12
+
+# Eventos por quadro (limita o tamanho do lote entregue a um handler)
+MAX_EVENTS_PER_FRAME = 5000
+
+# Marcador de chamada avulsa na fila
+_CALL = object()
+
+
+class UIDispatcher:
+    """
+    Fila entre as threads de trabalho e o mainloop do Tk.
+
+    post(tipo, dado)  evento em ordem; eventos seguidos do mesmo tipo
+                      chegam juntos ao handler de on_batch
+    set(tipo, valor)  valor agrupado: só o último de cada quadro é aplicado
+    call(func, ...)   chamada avulsa na thread do Tk (botões, messagebox)
+
+    Todos podem ser chamados de qualquer thread.
+    """
+
+    def __init__(self, root, frame_ms: int = FRAME_MS, budget_ms: int = FRAME_BUDGET_MS,
+                 max_events: int = MAX_EVENTS_PER_FRAME):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.budget = budget_ms / 1000
+        self.max_events = max_events
+        self._queue = queue.SimpleQueue()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._batch_handlers = {}
+        self._value_handlers = {}
+        self._after_id = None
+
+    def on_batch(self, kind: str, handler: Callable[[List], None]):
+        """Registra o handler de um tipo de evento (recebe a lista do lote)."""
+        self._batch_handlers[kind] = handler
+
+    def on_value(self, kind: str, handler: Callable[[object], None]):
+        """Registra o handler de um valor agrupado (recebe o último valor)."""
+        self._value_handlers[kind] = handler
+
+    def post(self, kind: str, payload=None):
+        self._queue.put((kind, payload))
+
+    def set(self, kind: str, value):
+        with self._lock:
+            self._latest[kind] = value
+
+    def call(self, func: Callable, *args, **kwargs):
+        self._queue.put((_CALL, (func, args, kwargs)))
+
+    def start(self):
+        """Começa a esvaziar a fila (chamar na thread do Tk)."""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.frame_ms, self._frame)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _flush(self, kind, batch: List):
+        if batch:
+            self._batch_handlers[kind](batch)
+
+    def drain(self) -> int:
+        """
+        Aplica o que estiver na fila dentro do orçamento do quadro.
+
+        Returns:
+            Número de eventos processados
+        """
+        deadline = time.perf_counter() + self.budget
+        processed = 0
+        kind, batch = None, []
+
+        # Valores primeiro: uma messagebox na fila já encontra o status final
+        with self._lock:
+            latest, self._latest = self._latest, {}
+        for value_kind, value in latest.items():
+            self._value_handlers[value_kind](value)
+
+        try:
+            while processed < self.max_events:
+                # O relógio é consultado a cada 64 eventos
+                if not processed & 63 and processed and time.perf_counter() > deadline:
+                    break
+                try:
+                    item_kind, payload = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                processed += 1
+
+                if item_kind is _CALL:
+                    self._flush(kind, batch)
+                    kind, batch = None, []
+                    func, args, kwargs = payload
+                    func(*args, **kwargs)
+                elif item_kind == kind:
+                    batch.append(payload)
+                else:
+                    self._flush(kind, batch)
+                    kind, batch = item_kind, [payload]
+        finally:
+            self._flush(kind, batch)
+        return processed
+
+    def _frame(self):
+        try:
+            self.drain()
+        finally:
+            # Reagenda mesmo se um handler falhar; uma messagebox aberta
+            # dentro de um handler só adia o próximo quadro
+            self._after_id = self.root.after(self.frame_ms, self._frame)
@@ -8,12 +8,16 @@ Descrição: Funções utilitárias compartilhadas para o projeto.
 
 import os
 import sys
-import shutil
+import time
 import logging
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from app.metrics import SYSCALLS, UNLINK_ERRORS, DELETE_LATENCY, TREE_REMOVAL_DURATION, error_reason
+from app.sizes import measure
+
 # === Cores para Terminal ===
 class Colors:
     """Códigos de cores ANSI para terminal."""
@@ -53,47 +57,162 @@ COLORS = {
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
-
-def get_log_path() -> Path:
-    """Retorna o caminho para o arquivo de log."""
+def _parse_log_level(value: str) -> Optional[int]:
+    """Nível numérico de um nome ('debug', 'INFO') ou número; None se inválido."""
+    value = value.strip().upper()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value)
+    return level if isinstance(level, int) else None
+
+
+# Nível dos loggers do app. O padrão INFO deixa de fora as linhas por
+# arquivo (DEBUG, que antes sempre chegavam ao arquivo de log); use
+# LIMPEZA_DAVID_LOG_LEVEL=DEBUG para tê-las (ver README). Um valor
+# inválido cai para INFO com um aviso no primeiro logger criado
+_LOG_LEVEL_SETTING = os.environ.get('LIMPEZA_DAVID_LOG_LEVEL') or 'INFO'
+LOG_LEVEL = _parse_log_level(_LOG_LEVEL_SETTING)
+_invalid_log_level = LOG_LEVEL is None
+if _invalid_log_level:
+    LOG_LEVEL = logging.INFO
+
+# Fila compartilhada: as threads de trabalho só enfileiram; a thread do
+# QueueListener formata e grava no arquivo e no console
+_queue_handler = None
+_queue_listener = None
+_queue_lock = threading.Lock()
+
+
+def get_log_path(create: bool = True) -> Path:
+    """
+    Retorna o caminho para o arquivo de log.
+    
+    Args:
+        create: Cria o diretório de logs se não existir
+    """
     if sys.platform == 'win32':
         log_dir = Path(os.environ.get('LOCALAPPDATA', '')) / 'limpeza_david' / 'logs'
     else:
         log_dir = Path.home() / '.local' / 'share' / 'limpeza_david' / 'logs'
         
-    log_dir.mkdir(parents=True, exist_ok=True)
+    if create:
+        log_dir.mkdir(parents=True, exist_ok=True)
     return log_dir / f"limpeza_{datetime.now().strftime('%Y%m%d')}.log"
 
 
+class DeferredFileHandler(logging.FileHandler):
+    """
+    FileHandler que só cria o diretório e o arquivo de log na primeira
+    mensagem gravada, e não ao criar o logger.
+    """
+    
+    def __init__(self, filename, encoding='utf-8'):
+        super().__init__(filename, encoding=encoding, delay=True)
+        
+    def _open(self):
+        try:
+            Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+            return super()._open()
+        except OSError:
+            # Sem diretório de logs gravável: descarta as mensagens
+            return open(os.devnull, 'w', encoding='utf-8')
+
+
+class LazyQueueHandler(logging.Handler):
+    """
+    Enfileira o registro com a mensagem resolvida, mas sem formatá-lo.
+    
+    Como no QueueHandler.prepare, os argumentos '%s' e a exceção são
+    convertidos em texto na thread que registra (objetos mutáveis podem
+    mudar antes de o listener rodar); a linha final (data, nome, nível)
+    é montada pela thread do listener.
+    """
+    
+    _exc_formatter = logging.Formatter()
+    
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+        
+    def emit(self, record):
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = self._exc_formatter.formatException(record.exc_info)
+                record.exc_info = None
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+def _shared_handler() -> logging.Handler:
+    """Cria (uma vez) a fila, os handlers de arquivo e console e o listener."""
+    global _queue_handler, _queue_listener
+    
+    with _queue_lock:
+        if _queue_handler is None:
+            import queue
+            import atexit
+            from logging.handlers import QueueListener
+            
+            formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+            
+            # Handler para arquivo (criado só na primeira mensagem)
+            file_handler = DeferredFileHandler(get_log_path(create=False))
+            file_handler.setLevel(logging.DEBUG)
+            file_handler.setFormatter(formatter)
+            
+            # Handler para console
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(formatter)
+            
+            log_queue = queue.SimpleQueue()
+            _queue_listener = QueueListener(
+                log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            _queue_listener.start()
+            atexit.register(stop_logging)
+            _queue_handler = LazyQueueHandler(log_queue)
+            
+    return _queue_handler
+
+
+def stop_logging():
+    """Grava as mensagens pendentes e encerra a thread de logging."""
+    global _queue_listener
+    
+    with _queue_lock:
+        if _queue_listener is not None:
+            _queue_listener.stop()
+            for handler in _queue_listener.handlers:
+                handler.close()
+            _queue_listener = None
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Cria e configura um logger.
     
+    Todos os loggers compartilham um handler de fila; o arquivo e o
+    console são escritos pela thread do QueueListener.
+    
     Args:
         name: Nome do logger
         
     Returns:
         Logger configurado
     """
+    global _invalid_log_level
     logger = logging.getLogger(name)
     
     if not logger.handlers:
-        logger.setLevel(logging.DEBUG)
-        
-        # Handler para arquivo
-        try:
-            file_handler = logging.FileHandler(get_log_path(), encoding='utf-8')
-            file_handler.setLevel(logging.DEBUG)
-            file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
-            logger.addHandler(file_handler)
-        except Exception:
-            pass
-            
-        # Handler para console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
-        logger.addHandler(console_handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(_shared_handler())
+        if _invalid_log_level:
+            _invalid_log_level = False
+            logger.warning("LIMPEZA_DAVID_LOG_LEVEL inválido (%r); usando INFO", _LOG_LEVEL_SETTING)
         
     return logger
 
@@ -157,65 +276,119 @@ def parse_size(size_str: str) -> int:
     return 0
 
 
+# === Cancelamento ===
+class CancelToken:
+    """
+    Sinal de cancelamento cooperativo.
+    
+    A thread que executa a operação consulta 'cancelled' a cada arquivo e
+    encerra com os resultados parciais; qualquer outra thread pode chamar
+    cancel().
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        
+    def cancel(self):
+        """Solicita o cancelamento."""
+        self._event.set()
+        
+    @property
+    def cancelled(self) -> bool:
+        """True se o cancelamento foi solicitado."""
+        return self._event.is_set()
+
+
+def is_cancelled(token: Optional[CancelToken]) -> bool:
+    """Verifica um token opcional (None nunca é cancelado)."""
+    return token is not None and token.cancelled
+
+
 # === Operações de Arquivo ===
 def get_file_size(path: Path) -> int:
     """
     Retorna o tamanho de um arquivo em bytes.
     
+    Diretórios são medidos pelo app.sizes (scandir com cache por
+    diretório), então medir de novo na limpeza custa um único lstat.
+    Links simbólicos contam como o próprio link.
+    
     Args:
         path: Caminho do arquivo
         
     Returns:
         Tamanho em bytes ou 0 em caso de erro
     """
-    try:
-        if path.is_file():
-            return path.stat().st_size
-        elif path.is_dir():
-            return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
-    except (OSError, PermissionError):
-        pass
-    return 0
+    return measure(path).bytes
 
 
-def safe_remove_file(path: Path) -> bool:
+def safe_remove_file(path: Path, base: Path = None) -> bool:
     """
     Remove um arquivo de forma segura.
     
     Args:
         path: Caminho do arquivo
+        base: Diretório a partir do qual o caminho é aberto sem seguir
+              links (ver app.remover.unlink_beneath); usado quando o dono
+              do caminho não é quem remove
         
     Returns:
         True se removido com sucesso
     """
+    start = time.perf_counter()
     try:
+        if base is not None:
+            from app.remover import unlink_beneath
+            SYSCALLS.labels(op='unlink').inc()
+            unlink_beneath(path, base)
+            DELETE_LATENCY.observe(time.perf_counter() - start)
+            return True
         if path.exists():
+            SYSCALLS.labels(op='unlink').inc()
             path.unlink()
+            DELETE_LATENCY.observe(time.perf_counter() - start)
             return True
+    except FileNotFoundError:
+        pass
     except (OSError, PermissionError) as e:
-        logger = get_logger("utils")
-        logger.debug(f"Não foi possível remover {path}: {e}")
+        UNLINK_ERRORS.labels(reason=error_reason(e)).inc()
+        get_logger("utils").debug("Não foi possível remover %s: %s", path, e)
     return False
 
 
-def safe_remove_dir(path: Path) -> bool:
+def safe_remove_dir(path: Path, workers: int = None, cancel_token=None,
+                    base: Path = None) -> 'RemovalReport':
     """
     Remove um diretório de forma segura.
     
+    Usa o app.remover (descritores de arquivo, sem seguir links): as falhas
+    não são escondidas e uma remoção parcial informa o que saiu de fato.
+    
     Args:
         path: Caminho do diretório
+        workers: Subdiretórios removidos em paralelo (padrão do app.remover)
+        cancel_token: Token opcional de cancelamento
+        base: Diretório a partir do qual o caminho é aberto sem seguir links
         
     Returns:
-        True se removido com sucesso
+        RemovalReport, verdadeiro se removido por completo
     """
-    try:
-        if path.exists():
-            shutil.rmtree(path, ignore_errors=True)
-            return not path.exists()
-    except (OSError, PermissionError) as e:
+    # app.remover usa o tracing, que depende deste módulo
+    from app.remover import remove_tree
+
+    start = time.perf_counter()
+    report = remove_tree(path, workers=workers, cancel_token=cancel_token, base=base)
+    # Uma árvore inteira não entra no histograma por arquivo
+    TREE_REMOVAL_DURATION.observe(time.perf_counter() - start)
+    if report.failures:
         logger = get_logger("utils")
-        logger.debug(f"Não foi possível remover {path}: {e}")
-    return False
+        for failure in report.failures:
+            logger.warning("Não foi possível remover %s: %s (%s)",
+                           failure.path, failure.message, failure.reason)
+        hidden = report.totals.failures - len(report.failures)
+        if hidden > 0:
+            logger.warning("... mais %d falhas ao remover %s", hidden, path)
+    return report
 
 
 # === Utilidades de Interface ===
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Widgets da Interface
+Autor: David Fernandes
+Descrição: Componentes Tkinter reutilizáveis da interface gráfica.
+"""
+
+import os
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+from typing import Dict, Iterable, List, Tuple
+
+from app.logbuffer import LogRingBuffer
+from app.utils import format_size
+
+
+class BoundedLogView(ttk.Frame):
+    """
+    Log com limite de linhas no widget e histórico completo em memória.
+
+    O Text mostra no máximo max_lines linhas; quando passa de
+    max_lines + trim_batch, as mais antigas saem numa única exclusão, então
+    inserir continua O(lote) depois de muitas análises. Todas as linhas
+    ficam num LogRingBuffer (history) e o filtro busca nele, redesenhando
+    só as últimas max_lines ocorrências de uma vez.
+    """
+
+    def __init__(self, master, max_lines: int = 2000, trim_batch: int = 500,
+                 history: int = 20000, filter_delay_ms: int = 200, **text_options):
+        super().__init__(master)
+        self.max_lines = max_lines
+        self.trim_batch = trim_batch
+        self.filter_delay_ms = filter_delay_ms
+        self.history = LogRingBuffer(history)
+        self._query = ''
+        self._lines = 0
+        self._match_count = 0
+        self._filter_after = None
+
+        # Barra de filtro
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(bar, text="🔎 Filtrar:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        entry = ttk.Entry(bar, textvariable=self.filter_var)
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
+        entry.bind('<Escape>', lambda event: self.filter_var.set(''))
+        self.count_label = ttk.Label(bar, text="", style='Info.TLabel')
+        self.count_label.pack(side=tk.RIGHT)
+        self.filter_var.trace_add('write', self._on_filter_typed)
+
+        self.text = scrolledtext.ScrolledText(self, **text_options)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.text.configure(state=tk.DISABLED)
+
+    def tag_configure(self, tag: str, **options):
+        self.text.tag_configure(tag, **options)
+
+    def _matches(self, message: str) -> bool:
+        return not self._query or self._query in message.lower()
+
+    def _at_bottom(self) -> bool:
+        return self.text.yview()[1] >= 1.0
+
+    def _render(self, lines: List[Tuple[str, str]], replace: bool = False):
+        """Insere (ou substitui por) um lote de linhas numa única chamada."""
+        follow = replace or self._at_bottom()
+        # texto, tags, texto, tags...
+        chunks = []
+        added = 0
+        for message, tag in lines:
+            chunks.append(message + "\n")
+            chunks.append(tag or ())
+            added += message.count("\n") + 1
+
+        self.text.configure(state=tk.NORMAL)
+        if replace:
+            self.text.delete('1.0', tk.END)
+            self._lines = 0
+        if chunks:
+            self.text.insert(tk.END, *chunks)
+            self._lines += added
+        if self._lines > self.max_lines + self.trim_batch:
+            excess = self._lines - self.max_lines
+            self.text.delete('1.0', f'{excess + 1}.0')
+            self._lines -= excess
+        self.text.configure(state=tk.DISABLED)
+
+        # Só acompanha o fim se o usuário não rolou para cima
+        if follow:
+            self.text.see(tk.END)
+
+    def append(self, lines: Iterable[Tuple[str, str]]):
+        """Adiciona um lote de linhas (mensagem, tag) ao histórico e à tela."""
+        visible = []
+        for message, tag in lines:
+            self.history.append(message, tag or '')
+            if self._matches(message):
+                visible.append((message, tag))
+        if visible:
+            self._render(visible)
+        if self._query:
+            self._match_count += len(visible)
+            self._update_count()
+
+    def _update_count(self):
+        if self._query:
+            total = len(self.history)
+            self.count_label.configure(text=f"{min(self._match_count, total)} de {total} linhas")
+        else:
+            self.count_label.configure(text="")
+
+    def _on_filter_typed(self, *args):
+        # Espera o usuário parar de digitar antes de buscar
+        if self._filter_after is not None:
+            self.after_cancel(self._filter_after)
+        self._filter_after = self.after(self.filter_delay_ms, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_after = None
+        self.set_filter(self.filter_var.get())
+
+    def set_filter(self, query: str):
+        """Mostra só as linhas do histórico que contêm 'query' (vazio = todas)."""
+        self._query = query.strip().lower()
+        matches = [
+            (entry['message'], entry['level'])
+            for entry in self.history.tail(self.history.capacity)
+            if self._matches(entry['message'])
+        ]
+        self._match_count = len(matches)
+        # A tela recebe só as últimas max_lines ocorrências
+        self._render(matches[-self.max_lines:], replace=True)
+        self._update_count()
+
+    def clear(self):
+        """Limpa a tela e o histórico."""
+        self.history.clear()
+        self._match_count = 0
+        self._render([], replace=True)
+        self._update_count()
+
+
+class ResultsTree(ttk.Frame):
+    """
+    Árvore dos resultados da análise com carregamento sob demanda.
+
+    Só as categorias entram de início; os filhos de um nó são lidos da
+    PathTree quando ele é expandido, então uma análise com milhões de
+    arquivos abre na hora. Subárvores podem ser excluídas da limpeza
+    (barra de espaço, Delete ou o botão).
+    """
+
+    # Filhos mostrados por nó (o restante vira um item de resumo)
+    MAX_CHILDREN = 500
+
+    def __init__(self, master, on_change=None, **tree_options):
+        super().__init__(master)
+        self.on_change = on_change
+        self._trees = {}        # categoria -> PathTree
+        self._nodes = {}        # iid -> (categoria, caminho, é_diretório)
+        self._pending = set()   # iids com filhos ainda não carregados
+        self.excluded = {}      # categoria -> caminhos excluídos
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(bar, text="🚫 Excluir / incluir seleção",
+                   command=self.toggle_selected).pack(side=tk.LEFT)
+        self.excluded_label = ttk.Label(bar, text="", style='Info.TLabel')
+        self.excluded_label.pack(side=tk.RIGHT)
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(body, columns=('size', 'files'), selectmode='extended', **tree_options)
+        self.tree.heading('#0', text="Caminho")
+        self.tree.heading('size', text="Tamanho")
+        self.tree.heading('files', text="Itens")
+        self.tree.column('#0', stretch=True, width=420)
+        self.tree.column('size', anchor=tk.E, stretch=False, width=100)
+        self.tree.column('files', anchor=tk.E, stretch=False, width=80)
+        self.tree.tag_configure('excluded', foreground='#808080')
+        scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<<TreeviewOpen>>', self._on_open)
+        self.tree.bind('<space>', lambda event: self.toggle_selected())
+        self.tree.bind('<Delete>', lambda event: self.toggle_selected())
+
+    def clear(self):
+        """Remove todos os nós e exclusões."""
+        self.tree.delete(*self.tree.get_children())
+        self._trees = {}
+        self._nodes = {}
+        self._pending = set()
+        self.excluded = {}
+        self._changed()
+
+    def load(self, trees: Dict, names: Dict[str, str]):
+        """
+        Mostra as categorias (sem filhos carregados).
+
+        Args:
+            trees: Categoria -> PathTree
+            names: Categoria -> nome exibido
+        """
+        self.clear()
+        self._trees = {cat_id: tree for cat_id, tree in trees.items() if len(tree)}
+        for cat_id, tree in sorted(self._trees.items(), key=lambda item: -item[1].size):
+            iid = self.tree.insert('', tk.END, text=f"📂 {names.get(cat_id, cat_id)}",
+                                   values=(format_size(tree.size), len(tree)))
+            self._nodes[iid] = (cat_id, tree.root, True)
+            self._add_placeholder(iid)
+
+    def _add_placeholder(self, iid: str):
+        # Filho provisório: faz a seta de expandir aparecer
+        self.tree.insert(iid, tk.END, text="…")
+        self._pending.add(iid)
+
+    def _on_open(self, event=None):
+        iid = self.tree.focus()
+        if iid in self._pending:
+            self._load_children(iid)
+
+    def _load_children(self, iid: str):
+        self._pending.discard(iid)
+        self.tree.delete(*self.tree.get_children(iid))
+        cat_id, path, _ = self._nodes[iid]
+        tree = self._trees[cat_id]
+        excluded = self.excluded.get(cat_id, set())
+        inherited = self._is_excluded(cat_id, path)
+
+        children = sorted(tree.children(path), key=lambda node: -node.size)
+        for node in children[:self.MAX_CHILDREN]:
+            icon = "📁" if node.is_dir else "📄"
+            tags = ('excluded',) if inherited or node.path in excluded else ()
+            child = self.tree.insert(iid, tk.END, text=f"{icon} {node.name}", tags=tags,
+                                     values=(format_size(node.size), node.files))
+            self._nodes[child] = (cat_id, node.path, node.is_dir)
+            if node.is_dir:
+                self._add_placeholder(child)
+
+        hidden = children[self.MAX_CHILDREN:]
+        if hidden:
+            self.tree.insert(iid, tk.END, text=f"… mais {len(hidden)} itens",
+                             values=(format_size(sum(node.size for node in hidden)),
+                                     sum(node.files for node in hidden)))
+
+    def _is_excluded(self, cat_id: str, path: str) -> bool:
+        """O caminho ou algum ancestral (até a raiz da categoria) está excluído."""
+        excluded = self.excluded.get(cat_id)
+        if not excluded:
+            return False
+        root = self._trees[cat_id].root
+        while True:
+            if path in excluded:
+                return True
+            if path == root or len(path) <= len(root):
+                return False
+            path = os.path.dirname(path)
+
+    def toggle_selected(self):
+        """Exclui (ou volta a incluir) os nós selecionados."""
+        for iid in self.tree.selection():
+            node = self._nodes.get(iid)
+            if node is None:
+                continue
+            cat_id, path, _ = node
+            excluded = self.excluded.setdefault(cat_id, set())
+            if path in excluded:
+                excluded.discard(path)
+            else:
+                excluded.add(path)
+            self._refresh_tags(iid)
+        self._changed()
+
+    def _refresh_tags(self, iid: str):
+        """Atualiza a marcação do nó e dos descendentes já carregados."""
+        stack = [iid]
+        while stack:
+            current = stack.pop()
+            node = self._nodes.get(current)
+            if node is not None:
+                cat_id, path, _ = node
+                self.tree.item(current, tags=('excluded',) if self._is_excluded(cat_id, path) else ())
+            if current not in self._pending:
+                stack.extend(self.tree.get_children(current))
+
+    def excluded_totals(self) -> Tuple[int, int]:
+        """(bytes, itens) que ficam fora da limpeza."""
+        size = files = 0
+        for cat_id, paths in self.excluded.items():
+            if paths:
+                cat_size, cat_files = self._trees[cat_id].excluded_totals(paths)
+                size += cat_size
+                files += cat_files
+        return size, files
+
+    def files_to_clean(self, cat_id: str, files: List[str]) -> List[str]:
+        """Arquivos da categoria sem as subárvores excluídas."""
+        excluded = self.excluded.get(cat_id)
+        if not excluded or cat_id not in self._trees:
+            return files
+        return self._trees[cat_id].without(excluded)
+
+    def _changed(self):
+        size, files = self.excluded_totals()
+        self.excluded_label.configure(
+            text=f"Fora da limpeza: {format_size(size)} ({files} itens)" if files else ""
+        )
+        if self.on_change:
+            self.on_change(size, files)
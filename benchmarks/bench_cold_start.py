@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+limpeza_david - Benchmark de Inicialização a Frio
+Autor: David Fernandes
+Descrição: Mede o tempo de importação dos módulos usados por execuções
+           via cron, cada um em um processo novo, e falha se algum passar
+           do orçamento, carregar um módulo proibido (tkinter, flask) ou
+           criar o diretório de logs só por ser importado.
+
+Uso:
+    python benchmarks/bench_cold_start.py [--runs 7] [--scale 1.0]
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+SYSTEM_CLEANER = 'app.cleaner.windows' if sys.platform == 'win32' else 'app.cleaner.linux'
+
+# (módulo, orçamento em ms, módulos que não podem ser carregados)
+TARGETS = [
+    ('app', 20, ('tkinter', 'flask')),
+    ('app.utils', 60, ('tkinter', 'flask')),
+    (SYSTEM_CLEANER, 80, ('tkinter', 'flask')),
+    ('app.jobs', 100, ('tkinter', 'flask', 'pstats', 'cProfile')),
+    ('app.cli', 100, ('tkinter', 'flask')),
+    ('app.api', 450, ('tkinter',)),
+]
+
+# Executado no processo filho: mede só a importação do módulo
+CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed, 'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, forbidden, home):
+    """Importa o módulo em um processo novo; retorna (ms, módulos proibidos carregados)."""
+    env = dict(os.environ, HOME=str(home), LOCALAPPDATA=str(home), PYTHONDONTWRITEBYTECODE='1')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PROJECT_DIR), env.get('PYTHONPATH')]))
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(module=module, forbidden=tuple(forbidden))],
+        cwd=str(PROJECT_DIR), env=env, capture_output=True, text=True, check=True
+    ).stdout
+    data = json.loads(output.strip().splitlines()[-1])
+    return data['ms'], data['loaded']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização a frio")
+    parser.add_argument('--runs', type=int, default=7, help="Execuções por módulo (padrão: 7)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiplica os orçamentos (ex: 2 em máquinas lentas de CI)")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'módulo':<22} {'mediana':>9} {'mínimo':>9} {'orçamento':>10}")
+
+    for module, budget, forbidden in TARGETS:
+        budget *= args.scale
+        with tempfile.TemporaryDirectory(prefix='ldbench') as home:
+            try:
+                runs = [measure(module, forbidden, home) for _ in range(max(1, args.runs))]
+            except subprocess.CalledProcessError as e:
+                failures.append(f"{module}: falhou ao importar ({e.stderr.strip().splitlines()[-1:]})")
+                continue
+            created = any(Path(home).iterdir())
+
+        times = [ms for ms, _ in runs]
+        median = statistics.median(times)
+        print(f"{module:<22} {median:>7.1f}ms {min(times):>7.1f}ms {budget:>8.0f}ms")
+
+        if median > budget:
+            failures.append(f"{module}: {median:.1f}ms acima do orçamento de {budget:.0f}ms")
+        loaded = sorted({m for _, found in runs for m in found})
+        if loaded:
+            failures.append(f"{module}: carregou {', '.join(loaded)}")
+        if created:
+            failures.append(f"{module}: criou arquivos no diretório pessoal ao ser importado")
+
+    if failures:
+        print("\nFALHOU:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\nOK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react'
-import { RefreshCw, Trash2, Search, CheckSquare, XSquare } from 'lucide-react'
+import { RefreshCw, Trash2, Search, CheckSquare, XSquare, StopCircle } from 'lucide-react'
 import ProgressBar from './components/ProgressBar'
 import CategorySelector from './components/CategorySelector'
 import './App.css'
@@ -18,20 +18,50 @@ function App() {
     logs: []
   })
   const [scanResults, setScanResults] = useState(null)
+  const [streamConnected, setStreamConnected] = useState(false)
 
   useEffect(() => {
     fetchSystemInfo()
     fetchCategories()
   }, [])
 
+  // Stream de eventos (SSE); se não estiver disponível, usa polling
   useEffect(() => {
+    if (!window.EventSource) return
+    const source = new EventSource('/api/events')
+
+    source.onopen = () => setStreamConnected(true)
+    source.onerror = () => setStreamConnected(false)
+
+    source.addEventListener('state', (e) => {
+      const data = JSON.parse(e.data)
+      setState(prev => ({ ...prev, ...data }))
+      if (data.status === 'scan_complete') fetchScanResults()
+    })
+    source.addEventListener('progress', (e) => {
+      const data = JSON.parse(e.data)
+      setState(prev => ({ ...prev, ...data }))
+    })
+    source.addEventListener('log', (e) => {
+      const entry = JSON.parse(e.data)
+      setState(prev => ({ ...prev, logs: [...prev.logs, entry].slice(-100) }))
+    })
+    source.addEventListener('logs_cleared', () => {
+      setState(prev => ({ ...prev, logs: [] }))
+    })
+
+    return () => source.close()
+  }, [])
+
+  useEffect(() => {
+    if (streamConnected) return
     const interval = setInterval(() => {
       if (state.is_scanning || state.is_cleaning || state.is_updating) {
         fetchState()
       }
     }, 500)
     return () => clearInterval(interval)
-  }, [state.is_scanning, state.is_cleaning, state.is_updating])
+  }, [streamConnected, state.is_scanning, state.is_cleaning, state.is_updating])
 
   const fetchSystemInfo = async () => {
     try {
@@ -45,7 +75,7 @@ function App() {
 
   const fetchCategories = async () => {
     try {
-      const res = await fetch('/api/categories')
+      const res = await fetch('/api/categories?estimate=1')
       const data = await res.json()
       setCategories(data)
       setSelectedCategories(Object.keys(data))
@@ -107,6 +137,14 @@ function App() {
     }
   }
 
+  const handleCancel = async () => {
+    try {
+      await fetch('/api/cancel', { method: 'POST' })
+    } catch (error) {
+      console.error('Erro:', error)
+    }
+  }
+
   const handleUpdate = async () => {
     if (!window.confirm('Verificar atualizações?')) return
     try {
@@ -196,6 +234,7 @@ function App() {
             <div className="status-text">
               {state.status === 'scan_complete' && '✅ Análise concluída!'}
               {state.status === 'clean_complete' && '✅ Limpeza concluída!'}
+              {state.status === 'cancelled' && '⏹️ Operação cancelada'}
               {state.status === 'scanning' && '🔍 Analisando...'}
               {state.status === 'cleaning' && '🧹 Limpando...'}
               {state.status === 'updating' && '🔄 Atualizando...'}
@@ -221,6 +260,13 @@ function App() {
               <Trash2 size={20} />
               Limpar
             </button>
+
+            {(state.is_scanning || state.is_cleaning) && (
+              <button onClick={handleCancel} className="btn btn-secondary">
+                <StopCircle size={20} />
+                Cancelar
+              </button>
+            )}
           </div>
         </section>
       </main>
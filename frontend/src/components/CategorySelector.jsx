@@ -16,6 +16,14 @@ function CategorySelector({ categories, selected, onToggle, disabled }) {
           />
           <span className="category-icon">{catInfo.icon}</span>
           <span className="category-name">{catInfo.name}</span>
+          {catInfo.estimate && catInfo.estimate.bytes > 0 && (
+            <span
+              className="category-estimate"
+              title={catInfo.estimate.exact ? 'Tamanho medido' : 'Estimativa por amostragem'}
+            >
+              {catInfo.estimate.exact ? '' : '~'}{catInfo.estimate.formatted}
+            </span>
+          )}
         </label>
       ))}
     </div>
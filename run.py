@@ -7,13 +7,18 @@ Permite executar o app diretamente da pasta raiz do projeto
 
 import os
 import sys
+import argparse
 
 # Adiciona o diretório do projeto ao path
 project_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_dir)
 
-# Importa e executa o app
-from app.main import main
-
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Limpeza David - Limpador de Sistema")
+    parser.add_argument('--profile', action='store_true',
+                        help="Executa análises e limpezas sob o cProfile (.pstats junto aos logs)")
+    args = parser.parse_args()
+    
+    # Importa e executa o app (o tkinter só carrega depois dos argumentos)
+    from app.main import main
+    main(profile=args.profile)
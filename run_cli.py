@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para executar o Limpeza David sem interface (automação/cron)
+Escreve um objeto JSON por linha no stdout (ver app/cli.py).
+
+Exemplos:
+    python3 run_cli.py list
+    python3 run_cli.py scan thumbnails trash
+    python3 run_cli.py scan tmp user_cache --clean --batch 500
+"""
+
+import sys
+
+from app.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ Inicia a API Flask e abre o navegador automaticamente.
 
 import os
 import sys
+import argparse
 import webbrowser
 import threading
 import time
@@ -15,7 +16,8 @@ import time
 project_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_dir)
 
-from app.api import run_api
+# app.api (Flask) só é importado depois de ler os argumentos
+from app.server import SERVER_BACKENDS, DEFAULT_THREADS, DEFAULT_BACKLOG, DEFAULT_KEEPALIVE
 
 
 def open_browser(port):
@@ -24,8 +26,30 @@ def open_browser(port):
     webbrowser.open(f'http://localhost:{port}')
 
 
+def parse_args():
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description="Limpeza David - Interface Web")
+    parser.add_argument('--host', default='0.0.0.0', help="Endereço de escuta (padrão: 0.0.0.0)")
+    parser.add_argument('--port', type=int, default=5000, help="Porta (padrão: 5000)")
+    parser.add_argument('--server', choices=SERVER_BACKENDS, default='auto',
+                        help="Servidor HTTP: auto usa waitress se instalado, senão o embutido")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help=f"Workers do servidor; cada stream de eventos ocupa um (padrão: {DEFAULT_THREADS})")
+    parser.add_argument('--backlog', type=int, default=DEFAULT_BACKLOG,
+                        help=f"Conexões aguardando worker antes de responder 503 (padrão: {DEFAULT_BACKLOG})")
+    parser.add_argument('--keepalive', type=int, default=DEFAULT_KEEPALIVE,
+                        help=f"Segundos de inatividade antes de fechar a conexão (padrão: {DEFAULT_KEEPALIVE})")
+    parser.add_argument('--no-browser', action='store_true', help="Não abre o navegador")
+    parser.add_argument('--profile', action='store_true',
+                        help="Executa análises e limpezas sob o cProfile (.pstats junto aos logs)")
+    parser.add_argument('--trace', action='store_true',
+                        help="Grava a linha do tempo das análises e limpezas (Chrome trace junto aos logs)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    port = 5000
+    args = parse_args()
+    port = args.port
     
     print("=" * 50)
     print("🧹 Limpeza David - Interface Web")
@@ -34,9 +58,13 @@ if __name__ == "__main__":
     print("📝 Pressione Ctrl+C para encerrar\n")
     
     # Abre o navegador em uma thread separada
-    browser_thread = threading.Thread(target=open_browser, args=(port,))
-    browser_thread.daemon = True
-    browser_thread.start()
+    if not args.no_browser:
+        browser_thread = threading.Thread(target=open_browser, args=(port,))
+        browser_thread.daemon = True
+        browser_thread.start()
     
     # Inicia a API
-    run_api(host='0.0.0.0', port=port, debug=False)
+    from app.api import run_api
+    run_api(host=args.host, port=port, debug=False, server=args.server,
+            threads=args.threads, backlog=args.backlog, keepalive=args.keepalive,
+            profile=args.profile, trace=args.trace)
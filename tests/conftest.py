@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Configuração comum dos testes."""
+
+import os
+import sys
+
+# Permite 'import app' rodando o pytest a partir da raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
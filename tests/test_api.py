@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Testes do app.api (limite de requisições longas)."""
+
+import pytest
+
+from app import api
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api.long_requests, 'limit', 1)
+    monkeypatch.setattr(api.long_requests, 'active', 0)
+    return api.app.test_client()
+
+
+def test_event_streams_beyond_the_limit_get_503(client):
+    first = client.get('/api/events')
+    assert first.status_code == 200
+
+    second = client.get('/api/events')
+    assert second.status_code == 503
+    assert second.headers['Retry-After']
+
+    first.close()
+    assert api.long_requests.active == 0
+    third = client.get('/api/events')
+    assert third.status_code == 200
+    third.close()
+
+
+def test_long_poll_without_a_slot_gets_503_but_plain_state_works(client):
+    etag = client.get('/api/state').headers['ETag']
+    assert api.long_requests.acquire()
+    try:
+        busy = client.get('/api/state?wait=5', headers={'If-None-Match': etag})
+        assert busy.status_code == 503
+        assert client.get('/api/state').status_code == 200
+    finally:
+        api.long_requests.release()
+
+    assert client.get('/api/state?wait=0.01', headers={'If-None-Match': etag}).status_code == 304
+    assert api.long_requests.active == 0
+
+
+@pytest.mark.parametrize('body', [
+    {'target_free_percent': '50'},
+    {'target_free_percent': -1},
+    {'target_free_percent': 101},
+    {'target_free_bytes': -10},
+    {'target_free_bytes': 'muito'},
+    {'target_free_bytes': True},
+    {'target_free_bytes': 10, 'paths': '/'},
+    {'target_free_bytes': 10, 'order': 5},
+    {},
+])
+def test_invalid_policy_targets_are_rejected(body):
+    with pytest.raises(ValueError):
+        api._build_policy(body)
+
+
+def test_policy_endpoints_answer_400_for_bad_targets(monkeypatch):
+    class ScanJob:
+        id = 'scan'
+
+    monkeypatch.setattr(api, '_scan_results',
+                        lambda job_id=None: (ScanJob, {'tmp': {'files': [], 'size': 0, 'name': 'tmp'}}))
+    client = api.app.test_client()
+    for route in ('/api/policy/plan', '/api/policy/apply'):
+        response = client.post(route, json={'target_free_percent': '50'})
+        assert response.status_code == 400
+        assert 'target_free_percent' in response.get_json()['error']
+
+
+def test_valid_policy_is_built():
+    policy = api._build_policy({'target_free_bytes': 1.5e9, 'order': 'mtime', 'paths': ['/']})
+    assert policy.target_free_bytes == 1_500_000_000
+    assert policy.order == 'mtime'
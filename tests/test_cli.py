@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Testes do app.cli (saída NDJSON)."""
+
+import io
+import json
+
+from app import cli
+from app.utils import CancelToken
+
+
+class CancellingCleaner:
+    """Cleaner cuja varredura é interrompida por um cancelamento no meio."""
+
+    token = None
+
+    def scan_categories(self, categories, cancel_token=None, on_progress=None, sizes=None):
+        cancel_token.cancel()
+        sizes.update({f'/tmp/{cat_id}/parcial': 1 for cat_id in categories})
+        return {cat_id: ([f'/tmp/{cat_id}/parcial'], 1) for cat_id in categories}
+
+    def clean_files(self, *args, **kwargs):
+        raise AssertionError("nada deve ser limpo após o cancelamento")
+
+
+def test_cancelled_scan_still_reports_every_category(monkeypatch):
+    monkeypatch.setattr(cli, 'get_system_cleaner', lambda: CancellingCleaner)
+    stream = io.StringIO()
+
+    code = cli.run_scan(['a', 'b', 'c'], clean=True, stream=stream, cancel_token=CancelToken())
+
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    reported = [e['category'] for e in events if e['event'] == 'category']
+    assert reported == ['a', 'b', 'c']
+    assert not any(e['event'] == 'cleaned' for e in events)
+    assert code == cli.EXIT_CANCELLED
+    assert events[-1]['cancelled'] and events[-1]['files'] == 3
+
+
+class RecordingCleaner:
+    """Cleaner que registra os tamanhos recebidos pela limpeza."""
+
+    cleaned_sizes = None
+
+    def get_categories(self):
+        return {'a': {'name': 'A'}}
+
+    @classmethod
+    def scan_categories(cls, categories, cancel_token=None, on_progress=None, sizes=None):
+        sizes.update({'/tmp/a/x': 3, '/tmp/a/y': 5})
+        return {'a': (['/tmp/a/x', '/tmp/a/y'], 8)}
+
+    @classmethod
+    def clean_files(cls, files, on_file_removed, cancel_token, sizes, on_dir_report):
+        cls.cleaned_sizes = dict(sizes)
+        for path in files:
+            on_file_removed(path, sizes[path])
+        return len(files), sum(sizes[p] for p in files), 0, []
+
+
+def test_scan_sizes_are_reused_by_the_listing_and_the_clean(monkeypatch):
+    monkeypatch.setattr(cli, 'get_system_cleaner', lambda: RecordingCleaner)
+    stream = io.StringIO()
+
+    code = cli.run_scan(['a'], clean=True, stream=stream)
+
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    found = {e['path']: e['size'] for e in events if e['event'] == 'file'}
+    assert found == {'/tmp/a/x': 3, '/tmp/a/y': 5}
+    assert RecordingCleaner.cleaned_sizes == found
+    assert code == cli.EXIT_OK
+
+
+def test_profile_flag_runs_the_scan_under_cprofile(monkeypatch, tmp_path):
+    import functools
+    from app import profiling
+
+    stream = io.StringIO()
+    monkeypatch.setattr(cli, 'get_system_cleaner', lambda: RecordingCleaner)
+    monkeypatch.setattr(cli, 'run_scan', functools.partial(cli.run_scan, stream=stream))
+    monkeypatch.setattr(profiling, 'profile_dir', lambda: tmp_path)
+    monkeypatch.setattr(cli, '_install_signal_handlers', lambda cancel: None)
+
+    code = cli.main(['scan', 'a', '--profile'])
+
+    start = json.loads(stream.getvalue().splitlines()[0])
+    assert code == cli.EXIT_OK
+    assert start['profile'].startswith(str(tmp_path))
+    summary = profiling.summarize(start['profile'])
+    assert any(f['function'] == 'run_scan' for f in summary['functions'])
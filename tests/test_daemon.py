@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Testes do app.daemon com amostragem e relógio simulados."""
+
+import os
+
+import pytest
+
+from app.daemon import Daemon
+
+
+GB = 1024 ** 3
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSampler:
+    """Amostras com espaço livre (e inodes) ajustáveis pelo teste."""
+
+    def __init__(self, total=100 * GB, free=50 * GB, inodes=None, free_inodes=None):
+        self.sample = {'total': total, 'free': free, 'inodes': inodes, 'free_inodes': free_inodes}
+
+    def set_free_percent(self, percent):
+        self.sample['free'] = int(self.sample['total'] * percent / 100)
+
+    def __call__(self, path):
+        return dict(self.sample)
+
+
+class FakeCleaner:
+    """Cleaner com uma categoria cujos arquivos estão num diretório de teste."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get_category_roots(self):
+        return {'fake': [{'path': self.root}]}
+
+    def scan_categories(self, categories, cancel_token=None, on_progress=None):
+        files = sorted(str(p) for p in self.root.iterdir())
+        return {'fake': (files, sum(os.path.getsize(f) for f in files))}
+
+    def clean_files(self, files, on_file_removed=None, cancel_token=None, sizes=None,
+                    on_dir_report=None):
+        return 0, 0, 0, []
+
+
+@pytest.fixture
+def make_daemon(tmp_path):
+    def make(sampler, **options):
+        clock = FakeClock()
+        daemon = Daemon(paths=(str(tmp_path),), categories=('fake',),
+                        cleaner=FakeCleaner(tmp_path), sampler=sampler, clock=clock,
+                        low_percent=10, high_percent=15, min_interval=5, max_interval=300,
+                        **options)
+        relieved = []
+        daemon._relieve = lambda fs, sample, inodes: relieved.append((clock.now, inodes))
+        return daemon, clock, relieved
+    return make
+
+
+def _run(daemon, clock, at):
+    """Amostra no instante 'at', mesmo antes do intervalo calculado."""
+    clock.now = at
+    fs = next(iter(daemon.filesystems.values()))
+    fs.next_sample_at = 0.0
+    daemon.tick()
+    return fs
+
+
+def test_hysteresis_starts_below_low_and_ends_at_high(make_daemon):
+    sampler = FakeSampler()
+    events = []
+    daemon, clock, relieved = make_daemon(sampler, cooldown=0,
+                                          on_event=lambda event, **f: events.append(event))
+
+    sampler.set_free_percent(12)          # entre low e high: nada acontece
+    fs = _run(daemon, clock, 0)
+    assert not fs.under_pressure and not relieved
+
+    sampler.set_free_percent(9)           # abaixo do low: começa a pressão
+    fs = _run(daemon, clock, 10)
+    assert fs.under_pressure and len(relieved) == 1
+
+    sampler.set_free_percent(12)          # acima do low, abaixo do high: continua
+    fs = _run(daemon, clock, 20)
+    assert fs.under_pressure and len(relieved) == 1
+
+    sampler.set_free_percent(15)          # atingiu o high: termina
+    fs = _run(daemon, clock, 30)
+    assert not fs.under_pressure
+    assert events == ['pressure', 'recovered']
+
+
+def test_cooldown_spaces_cleanings(make_daemon):
+    sampler = FakeSampler()
+    daemon, clock, relieved = make_daemon(sampler, cooldown=600)
+    sampler.set_free_percent(5)
+
+    for at in range(0, 1300, 100):
+        _run(daemon, clock, at)
+
+    assert [at for at, _ in relieved] == [0, 600, 1200]
+
+
+def test_interval_without_history_is_max(make_daemon):
+    daemon, clock, _ = make_daemon(FakeSampler())
+    fs = _run(daemon, clock, 0)
+    assert fs.next_sample_at == 300
+
+
+@pytest.mark.parametrize('drop, expected', [
+    (1 * GB, 300),       # consumo lento: limitado ao máximo
+    (40 * GB, 5),        # já no low: limitado ao mínimo
+    (20 * GB, 75),       # 20 GB até o low a 20 GB/300 s: 300 s * 0,25
+])
+def test_adaptive_interval_is_clamped(make_daemon, drop, expected):
+    sampler = FakeSampler(free=50 * GB)
+    daemon, clock, _ = make_daemon(sampler, cooldown=1e9)
+    _run(daemon, clock, 0)
+
+    sampler.sample['free'] = 50 * GB - drop
+    fs = _run(daemon, clock, 300)
+
+    assert fs.next_sample_at - 300 == pytest.approx(expected)
+
+
+def test_interval_under_pressure_is_min(make_daemon):
+    sampler = FakeSampler()
+    sampler.set_free_percent(5)
+    daemon, clock, _ = make_daemon(sampler, cooldown=0)
+    fs = _run(daemon, clock, 0)
+    assert fs.next_sample_at == 5
+
+
+def test_inode_pressure_tops_up_plan_with_oldest_files(tmp_path):
+    for i in range(80):
+        path = tmp_path / f"f{i:02d}"
+        path.write_bytes(b'x')
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+
+    events = []
+    # Muito espaço livre: só a pressão de inodes seleciona arquivos
+    sampler = FakeSampler(free=90 * GB, inodes=1000, free_inodes=40)
+    daemon = Daemon(paths=(str(tmp_path),), categories=('fake',), cleaner=FakeCleaner(tmp_path),
+                    sampler=sampler, clock=FakeClock(), dry_run=True,
+                    low_inodes_percent=5, high_inodes_percent=10,
+                    on_event=lambda event, **f: events.append((event, f)))
+    fs = next(iter(daemon.filesystems.values()))
+
+    inode_plan = daemon._inode_plan(fs, sampler.sample, daemon._scan(['fake']))
+    assert inode_plan['inode_deficit'] == 60
+    assert inode_plan['selected']['fake'] == [str(tmp_path / f"f{i:02d}") for i in range(60)]
+
+    daemon.tick()
+    plan = dict(events)['plan']
+    assert plan['files'] >= 60 and plan['dry_run']
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Testes do app.events (barramento de eventos)."""
+
+import threading
+
+from app.events import EventBus
+
+
+def test_concurrent_publishers_deliver_in_id_order():
+    bus = EventBus(max_queue=100_000)
+    subscription = bus.subscribe()
+    start = threading.Barrier(8)
+
+    def publisher(n):
+        start.wait()
+        for i in range(500):
+            bus.publish('state', {'publisher': n, 'i': i})
+
+    threads = [threading.Thread(target=publisher, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = []
+    while True:
+        item = subscription.get(timeout=0)
+        if item is None:
+            break
+        ids.append(item[0])
+    assert ids == list(range(1, 8 * 500 + 1))
+    assert bus.version == 8 * 500
+
+
+def test_slow_subscriber_gets_resync_instead_of_blocking():
+    bus = EventBus(max_queue=3)
+    subscription = bus.subscribe()
+    for i in range(5):
+        bus.publish('log', {'i': i})
+
+    event_id, event, data = subscription.get(timeout=0)
+    assert event == 'resync' and data['dropped'] == 3
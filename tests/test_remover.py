@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""Testes do app.remover (remoção por descritores e relatório)."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from app import remover
+from app.remover import RemovalReport, SubtreeStats, remove_tree
+
+
+def _write(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    return size
+
+
+def _make_tree(root, subdirs=3, files=4, size=100):
+    total = 0
+    for d in range(subdirs):
+        for f in range(files):
+            total += _write(root / f"d{d}" / "inner" / f"f{f}", size)
+    total += _write(root / "top.txt", size)
+    return total
+
+
+@pytest.fixture
+def undeletable():
+    """
+    Torna um diretório impossível de esvaziar.
+
+    Sem root basta tirar a escrita; como root, usa o atributo imutável
+    (chattr +i), e o teste é pulado se o sistema de arquivos não suportar.
+    """
+    locked = []
+
+    def lock(path):
+        if os.geteuid() != 0:
+            os.chmod(path, 0o555)
+        elif subprocess.run(['chattr', '+i', str(path)], capture_output=True).returncode != 0:
+            pytest.skip("chattr +i não suportado aqui")
+        locked.append(path)
+
+    yield lock
+
+    for path in locked:
+        if os.geteuid() != 0:
+            os.chmod(path, 0o755)
+        else:
+            subprocess.run(['chattr', '-i', str(path)], capture_output=True)
+
+
+def test_removes_tree_and_counts_everything(tmp_path):
+    root = tmp_path / "tree"
+    total = _make_tree(root)
+
+    report = remove_tree(root)
+
+    assert report and report.ok and report.removed_root
+    assert not root.exists()
+    assert report.files == 13
+    assert report.bytes == total
+    assert report.totals.dirs == 7  # 3 subárvores * 2 níveis + a raiz
+    assert set(report.subtrees) == {'d0', 'd1', 'd2'}
+    assert all(s.files == 4 for s in report.subtrees.values())
+
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_parallel_subtrees_match_sequential_totals(tmp_path, workers):
+    root = tmp_path / "tree"
+    total = _make_tree(root, subdirs=8, files=5)
+
+    report = remove_tree(root, workers=workers)
+
+    assert report
+    assert not root.exists()
+    assert report.files == 41
+    assert report.bytes == total
+    assert sum(s.files for s in report.subtrees.values()) + 1 == report.files
+
+
+def test_symlink_inside_tree_is_not_followed(tmp_path):
+    outside = tmp_path / "outside"
+    _write(outside / "keep.txt", 10)
+    root = tmp_path / "tree"
+    _make_tree(root, subdirs=1, files=1)
+    os.symlink(outside, root / "link")
+    os.symlink(outside, root / "d0" / "inner" / "deep_link")
+
+    report = remove_tree(root, workers=2)
+
+    assert report
+    assert not root.exists()
+    assert (outside / "keep.txt").read_bytes() == b'x' * 10
+
+
+def test_symlink_root_is_refused(tmp_path):
+    target = tmp_path / "target"
+    _write(target / "keep.txt", 10)
+    link = tmp_path / "link"
+    os.symlink(target, link)
+
+    report = remove_tree(link)
+
+    assert not report
+    assert [f.reason for f in report.failures] == ['symlink']
+    assert link.is_symlink()
+    assert (target / "keep.txt").exists()
+
+
+def test_missing_root_is_falsy_without_failures(tmp_path):
+    report = remove_tree(tmp_path / "missing")
+
+    assert not report
+    assert report.failures == []
+
+
+def test_partial_removal_reports_reason_and_removed_bytes(tmp_path, undeletable):
+    root = tmp_path / "tree"
+    _write(root / "free" / "a", 300)
+    _write(root / "free" / "b", 200)
+    _write(root / "locked" / "kept", 1000)
+    undeletable(root / "locked")
+
+    report = remove_tree(root)
+
+    assert not report
+    assert not report.removed_root
+    assert root.exists() and (root / "locked" / "kept").exists()
+    assert not (root / "free").exists()
+    # Só o que saiu de fato entra na conta
+    assert report.files == 2
+    assert report.bytes == 500
+    assert report.subtrees['free'].failures == 0
+    assert report.subtrees['locked'].failures >= 1
+    reasons = {f.reason for f in report.failures}
+    assert reasons & {'EACCES', 'EPERM'}
+    assert all(f.path.startswith(str(root / "locked")) for f in report.failures)
+    assert report.to_dict()['errors']
+
+
+def test_swapped_directory_is_refused(tmp_path):
+    root = tmp_path / "tree"
+    (root / "sub").mkdir(parents=True)
+    (root / "other").mkdir()
+    st = os.lstat(root / "sub")
+    # Troca o diretório por outro entre o lstat e a abertura
+    os.rename(root / "sub", root / "old")
+    os.rename(root / "other", root / "sub")
+
+    report, stats = RemovalReport(str(root)), SubtreeStats()
+    parent_fd = os.open(root, os.O_RDONLY)
+    try:
+        fd = remover._open_dir_at(parent_fd, "sub", str(root / "sub"), st, st.st_dev, report, stats)
+    finally:
+        os.close(parent_fd)
+
+    assert fd is None
+    assert [f.reason for f in report.failures] == ['race']
+
+
+def test_directory_swapped_for_symlink_is_refused(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    root = tmp_path / "tree"
+    (root / "sub").mkdir(parents=True)
+    st = os.lstat(root / "sub")
+    os.rmdir(root / "sub")
+    os.symlink(outside, root / "sub")
+
+    report, stats = RemovalReport(str(root)), SubtreeStats()
+    parent_fd = os.open(root, os.O_RDONLY)
+    try:
+        fd = remover._open_dir_at(parent_fd, "sub", str(root / "sub"), st, st.st_dev, report, stats)
+    finally:
+        os.close(parent_fd)
+
+    assert fd is None
+    assert report.failures[0].reason in ('ELOOP', 'ENOTDIR')
+
+
+def test_mount_point_is_not_crossed(tmp_path):
+    root = tmp_path / "tree"
+    (root / "sub").mkdir(parents=True)
+    st = os.lstat(root / "sub")
+
+    report, stats = RemovalReport(str(root)), SubtreeStats()
+    fd = remover._open_dir_at(-1, "sub", str(root / "sub"), st, st.st_dev + 1, report, stats)
+
+    assert fd is None
+    assert [f.reason for f in report.failures] == ['mount_point']
+
+
+def test_invalid_workers_env_falls_back_to_one(monkeypatch):
+    monkeypatch.setenv('LIMPEZA_DAVID_REMOVE_WORKERS', 'muitos')
+    assert remover._env_workers() == 1
+    monkeypatch.setenv('LIMPEZA_DAVID_REMOVE_WORKERS', '4')
+    assert remover._env_workers() == 4
+    monkeypatch.setenv('LIMPEZA_DAVID_REMOVE_WORKERS', '0')
+    assert remover._env_workers() == 1
+
+
+def test_clean_files_reports_partial_directories(tmp_path, undeletable):
+    from app.cleaner.linux import LinuxCleaner
+
+    root = tmp_path / "cache"
+    _write(root / "free" / "a", 300)
+    _write(root / "locked" / "kept", 1000)
+    undeletable(root / "locked")
+    reports = {}
+
+    removed, size_freed, errors, error_files = LinuxCleaner(home=tmp_path).clean_files(
+        [str(root)], on_dir_report=lambda path, report: reports.setdefault(path, report)
+    )
+
+    assert (removed, errors, error_files) == (0, 1, [str(root)])
+    assert size_freed == 300
+    report = reports[str(root)]
+    assert not report and report.failures
+
+
+def test_clean_files_reuses_scan_sizes_and_skips_measuring_dirs(tmp_path, monkeypatch):
+    from app.cleaner import linux
+    from app.cleaner.linux import LinuxCleaner
+
+    home = tmp_path / "home"
+    _write(home / ".cache" / "app" / "a", 100)
+    tree = home / ".cache" / "tree"
+    _make_tree(tree, subdirs=1, files=2, size=100)
+    tree_bytes = sum(os.lstat(os.path.join(d, f)).st_size for d, _, names in os.walk(tree) for f in names)
+    cleaner = LinuxCleaner(home=home)
+    sizes = {}
+    files, size = cleaner.scan_categories(['user_cache'], sizes=sizes)['user_cache']
+    assert sizes == {path: 100 for path in files}
+    assert size == 100 + tree_bytes
+
+    measured = []
+    monkeypatch.setattr(linux, 'get_file_size', lambda path: measured.append(path) or 0)
+    removed, size_freed, errors, _ = cleaner.clean_files(
+        [str(home / ".cache" / "app" / "a"), str(tree)], sizes=sizes
+    )
+
+    assert measured == []
+    assert (removed, errors) == (2, 0)
+    assert size_freed == 100 + tree_bytes
+
+
+def _swap_for_symlink(tmp_path):
+    """home/dir/victim com o diretório trocado por um link para fora da home."""
+    home = tmp_path / "home"
+    outside = tmp_path / "outside"
+    _write(home / "dir" / "victim", 10)
+    _write(outside / "victim", 10)
+    _make_tree(outside / "tree", subdirs=1, files=1)
+    shutil.rmtree(home / "dir")
+    os.symlink(outside, home / "dir")
+    return home, outside
+
+
+def test_unlink_beneath_refuses_symlinked_parent(tmp_path):
+    home, outside = _swap_for_symlink(tmp_path)
+
+    with pytest.raises(OSError):
+        remover.unlink_beneath(home / "dir" / "victim", home)
+    assert (outside / "victim").exists()
+
+    report = remove_tree(home / "dir" / "tree", base=home)
+    assert not report and report.failures
+    assert (outside / "tree").exists()
+
+
+def test_unlink_beneath_removes_regular_files(tmp_path):
+    target = tmp_path / "a" / "b" / "f"
+    _write(target, 10)
+    st = remover.unlink_beneath(target, tmp_path)
+    assert st.st_size == 10 and not target.exists()
+    with pytest.raises(IsADirectoryError):
+        remover.unlink_beneath(tmp_path / "a", tmp_path)
+
+
+def test_clean_files_of_another_user_does_not_follow_swapped_parent(tmp_path, monkeypatch):
+    from app.cleaner.linux import LinuxCleaner
+
+    home, outside = _swap_for_symlink(tmp_path)
+    cleaner = LinuxCleaner(home=home, uid=os.geteuid() + 1)
+    # A verificação passou antes da troca (a janela da corrida)
+    monkeypatch.setattr(cleaner, '_is_safe_to_delete', lambda path: True)
+
+    removed, _, errors, _ = cleaner.clean_files(
+        [str(home / "dir" / "victim"), str(home / "dir" / "tree")]
+    )
+
+    assert (removed, errors) == (0, 2)
+    assert (outside / "victim").exists()
+    assert (outside / "tree").exists()
+
+
+def test_tree_removal_is_timed_apart_from_file_unlinks(tmp_path):
+    from app import metrics
+    from app.utils import safe_remove_dir, safe_remove_file
+
+    def count(histogram):
+        return dict((s[0], s[2]) for s in histogram._samples())['_count']
+
+    trees, files = count(metrics.TREE_REMOVAL_DURATION), count(metrics.DELETE_LATENCY)
+    _make_tree(tmp_path / "tree")
+    _write(tmp_path / "single", 10)
+
+    assert safe_remove_dir(tmp_path / "tree")
+    assert safe_remove_file(tmp_path / "single")
+
+    assert count(metrics.TREE_REMOVAL_DURATION) == trees + 1
+    assert count(metrics.DELETE_LATENCY) == files + 1
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""Testes do app.cleaner.rules (plano de varredura única e regras do usuário)."""
+
+import os
+import json
+import time
+
+import pytest
+
+from app.cleaner import rules
+from app.cleaner.rules import Category, Rule, HOUR, DAY, compile_plan, rule_from_dict
+
+
+def _write(path, size=10, age=0.0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    if age:
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def _scan(*categories, uid=None, **kwargs):
+    return compile_plan(categories).run(lambda path: True, uid=uid, **kwargs)
+
+
+def _files(results, cat_id):
+    return sorted(results[cat_id][0])
+
+
+def test_nested_roots_share_one_walk_and_activate_inside(tmp_path):
+    cache = tmp_path / ".cache"
+    app_file = _write(cache / "app" / "a.bin")
+    pip_file = _write(cache / "pip" / "wheels" / "w.whl")
+    thumb = _write(cache / "thumbnails" / "t.png")
+
+    user_cache = Category('user_cache', 'c', '', '', (Rule(str(cache), exclude=('/pip',)),))
+    pip = Category('pip', 'p', '', '', (Rule(str(cache / "pip")),))
+    thumbs = Category('thumbs', 't', '', '', (Rule(str(cache / "thumbnails")),))
+
+    plan = compile_plan([user_cache, pip, thumbs])
+    assert plan.roots == [str(cache)]
+
+    results = plan.run(lambda path: True)
+    assert _files(results, 'user_cache') == sorted([app_file, thumb])
+    # A regra aninhada é ativada mesmo com a externa excluindo o diretório
+    assert _files(results, 'pip') == [pip_file]
+    assert _files(results, 'thumbs') == [thumb]
+
+
+def test_file_reached_by_nested_roots_of_one_category_counts_once(tmp_path):
+    log = _write(tmp_path / "local" / "temp" / "x.log", size=7)
+    category = Category('logs', 'l', '', '', (
+        Rule(str(tmp_path / "local" / "temp"), include=('*.log',)),
+        Rule(str(tmp_path / "local"), include=('*.log',)),
+    ))
+
+    files, size = _scan(category)['logs']
+    assert files == [log]
+    assert size == 7
+
+
+def test_age_of_top_keeps_recent_first_level_entries_whole(tmp_path):
+    old_dir = tmp_path / "old_dir"
+    recent_dir = tmp_path / "recent_dir"
+    fresh_inside_old = _write(old_dir / "fresh.txt")
+    old_inside_recent = _write(recent_dir / "old.txt", age=3 * HOUR)
+    old_file = _write(tmp_path / "old.txt", age=3 * HOUR)
+    _write(tmp_path / "recent.txt")
+    mtime = time.time() - 2 * HOUR
+    os.utime(old_dir, (mtime, mtime))
+
+    category = Category('tmp', 't', '', '', (Rule(str(tmp_path), min_age=HOUR, age_of='top'),))
+    files = _files(_scan(category), 'tmp')
+
+    # Dentro de um item antigo do primeiro nível a idade do arquivo não importa
+    assert fresh_inside_old in files
+    assert old_file in files
+    assert old_inside_recent not in files
+    assert len(files) == 2
+
+
+def test_age_of_file_checks_each_file(tmp_path):
+    old = _write(tmp_path / "a" / "old.log", age=8 * DAY)
+    _write(tmp_path / "a" / "new.log", age=1 * DAY)
+    category = Category('logs', 'l', '', '', (Rule(str(tmp_path), include=('*.log',), min_age=7 * DAY),))
+    assert _files(_scan(category), 'logs') == [old]
+
+
+def test_anchored_exclude_only_matches_first_level(tmp_path):
+    kept = _write(tmp_path / "foo" / "pip" / "f")
+    _write(tmp_path / "pip" / "g")
+    anchored = Category('a', 'a', '', '', (Rule(str(tmp_path), exclude=('/pip',)),))
+    anywhere = Category('b', 'b', '', '', (Rule(str(tmp_path), exclude=('pip',)),))
+
+    results = _scan(anchored, anywhere)
+    assert _files(results, 'a') == [kept]
+    assert _files(results, 'b') == []
+
+
+def test_max_depth_limits_descent(tmp_path):
+    top = _write(tmp_path / "thumbcache_1.db")
+    _write(tmp_path / "sub" / "thumbcache_2.db")
+    category = Category('c', 'c', '', '', (Rule(str(tmp_path), include=('thumbcache_*.db',), max_depth=1),))
+    assert _files(_scan(category), 'c') == [top]
+
+
+def test_size_and_owner_predicates(tmp_path):
+    big = _write(tmp_path / "big", size=500)
+    _write(tmp_path / "small", size=5)
+    by_size = Category('s', 's', '', '', (Rule(str(tmp_path), min_size=100, max_size=1000),))
+    mine = Category('u', 'u', '', '', (Rule(str(tmp_path), owner='user'),))
+
+    assert _files(_scan(by_size), 's') == [big]
+    assert len(_files(_scan(mine, uid=os.getuid()), 'u')) == 2
+    assert _files(_scan(mine, uid=os.getuid() + 1), 'u') == []
+
+
+def test_file_root_is_evaluated_without_walk(tmp_path):
+    target = _write(tmp_path / "recently-used.xbel")
+    category = Category('recent', 'r', '', '', (Rule(target),))
+    plan = compile_plan([category])
+    assert plan.walks == []
+    assert plan.run(lambda path: True)['recent'][0] == [target]
+
+
+def test_unsafe_files_are_skipped(tmp_path):
+    _write(tmp_path / ".bashrc")
+    ok = _write(tmp_path / "cache.bin")
+    category = Category('c', 'c', '', '', (Rule(str(tmp_path)),))
+    results = compile_plan([category]).run(lambda path: path.name != '.bashrc')
+    assert results['c'][0] == [ok]
+
+
+def test_budget_selects_least_recently_used_excess(tmp_path):
+    cache = tmp_path / "pip"
+    paths = []
+    for i in range(6):
+        path = _write(cache / f"f{i}", size=4096)
+        stamp = 1_000_000 + i * 1000
+        os.utime(path, (stamp, stamp))
+        paths.append(path)
+    used = sum(os.lstat(p).st_blocks * 512 for p in paths)
+    per_file = used // 6
+
+    category = Category('dev', 'd', '', '', (Rule(str(cache), budget=used - 2 * per_file),))
+    files, size = _scan(category)['dev']
+
+    # Só o excesso sai, dos menos usados para os mais usados
+    assert sorted(files) == paths[:2]
+    assert size == 2 * per_file
+
+
+def test_budget_under_limit_selects_nothing(tmp_path):
+    _write(tmp_path / "pip" / "f", size=100)
+    category = Category('dev', 'd', '', '', (Rule(str(tmp_path / "pip"), budget=10 ** 9),))
+    assert _scan(category)['dev'] == ([], 0)
+
+
+def test_progress_names_the_root_being_walked_and_publishes_partials(tmp_path):
+    _write(tmp_path / "a" / "f")
+    _write(tmp_path / "b" / "g")
+    category = Category('c', 'c', '', '', (Rule(str(tmp_path / "a")), Rule(str(tmp_path / "b"))))
+    progress, partials = [], []
+
+    _scan(category, on_progress=lambda *args: progress.append(args),
+          on_results=lambda partial: partials.append(len(partial['c'][0])))
+
+    assert progress == [(0, 2, str(tmp_path / "a")), (1, 2, str(tmp_path / "b")), (2, 2, '')]
+    assert partials == [1, 2]
+
+
+def test_cancel_stops_the_walk(tmp_path):
+    for i in range(50):
+        _write(tmp_path / f"f{i}")
+
+    class Token:
+        cancelled = True
+
+    category = Category('c', 'c', '', '', (Rule(str(tmp_path)),))
+    assert _scan(category, cancel_token=Token())['c'] == ([], 0)
+
+
+def test_glob_roots_are_expanded(tmp_path):
+    cache = _write(tmp_path / "abc.default-release" / "cache2" / "e")
+    _write(tmp_path / "other" / "cache2" / "e")
+    category = Category('b', 'b', '', '', (Rule(str(tmp_path / "*.default*" / "cache2")),))
+    assert _files(_scan(category), 'b') == [cache]
+
+
+# === Regras do usuário ===
+
+def test_rule_from_dict_expands_home_and_converts_ages(tmp_path):
+    rule = rule_from_dict({'root': '~/proj', 'include': ['*.log'], 'min_age_days': 2,
+                           'min_age_hours': 1, 'max_depth': 3}, home=tmp_path)
+    assert rule.root == str(tmp_path / "proj")
+    assert rule.min_age == 2 * DAY + HOUR
+    assert rule.owner == 'user'
+    assert rule.max_depth == 3
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'root': 'relativo'}, 'absoluta'),
+    ({}, 'absoluta'),
+    ({'root': '/x', 'idade': 3}, 'desconhecidos'),
+    ({'root': '/x', 'owner': 'root'}, 'owner'),
+    ({'root': '/x', 'age_of': 'dir'}, 'age_of'),
+    ({'root': '/x', 'include': '*.log'}, 'include'),
+    ({'root': '/x', 'exclude': [1]}, 'exclude'),
+    ({'root': '/x', 'min_age_days': -1}, 'min_age_days'),
+    ({'root': '/x', 'min_size': True}, 'min_size'),
+    ({'root': '/x', 'max_depth': 0}, 'max_depth'),
+    ({'root': '/x', 'symlinks': 'sim'}, 'symlinks'),
+    ('/x', 'objeto'),
+])
+def test_rule_from_dict_rejects_invalid_rules(data, message):
+    with pytest.raises(ValueError, match=message):
+        rule_from_dict(data)
+
+
+def test_load_user_categories_skips_invalid_and_reserved(tmp_path):
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps({'categories': [
+        {'id': 'logs_projetos', 'rules': [{'root': '~/proj', 'include': ['*.log']}]},
+        {'id': 'tmp', 'rules': [{'root': '/tmp'}]},
+        {'id': 'Inválido', 'rules': [{'root': '/x'}]},
+        {'id': 'sem_regras', 'rules': []},
+        {'id': 'logs_projetos', 'rules': [{'root': '/y'}]},
+    ]}), encoding='utf-8')
+
+    categories = rules.load_user_categories(path, home=tmp_path, reserved=['tmp'])
+
+    assert [c.id for c in categories] == ['logs_projetos']
+    assert categories[0].user_defined
+    assert categories[0].rules[0].root == str(tmp_path / "proj")
+
+
+def test_load_user_categories_tolerates_missing_and_broken_files(tmp_path):
+    assert rules.load_user_categories(tmp_path / "missing.json") == []
+    broken = tmp_path / "broken.json"
+    broken.write_text('{', encoding='utf-8')
+    assert rules.load_user_categories(broken) == []
+
+
+# === Categorias embutidas do Linux ===
+
+@pytest.fixture
+def home(tmp_path):
+    """Home sintética com uma amostra de cada categoria pessoal."""
+    home = tmp_path / "home"
+    files = {
+        'user_cache': [_write(home / ".cache/app/data.bin"), _write(home / ".cache/thumbnails/n/t.png"),
+                       _write(home / ".cache/foo/pip/nested")],
+        'thumbnails': [_write(home / ".cache/thumbnails/n/t.png")],
+        'browser_cache': [_write(home / ".config/google-chrome/Default/Cache/c0"),
+                          _write(home / ".mozilla/firefox/x.default-release/cache2/e")],
+        'trash': [_write(home / ".local/share/Trash/files/t"), _write(home / ".local/share/Trash/info/t.info")],
+        'old_logs': [_write(home / ".local/share/xorg/Xorg.0.log.old", age=8 * DAY)],
+        'crash_reports': [_write(home / ".local/share/apport/r.crash")],
+        'recent_docs': [_write(home / ".local/share/recently-used.xbel")],
+    }
+    # Fora de qualquer categoria
+    _write(home / ".cache/pip/wheel.whl")
+    _write(home / ".cache/fontconfig/cache-4")
+    _write(home / ".mozilla/firefox/other/cache2/e")
+    _write(home / ".local/share/xorg/Xorg.1.log", age=1 * DAY)
+    return home, files
+
+
+def test_linux_builtin_categories_on_synthetic_home(home):
+    from app.cleaner.linux import LinuxCleaner
+
+    home, expected = home
+    cleaner = LinuxCleaner(home=home, uid=os.getuid(), cache_budgets={'pip': None})
+    results = cleaner.scan_categories(list(expected))
+
+    for cat_id, files in expected.items():
+        mine = sorted(f for f in results[cat_id][0] if f.startswith(str(home)))
+        assert mine == sorted(files), cat_id
+
+
+def test_linux_scan_category_matches_joint_scan(home):
+    from app.cleaner.linux import LinuxCleaner
+
+    home, expected = home
+    cleaner = LinuxCleaner(home=home, uid=os.getuid())
+    joint = cleaner.scan_categories(list(expected))
+    for cat_id in expected:
+        files, size = cleaner.scan_category(cat_id)
+        assert (sorted(files), size) == (sorted(joint[cat_id][0]), joint[cat_id][1])
+
+
+def test_linux_estimator_roots_follow_rules(home):
+    from app.cleaner.linux import LinuxCleaner
+
+    home, _ = home
+    roots = LinuxCleaner(home=home, uid=os.getuid()).get_category_roots()
+    user_cache = roots['user_cache'][0]
+    assert user_cache['path'] == home / ".cache"
+    assert {'pip', 'fontconfig'} <= user_cache['exclude']
+    assert [r['path'].name for r in roots['browser_cache']] == ['Cache', 'cache2']
+
+
+def test_sockets_fifos_and_symlinks_are_not_selected(tmp_path):
+    import socket
+
+    regular = _write(tmp_path / "file")
+    os.mkfifo(tmp_path / "fifo")
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(str(tmp_path / "sock"))
+    os.symlink(regular, tmp_path / "link")
+    try:
+        plain = Category('p', 'p', '', '', (Rule(str(tmp_path)),))
+        links = Category('l', 'l', '', '', (Rule(str(tmp_path), symlinks=True),))
+        results = _scan(plain, links)
+    finally:
+        sock.close()
+
+    assert _files(results, 'p') == [regular]
+    assert _files(results, 'l') == sorted([regular, str(tmp_path / "link")])
+
+
+def test_fifo_file_root_is_ignored(tmp_path):
+    os.mkfifo(tmp_path / "fifo")
+    category = Category('c', 'c', '', '', (Rule(str(tmp_path / "fifo")),))
+    assert _scan(category)['c'] == ([], 0)
+
+
+def test_cancel_after_walk_skips_budget_pass(tmp_path, monkeypatch):
+    _write(tmp_path / "pip" / "f", size=4096)
+
+    class Token:
+        cancelled = False
+
+    token = Token()
+    monkeypatch.setattr(rules._PlanRun, 'apply_budgets',
+                        lambda self: pytest.fail("orçamento aplicado após o cancelamento"))
+    category = Category('dev', 'd', '', '', (Rule(str(tmp_path / "pip"), budget=0),))
+
+    def cancel(partial):
+        token.cancelled = True
+
+    assert _scan(category, cancel_token=token, on_results=cancel)['dev'] == ([], 0)
+
+
+def test_budget_checks_safety_only_on_selected_files(tmp_path):
+    paths = []
+    for i in range(10):
+        path = _write(tmp_path / "pip" / f"f{i}", size=4096)
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+        paths.append(path)
+    per_file = os.lstat(paths[0]).st_blocks * 512
+    checked = []
+
+    def is_safe(path):
+        checked.append(str(path))
+        return str(path) != paths[0]
+
+    category = Category('dev', 'd', '', '', (Rule(str(tmp_path / "pip"), budget=8 * per_file),))
+    files, size = compile_plan([category]).run(is_safe)['dev']
+
+    assert sorted(checked) == paths[:2]
+    assert files == [paths[1]]
+    assert size == per_file